@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+from app.config import Settings
+from app.profiling import profile_id
+
+SCRUBBED_VALUE = "[scrubbed]"
+CAPTURE_SUFFIX = ".capture.json"
+
+
+def scrub_payload(value: Any, fields: Iterable[str]) -> Any:
+    """Copy of ``value`` with every string under a key in ``fields`` replaced, at any depth."""
+    scrub_fields = set(fields)
+
+    def _scrub(item: Any) -> Any:
+        if isinstance(item, dict):
+            return {
+                key: SCRUBBED_VALUE if key in scrub_fields and isinstance(child, str) and child else _scrub(child)
+                for key, child in item.items()
+            }
+        if isinstance(item, list):
+            return [_scrub(child) for child in item]
+        return item
+
+    return _scrub(value)
+
+
+class TrafficCapture:
+    """
+    Sampled archive of /convert inputs for offline replay (``tools/replay-captures.py``).
+
+    Each captured request is written to ``CAPTURE_DIR`` as one JSON file
+    holding the scrubbed payload, the conversion options, the cost estimate
+    and the timings the request saw. Only the newest ``CAPTURE_MAX_FILES``
+    captures are kept.
+    """
+
+    def __init__(self, settings: Settings, rng: random.Random | None = None) -> None:
+        self.directory = settings.capture_dir
+        self.sample_rate = settings.capture_sample_rate
+        self.scrub_fields = settings.capture_scrub_fields
+        self.max_files = settings.capture_max_files
+        self._rng = rng or random.Random()
+
+    def sampled(self) -> bool:
+        return self.sample_rate > 0 and self._rng.random() < self.sample_rate
+
+    def record(
+        self,
+        request_id: str,
+        raw_bytes: bytes,
+        options: Mapping[str, Any],
+        cost: Mapping[str, Any],
+        size_class: str,
+        timings: Mapping[str, float],
+    ) -> Path:
+        """Write one capture. Meant to run after the response is sent (it parses the payload again)."""
+        captured_at = time.time()
+        entry = {
+            "request_id": request_id,
+            "captured_at": datetime.fromtimestamp(captured_at, timezone.utc).isoformat(timespec="milliseconds"),
+            "options": dict(options),
+            "cost": dict(cost),
+            "size_class": size_class,
+            "timings": {name: round(seconds, 6) for name, seconds in timings.items()},
+            "payload": scrub_payload(json.loads(raw_bytes), self.scrub_fields),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{int(captured_at * 1000):015d}-{profile_id(request_id)}{CAPTURE_SUFFIX}"
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(entry, separators=(",", ":")), encoding="utf-8")
+        os.replace(temp_path, path)
+        self._prune()
+        return path
+
+    def _prune(self) -> None:
+        # File names start with a zero-padded timestamp, so name order is capture order.
+        captures = sorted(self.directory.glob(f"*{CAPTURE_SUFFIX}"))
+        for stale in captures[: max(0, len(captures) - self.max_files)]:
+            stale.unlink(missing_ok=True)
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 import os
 import sys
+import tempfile
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 
 DEFAULT_CORS_ORIGINS = [
@@ -12,6 +13,39 @@ DEFAULT_CORS_ORIGINS = [
     "http://localhost:5173",
 ]
 
+# Personal data in contacts; replaced before a payload is written to the capture archive.
+DEFAULT_CAPTURE_SCRUB_FIELDS = [
+    "firstName",
+    "midInitials",
+    "lastName",
+    "email",
+    "phone",
+    "fax",
+    "address",
+    "orcid",
+]
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw_value = os.getenv(name)
+    if raw_value is None:
+        return default
+    return raw_value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int, minimum: int) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float, minimum: float) -> float:
+    try:
+        return max(minimum, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
 
 @dataclass(frozen=True)
 class Settings:
@@ -23,6 +57,37 @@ class Settings:
     schema_path: Path
     strict_schema_path: Path
     converter_script_path: Path
+    idempotency_ttl_seconds: int
+    idempotency_max_retained_mb: int
+    max_validate_batch: int
+    deterministic_ids: bool
+    schema_reload_interval_seconds: float
+    max_payload_cost: int
+    medium_cost_threshold: int
+    large_cost_threshold: int
+    converter_small_slots: int
+    converter_medium_slots: int
+    converter_large_slots: int
+    converter_timeout_per_1k_cost_seconds: float
+    converter_max_timeout_seconds: int
+    converter_cpu_limit_seconds: int
+    converter_memory_limit_mb: int
+    converter_trace_memory: bool
+    profiling_enabled: bool
+    profile_dir: Path
+    profile_max_files: int
+    sampling_profiler_enabled: bool
+    sampling_interval_ms: int
+    sampling_window_seconds: int
+    debug_token: str
+    log_format: str
+    log_queue_size: int
+    capture_sample_rate: float
+    capture_dir: Path
+    capture_scrub_fields: List[str]
+    capture_max_files: int
+    study_cache_dir: Optional[Path]
+    study_cache_max_entries: int
 
     @property
     def max_upload_bytes(self) -> int:
@@ -36,19 +101,57 @@ class Settings:
         converter_script_path = base_dir / "web-to-isa-phm.py"
 
         converter_python = os.getenv("CONVERTER_PYTHON", sys.executable)
-        timeout_value = os.getenv("CONVERTER_TIMEOUT_SECONDS", "120")
-        max_upload_value = os.getenv("MAX_UPLOAD_MB", "50")
-        strict_schema = os.getenv("STRICT_SCHEMA", "false").strip().lower() in {"1", "true", "yes", "on"}
+        converter_timeout_seconds = _env_int("CONVERTER_TIMEOUT_SECONDS", 120, minimum=1)
+        max_upload_mb = _env_int("MAX_UPLOAD_MB", 50, minimum=1)
+        idempotency_ttl_seconds = _env_int("IDEMPOTENCY_TTL_SECONDS", 300, minimum=0)
+        idempotency_max_retained_mb = _env_int("IDEMPOTENCY_MAX_RETAINED_MB", 256, minimum=1)
+        max_validate_batch = _env_int("MAX_VALIDATE_BATCH", 100, minimum=1)
+        schema_reload_interval_seconds = _env_float("SCHEMA_RELOAD_INTERVAL_SECONDS", 5.0, minimum=0.0)
+        strict_schema = _env_bool("STRICT_SCHEMA", False)
+        deterministic_ids = _env_bool("DETERMINISTIC_IDS", False)
+        max_payload_cost = _env_int("MAX_PAYLOAD_COST", 0, minimum=0)
+        medium_cost_threshold = _env_int("MEDIUM_COST_THRESHOLD", 5000, minimum=1)
+        large_cost_threshold = max(medium_cost_threshold, _env_int("LARGE_COST_THRESHOLD", 50000, minimum=1))
+        converter_small_slots = _env_int("CONVERTER_SMALL_SLOTS", 4, minimum=1)
+        converter_medium_slots = _env_int("CONVERTER_MEDIUM_SLOTS", 2, minimum=1)
+        converter_large_slots = _env_int("CONVERTER_LARGE_SLOTS", 1, minimum=1)
+        converter_timeout_per_1k_cost_seconds = _env_float("CONVERTER_TIMEOUT_PER_1K_COST_SECONDS", 1.0, minimum=0.0)
+        converter_max_timeout_seconds = max(
+            converter_timeout_seconds,
+            _env_int("CONVERTER_MAX_TIMEOUT_SECONDS", 600, minimum=1),
+        )
+
+        converter_cpu_limit_seconds = _env_int("CONVERTER_CPU_LIMIT_SECONDS", 0, minimum=0)
+        converter_memory_limit_mb = _env_int("CONVERTER_MEMORY_LIMIT_MB", 0, minimum=0)
+        converter_trace_memory = _env_bool("CONVERTER_TRACE_MEMORY", False)
+
+        profiling_enabled = _env_bool("PROFILING_ENABLED", False)
+        profile_dir = Path(os.getenv("PROFILE_DIR", "") or Path(tempfile.gettempdir()) / "isa-phm-profiles")
+        profile_max_files = _env_int("PROFILE_MAX_FILES", 200, minimum=2)
 
-        try:
-            converter_timeout_seconds = max(1, int(timeout_value))
-        except ValueError:
-            converter_timeout_seconds = 120
+        sampling_profiler_enabled = _env_bool("SAMPLING_PROFILER_ENABLED", False)
+        sampling_interval_ms = _env_int("SAMPLING_INTERVAL_MS", 50, minimum=1)
+        sampling_window_seconds = _env_int("SAMPLING_WINDOW_SECONDS", 300, minimum=1)
+        debug_token = os.getenv("DEBUG_TOKEN", "").strip()
+
+        log_format = os.getenv("LOG_FORMAT", "text").strip().lower()
+        if log_format not in {"text", "json"}:
+            log_format = "text"
+        log_queue_size = _env_int("LOG_QUEUE_SIZE", 0, minimum=0)
+
+        capture_sample_rate = min(1.0, _env_float("CAPTURE_SAMPLE_RATE", 0.0, minimum=0.0))
+        capture_dir = Path(os.getenv("CAPTURE_DIR", "") or Path(tempfile.gettempdir()) / "isa-phm-captures")
+        raw_scrub_fields = os.getenv("CAPTURE_SCRUB_FIELDS")
+        if raw_scrub_fields is None:
+            capture_scrub_fields = DEFAULT_CAPTURE_SCRUB_FIELDS.copy()
+        else:
+            capture_scrub_fields = [field.strip() for field in raw_scrub_fields.split(",") if field.strip()]
+        capture_max_files = _env_int("CAPTURE_MAX_FILES", 1000, minimum=1)
 
-        try:
-            max_upload_mb = max(1, int(max_upload_value))
-        except ValueError:
-            max_upload_mb = 50
+        # Unset (the default) disables the per-study conversion cache.
+        raw_study_cache_dir = os.getenv("STUDY_CACHE_DIR", "").strip()
+        study_cache_dir = Path(raw_study_cache_dir) if raw_study_cache_dir else None
+        study_cache_max_entries = _env_int("STUDY_CACHE_MAX_ENTRIES", 1000, minimum=1)
 
         raw_origins = os.getenv("CORS_ALLOW_ORIGINS", "")
         if raw_origins.strip():
@@ -65,4 +168,35 @@ class Settings:
             schema_path=schema_path,
             strict_schema_path=strict_schema_path,
             converter_script_path=converter_script_path,
+            idempotency_ttl_seconds=idempotency_ttl_seconds,
+            idempotency_max_retained_mb=idempotency_max_retained_mb,
+            max_validate_batch=max_validate_batch,
+            deterministic_ids=deterministic_ids,
+            schema_reload_interval_seconds=schema_reload_interval_seconds,
+            max_payload_cost=max_payload_cost,
+            medium_cost_threshold=medium_cost_threshold,
+            large_cost_threshold=large_cost_threshold,
+            converter_small_slots=converter_small_slots,
+            converter_medium_slots=converter_medium_slots,
+            converter_large_slots=converter_large_slots,
+            converter_timeout_per_1k_cost_seconds=converter_timeout_per_1k_cost_seconds,
+            converter_max_timeout_seconds=converter_max_timeout_seconds,
+            converter_cpu_limit_seconds=converter_cpu_limit_seconds,
+            converter_memory_limit_mb=converter_memory_limit_mb,
+            converter_trace_memory=converter_trace_memory,
+            profiling_enabled=profiling_enabled,
+            profile_dir=profile_dir,
+            profile_max_files=profile_max_files,
+            sampling_profiler_enabled=sampling_profiler_enabled,
+            sampling_interval_ms=sampling_interval_ms,
+            sampling_window_seconds=sampling_window_seconds,
+            debug_token=debug_token,
+            log_format=log_format,
+            log_queue_size=log_queue_size,
+            capture_sample_rate=capture_sample_rate,
+            capture_dir=capture_dir,
+            capture_scrub_fields=capture_scrub_fields,
+            capture_max_files=capture_max_files,
+            study_cache_dir=study_cache_dir,
+            study_cache_max_entries=study_cache_max_entries,
         )
@@ -1,3 +1,18 @@
-from .entrypoint import create_isa_data
+from __future__ import annotations
 
-__all__ = ["create_isa_data"]
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .entrypoint import create_isa_data, create_isa_document
+
+__all__ = ["create_isa_data", "create_isa_document"]
+
+
+def __getattr__(name: str) -> Any:
+    # Loaded on first use: the entrypoint imports isatools, which takes seconds, and
+    # the API imports stdlib-only helpers from this package without ever converting.
+    if name in __all__:
+        from . import entrypoint
+
+        return getattr(entrypoint, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
-from logging import Logger
-from typing import Any, Dict, List
+from typing import Dict, List
 
 from isatools.model import (
     Assay,
@@ -17,24 +16,22 @@ from isatools.model import (
     plink,
 )
 
+from .diagnostics import ConversionDiagnostics
 from .normalization import normalize_unit, parse_numeric_if_possible
+from .payload_model import StudyModel
 from .protocol_mapping import parse_protocol_entry
 
 
 def append_assays_to_study(
     study_obj: Study,
-    study_payload: Dict[str, Any],
+    study_model: StudyModel,
     dummy_sample: Sample,
-    selected_measurement_protocol_id: str,
-    selected_processing_protocol_id: str,
-    measurement_protocol_variants: List[Dict[str, Any]],
-    processing_protocol_variants: List[Dict[str, Any]],
-    measurement_protocol_defs: Dict[str, Dict[str, Any]],
-    processing_defs: Dict[str, Dict[str, Any]],
     add_unit_to_study,
-    logger: Logger,
+    diagnostics: ConversionDiagnostics,
 ) -> None:
-    for assay in study_payload.get("assay_details", []):
+    measurement = study_model.measurement
+    processing = study_model.processing
+    for assay in study_model.assays:
         assay_obj = Assay(filename=assay.get("assay_file_name", "unknown"))
 
         assay_sensor = assay.get("used_sensor", {})
@@ -106,7 +103,7 @@ def append_assays_to_study(
 
             if is_measurement:
                 measurement_protocol_obj = protocol
-                use_measurement_entries = bool(selected_measurement_protocol_id) or not measurement_protocol_variants
+                use_measurement_entries = bool(measurement.selected_id) or not measurement.variants
                 if not use_measurement_entries:
                     continue
 
@@ -114,8 +111,8 @@ def append_assays_to_study(
                     parsed = parse_protocol_entry(
                         entry,
                         assay_sensor_id,
-                        measurement_protocol_defs,
-                        expected_protocol_id=selected_measurement_protocol_id,
+                        measurement.parameter_defs,
+                        expected_protocol_id=measurement.selected_id,
                     )
                     if not parsed:
                         continue
@@ -134,16 +131,19 @@ def append_assays_to_study(
                     clean_unit = normalize_unit(raw_unit)
                     unit = add_unit_to_study(study_obj, clean_unit) if clean_unit and is_numeric else None
                     if clean_unit and not is_numeric:
-                        logger.warning(
+                        diagnostics.add(
+                            "non_numeric_measurement_unit_dropped",
                             "Skipping unit for non-numeric measurement value",
-                            extra={"parameter": parameter_name, "value": raw_value, "unit": clean_unit},
+                            parameter=parameter_name,
+                            value=raw_value,
+                            unit=clean_unit,
                         )
 
                     measurement_params.append(ParameterValue(category=category, value=parsed_value, unit=unit))
 
             if is_processing:
                 processing_protocol_obj = protocol
-                use_processing_entries = bool(selected_processing_protocol_id) or not processing_protocol_variants
+                use_processing_entries = bool(processing.selected_id) or not processing.variants
                 if not use_processing_entries:
                     continue
 
@@ -151,8 +151,8 @@ def append_assays_to_study(
                     parsed = parse_protocol_entry(
                         entry,
                         assay_sensor_id,
-                        processing_defs,
-                        expected_protocol_id=selected_processing_protocol_id,
+                        processing.parameter_defs,
+                        expected_protocol_id=processing.selected_id,
                     )
                     if not parsed:
                         continue
@@ -171,9 +171,12 @@ def append_assays_to_study(
                     clean_unit = normalize_unit(raw_unit)
                     unit = add_unit_to_study(study_obj, clean_unit) if clean_unit and is_numeric else None
                     if clean_unit and not is_numeric:
-                        logger.warning(
+                        diagnostics.add(
+                            "non_numeric_processing_unit_dropped",
                             "Skipping unit for non-numeric processing value",
-                            extra={"parameter": parameter_name, "value": raw_value, "unit": clean_unit},
+                            parameter=parameter_name,
+                            value=raw_value,
+                            unit=clean_unit,
                         )
 
                     processing_params.append(ParameterValue(category=category, value=parsed_value, unit=unit))
@@ -184,7 +187,12 @@ def append_assays_to_study(
             has_proc = run_has_processed[index]
 
             if not has_raw and not has_proc:
-                logger.warning("Skipping run without output files", extra={"run_number": run_number})
+                diagnostics.add(
+                    "run_without_output_files",
+                    "Skipping run without output files",
+                    assay=assay_obj.filename,
+                    run_number=run_number,
+                )
                 continue
 
             raw_df = assay_obj.data_files[run_raw_df_index[index]] if has_raw else None
@@ -6,6 +6,9 @@ from uuid import uuid4
 
 from isatools.model import OntologyAnnotation, Study
 
+from .diagnostics import ConversionDiagnostics
+from .identifiers import deterministic_uuid
+
 
 def _normalize_term(value: Any) -> str:
     if value is None:
@@ -18,6 +21,13 @@ def _normalize_term(value: Any) -> str:
 class ConversionContext:
     units_by_term: Dict[str, OntologyAnnotation] = field(default_factory=dict)
     roles_by_term: Dict[str, OntologyAnnotation] = field(default_factory=dict)
+    id_seed: Optional[str] = None
+    diagnostics: ConversionDiagnostics = field(default_factory=ConversionDiagnostics)
+
+    def new_id(self, *parts: Any) -> str:
+        if self.id_seed is None:
+            return str(uuid4())
+        return deterministic_uuid(self.id_seed, *parts)
 
     def get_or_create_unit(self, unit_term: Any) -> Optional[OntologyAnnotation]:
         normalized = _normalize_term(unit_term)
@@ -28,7 +38,7 @@ class ConversionContext:
         if existing:
             return existing
 
-        created = OntologyAnnotation(term=normalized, id_=f"#unit/{uuid4()}")
+        created = OntologyAnnotation(term=normalized, id_=f"#unit/{self.new_id('unit', normalized)}")
         self.units_by_term[normalized] = created
         return created
 
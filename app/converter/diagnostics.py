@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Any, Dict, List
+
+MAX_DIAGNOSTIC_SAMPLES = 5
+
+
+@dataclass
+class Diagnostic:
+    code: str
+    message: str
+    count: int = 0
+    samples: List[Dict[str, Any]] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"code": self.code, "message": self.message, "count": self.count, "samples": self.samples}
+
+
+class ConversionDiagnostics:
+    """
+    Counted conversion issues (skipped runs, missing mappings, dropped units).
+
+    Each issue code keeps a count and the details of its first
+    ``max_samples`` occurrences, so a payload with thousands of runs yields
+    one entry per code rather than one log line per run.
+    """
+
+    def __init__(self, max_samples: int = MAX_DIAGNOSTIC_SAMPLES) -> None:
+        self.max_samples = max_samples
+        self._by_code: Dict[str, Diagnostic] = {}
+
+    def add(self, code: str, message: str, **details: Any) -> None:
+        diagnostic = self._by_code.get(code)
+        if diagnostic is None:
+            diagnostic = self._by_code[code] = Diagnostic(code=code, message=message)
+        diagnostic.count += 1
+        if len(diagnostic.samples) < self.max_samples:
+            diagnostic.samples.append(details)
+
+    def extend(self, diagnostics: List[Dict[str, Any]]) -> None:
+        """Add the issues of another conversion, as returned by its ``as_list``."""
+        for item in diagnostics:
+            diagnostic = self._by_code.get(item["code"])
+            if diagnostic is None:
+                diagnostic = self._by_code[item["code"]] = Diagnostic(code=item["code"], message=item["message"])
+            diagnostic.count += item["count"]
+            diagnostic.samples.extend(item["samples"][: max(0, self.max_samples - len(diagnostic.samples))])
+
+    def __bool__(self) -> bool:
+        return bool(self._by_code)
+
+    def counts(self) -> Dict[str, int]:
+        return {code: diagnostic.count for code, diagnostic in self._by_code.items()}
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        return [diagnostic.as_dict() for diagnostic in self._by_code.values()]
+
+    def log_summary(self, logger: Logger) -> None:
+        if self:
+            logger.warning(
+                "Conversion finished with diagnostics: %s",
+                ", ".join(f"{code}={count}" for code, count in self.counts().items()),
+                extra={"diagnostics": self.counts()},
+            )
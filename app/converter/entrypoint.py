@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, List, Optional
-from uuid import uuid4
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from isatools.model import (
     Characteristic,
@@ -21,159 +21,114 @@ from isatools.model import (
 
 from .assay_graph import append_assays_to_study
 from .context import ConversionContext
+from .diagnostics import ConversionDiagnostics
 from .factor_mapping import add_study_factors, assign_factor_values
+from .identifiers import payload_digest
+from .instrumentation import StageRecorder
 from .normalization import as_comment_value
+from .payload_model import PayloadModel, StudyModel, build_payload_model
 from .protocol_mapping import (
     build_measurement_parameters_for_sensor,
     build_processing_parameters_for_sensor,
 )
+from .study_cache import StudyCache, attach_study
 
 
-def create_isa_data(
-    isa_phm_info: Dict[str, Any],
-    output_path: Optional[str] = None,
-    logger: Optional[logging.Logger] = None,
+def _create_investigation(
+    model: PayloadModel,
+    output_path: Optional[str],
+    context: ConversionContext,
+    recorder: StageRecorder,
 ) -> Investigation:
-    logger = logger or logging.getLogger("isa_phm_converter")
-    context = ConversionContext()
-
-    investigation = Investigation()
-    investigation.filename = output_path if output_path else "isa_phm.json"
-    investigation.identifier = str(uuid4())
-    investigation.title = isa_phm_info.get("title", "")
-    investigation.description = isa_phm_info.get("description", "")
-    investigation.submission_date = isa_phm_info.get("submission_date", "")
-    investigation.public_release_date = isa_phm_info.get("public_release_date", "")
-    investigation.comments.append(Comment(name="ud_identifier", value=as_comment_value(isa_phm_info.get("identifier", ""))))
-    investigation.comments.append(Comment(name="experiment_type", value=as_comment_value(isa_phm_info.get("experiment_type", ""))))
-    investigation.comments.append(Comment(name="license", value=as_comment_value(isa_phm_info.get("license", ""))))
-
-    contacts: List[Dict[str, Any]] = isa_phm_info.get("contacts", [])
-    for contact in contacts:
-        person = Person()
-        person.first_name = contact.get("firstName", "")
-        person.mid_initials = contact.get("midInitials", "")
-        person.last_name = contact.get("lastName", "")
-        person.email = contact.get("email", "")
-        person.phone = contact.get("phone", "")
-        person.fax = contact.get("fax", "")
-        person.address = contact.get("address", "")
-        person.affiliation = "; ".join(contact.get("affiliations", []))
-        person.roles.extend(
-            [
-                role
-                for role in (context.get_or_create_role(role_name) for role_name in contact.get("roles", []))
-                if role is not None
-            ]
-        )
-        person.comments.append(Comment(name="orcid", value=as_comment_value(contact.get("orcid", ""))))
-        person.comments.append(Comment(name="author_id", value=as_comment_value(contact.get("id", ""))))
-        investigation.contacts.append(person)
-
-    publications: List[Dict[str, Any]] = isa_phm_info.get("publications", [])
-    for publication in publications:
-        publication_obj = Publication()
-        publication_obj.title = publication.get("title", "")
-        publication_obj.author_list = "; ".join(["#" + author for author in publication.get("contactList", [])])
-        publication_obj.status = OntologyAnnotation(publication.get("publicationStatus", "unknown"))
-        publication_obj.doi = publication.get("doi", "")
-        publication_obj.comments.append(
-            Comment(
-                name="Corresponding author ID",
-                value=as_comment_value(publication.get("correspondingContactId", "")),
+    isa_phm_info = model.raw
+    with recorder.stage("investigation_metadata"):
+        investigation = Investigation()
+        investigation.filename = output_path if output_path else "isa_phm.json"
+        investigation.identifier = context.new_id("investigation")
+        investigation.title = isa_phm_info.get("title", "")
+        investigation.description = isa_phm_info.get("description", "")
+        investigation.submission_date = isa_phm_info.get("submission_date", "")
+        investigation.public_release_date = isa_phm_info.get("public_release_date", "")
+        investigation.comments.append(Comment(name="ud_identifier", value=as_comment_value(isa_phm_info.get("identifier", ""))))
+        investigation.comments.append(Comment(name="experiment_type", value=as_comment_value(isa_phm_info.get("experiment_type", ""))))
+        investigation.comments.append(Comment(name="license", value=as_comment_value(isa_phm_info.get("license", ""))))
+
+    with recorder.stage("contacts_publications"):
+        contacts: List[Dict[str, Any]] = isa_phm_info.get("contacts", [])
+        for contact in contacts:
+            person = Person()
+            person.first_name = contact.get("firstName", "")
+            person.mid_initials = contact.get("midInitials", "")
+            person.last_name = contact.get("lastName", "")
+            person.email = contact.get("email", "")
+            person.phone = contact.get("phone", "")
+            person.fax = contact.get("fax", "")
+            person.address = contact.get("address", "")
+            person.affiliation = "; ".join(contact.get("affiliations", []))
+            person.roles.extend(
+                [
+                    role
+                    for role in (context.get_or_create_role(role_name) for role_name in contact.get("roles", []))
+                    if role is not None
+                ]
             )
-        )
-        investigation.publications.append(publication_obj)
-
-    global_measurement_protocol_defs = (
-        {protocol.get("id"): protocol for protocol in isa_phm_info.get("measurement_protocols", [])}
-        if isa_phm_info.get("measurement_protocols")
-        else {}
-    )
-    global_processing_defs = (
-        {protocol.get("id"): protocol for protocol in isa_phm_info.get("processing_protocols", [])}
-        if isa_phm_info.get("processing_protocols")
-        else {}
-    )
-
-    studies: List[Dict[str, Any]] = isa_phm_info.get("studies", [])
-    for study_index, study in enumerate(studies, start=1):
-        study_obj = Study()
-        study_obj.filename = f"s{study_index:02d}_.txt"
-        study_obj.identifier = study.get("id", "")
-        study_obj.title = study.get("name", "")
-        study_obj.description = study.get("description", "")
-        study_obj.submission_date = study.get("submissionDate", "")
-        study_obj.public_release_date = study.get("publicationDate", "")
-        study_obj.publications.extend(investigation.publications)
-        study_obj.contacts.extend(investigation.contacts)
-        study_obj.design_descriptors.append(OntologyAnnotation(study.get("experimentType", "Diagnostics")))
-
-        study_total_runs = study.get("total_runs", 1)
-        study_obj.comments.append(Comment(name="total_runs", value=as_comment_value(study_total_runs)))
-
-        test_setup = study.get("used_setup", {})
-        measurement_protocol_variants = test_setup.get("measurementProtocols", []) or []
-        processing_protocol_variants = test_setup.get("processingProtocols", []) or []
-
-        selected_measurement_protocol_id = (
-            study.get("selectedMeasurementProtocolId")
-            or study.get("selected_measurement_protocol_id")
-            or ""
-        )
-        selected_processing_protocol_id = (
-            study.get("selectedProcessingProtocolId")
-            or study.get("selected_processing_protocol_id")
-            or ""
-        )
-
-        selected_measurement_protocol = next(
-            (
-                protocol
-                for protocol in measurement_protocol_variants
-                if protocol.get("id") == selected_measurement_protocol_id
-            ),
-            None,
-        )
-        selected_processing_protocol = next(
-            (
-                protocol
-                for protocol in processing_protocol_variants
-                if protocol.get("id") == selected_processing_protocol_id
-            ),
-            None,
-        )
-
-        selected_measurement_parameters = (
-            selected_measurement_protocol.get("parameters", [])
-            if selected_measurement_protocol
-            else ([] if measurement_protocol_variants else isa_phm_info.get("measurement_protocols", []))
-        )
-        selected_processing_parameters = (
-            selected_processing_protocol.get("parameters", [])
-            if selected_processing_protocol
-            else ([] if processing_protocol_variants else isa_phm_info.get("processing_protocols", []))
-        )
+            person.comments.append(Comment(name="orcid", value=as_comment_value(contact.get("orcid", ""))))
+            person.comments.append(Comment(name="author_id", value=as_comment_value(contact.get("id", ""))))
+            investigation.contacts.append(person)
+
+        publications: List[Dict[str, Any]] = isa_phm_info.get("publications", [])
+        for publication in publications:
+            publication_obj = Publication()
+            publication_obj.title = publication.get("title", "")
+            publication_obj.author_list = "; ".join(["#" + author for author in publication.get("contactList", [])])
+            publication_obj.status = OntologyAnnotation(publication.get("publicationStatus", "unknown"))
+            publication_obj.doi = publication.get("doi", "")
+            publication_obj.comments.append(
+                Comment(
+                    name="Corresponding author ID",
+                    value=as_comment_value(publication.get("correspondingContactId", "")),
+                )
+            )
+            investigation.publications.append(publication_obj)
 
-        measurement_protocol_defs = (
-            {parameter.get("id"): parameter for parameter in selected_measurement_parameters if parameter.get("id")}
-            if selected_measurement_parameters
-            else (global_measurement_protocol_defs if not measurement_protocol_variants else {})
-        )
+    return investigation
 
-        processing_defs = (
-            {parameter.get("id"): parameter for parameter in selected_processing_parameters if parameter.get("id")}
-            if selected_processing_parameters
-            else (global_processing_defs if not processing_protocol_variants else {})
-        )
 
+def _convert_study(
+    study_index: int,
+    study_model: StudyModel,
+    model: PayloadModel,
+    investigation: Investigation,
+    context: ConversionContext,
+    diagnostics: ConversionDiagnostics,
+    recorder: StageRecorder,
+) -> Study:
+    study = study_model.raw
+    measurement = study_model.measurement
+    processing = study_model.processing
+    study_obj = Study()
+    study_obj.filename = f"s{study_index:02d}_.txt"
+    study_obj.identifier = study.get("id", "")
+    study_obj.title = study.get("name", "")
+    study_obj.description = study.get("description", "")
+    study_obj.submission_date = study.get("submissionDate", "")
+    study_obj.public_release_date = study.get("publicationDate", "")
+    study_obj.publications.extend(investigation.publications)
+    study_obj.contacts.extend(investigation.contacts)
+    study_obj.design_descriptors.append(OntologyAnnotation(study.get("experimentType", "Diagnostics")))
+
+    study_total_runs = study.get("total_runs", 1)
+    study_obj.comments.append(Comment(name="total_runs", value=as_comment_value(study_total_runs)))
+
+    with recorder.stage("protocols"):
+        test_setup = study_model.setup.raw
         experiment_prep_protocol = Protocol(
             name=test_setup.get("experimentPreparationProtocolName", "Experiment Preparation")
         )
         experiment_prep_protocol.protocol_type = OntologyAnnotation("Experiment Preparation Protocol")
         study_obj.protocols.append(experiment_prep_protocol)
 
-        for sensor in test_setup.get("sensors", []):
+        for sensor in study_model.setup.sensors:
             sensor_id = (
                 sensor.get("id", "")
                 or sensor.get("name", "")
@@ -191,20 +146,20 @@ def create_isa_data(
             measurement_protocol.comments.append(
                 Comment(
                     name="selected_measurement_protocol_id",
-                    value=as_comment_value(selected_measurement_protocol_id),
+                    value=as_comment_value(measurement.selected_id),
                 )
             )
             measurement_protocol.parameters.extend(
                 build_measurement_parameters_for_sensor(
-                    study,
+                    measurement.entries_for_source(sensor.get("id")),
                     sensor,
-                    measurement_protocol_defs,
-                    selected_protocol_id=selected_measurement_protocol_id,
+                    measurement.parameter_defs,
+                    selected_protocol_id=measurement.selected_id,
                 )
             )
             study_obj.protocols.append(measurement_protocol)
 
-        for sensor in test_setup.get("sensors", []):
+        for sensor in study_model.setup.sensors:
             sensor_id = (
                 sensor.get("id", "")
                 or sensor.get("name", "")
@@ -222,19 +177,20 @@ def create_isa_data(
             processing_protocol.comments.append(
                 Comment(
                     name="selected_processing_protocol_id",
-                    value=as_comment_value(selected_processing_protocol_id),
+                    value=as_comment_value(processing.selected_id),
                 )
             )
             processing_protocol.parameters.extend(
                 build_processing_parameters_for_sensor(
-                    study,
+                    processing.entries_for_source(sensor.get("id")),
                     sensor,
-                    processing_defs,
-                    selected_protocol_id=selected_processing_protocol_id,
+                    processing.parameter_defs,
+                    selected_protocol_id=processing.selected_id,
                 )
             )
             study_obj.protocols.append(processing_protocol)
 
+    with recorder.stage("samples"):
         source = Source(name=test_setup.get("name", "Test Setup"))
         source.comments.append(Comment(name="description", value=as_comment_value(test_setup.get("description", ""))))
         for characteristic in test_setup.get("characteristics", []):
@@ -277,42 +233,151 @@ def create_isa_data(
                     Characteristic(category=detail_category, value=detail.get("value", ""))
                 )
 
-        study_variables = isa_phm_info.get("study_variables", [])
-        add_study_factors(study_obj, study_variables)
-
         study_obj.samples = batch_create_materials(dummy_sample, n=study_total_runs)
         for sample in study_obj.samples:
             sample.id = ""
 
+    with recorder.stage("factor_values"):
+        add_study_factors(study_obj, model.study_variables)
+
         assign_factor_values(
             study_obj=study_obj,
-            study_payload=study,
-            study_variables=study_variables,
+            study_model=study_model,
+            study_variables=model.study_variables,
             study_total_runs=study_total_runs,
             add_unit_to_study=context.add_unit_to_study,
-            logger=logger,
+            diagnostics=diagnostics,
         )
 
-        experiment_preparation_process = Process(executes_protocol=experiment_prep_protocol)
-        experiment_preparation_process.inputs.append(source)
-        for sample in study_obj.samples:
-            experiment_preparation_process.outputs.append(sample)
-        study_obj.process_sequence.append(experiment_preparation_process)
+    experiment_preparation_process = Process(executes_protocol=experiment_prep_protocol)
+    experiment_preparation_process.inputs.append(source)
+    for sample in study_obj.samples:
+        experiment_preparation_process.outputs.append(sample)
+    study_obj.process_sequence.append(experiment_preparation_process)
 
+    with recorder.stage("assays"):
         append_assays_to_study(
             study_obj=study_obj,
-            study_payload=study,
+            study_model=study_model,
             dummy_sample=dummy_sample,
-            selected_measurement_protocol_id=selected_measurement_protocol_id,
-            selected_processing_protocol_id=selected_processing_protocol_id,
-            measurement_protocol_variants=measurement_protocol_variants,
-            processing_protocol_variants=processing_protocol_variants,
-            measurement_protocol_defs=measurement_protocol_defs,
-            processing_defs=processing_defs,
             add_unit_to_study=context.add_unit_to_study,
-            logger=logger,
+            diagnostics=diagnostics,
         )
 
-        investigation.studies.append(study_obj)
+    return study_obj
+
+
+@dataclass
+class _ConversionRun:
+    model: PayloadModel
+    recorder: StageRecorder
+    context: ConversionContext
+    investigation: Investigation
+    # Cache entries used instead of converting, by study index.
+    cached: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    # Cache key and diagnostics of the studies converted with a cache, by study index.
+    converted: Dict[int, Tuple[str, List[Dict[str, Any]]]] = field(default_factory=dict)
+
+
+def _convert_payload(
+    isa_phm_info: Union[Dict[str, Any], PayloadModel],
+    output_path: Optional[str],
+    logger: Optional[logging.Logger],
+    deterministic_ids: bool,
+    recorder: Optional[StageRecorder],
+    diagnostics: Optional[ConversionDiagnostics],
+    study_cache: Optional[StudyCache],
+) -> _ConversionRun:
+    """
+    Convert every study that ``study_cache`` (if any) does not already hold.
+
+    Studies taken from the cache are left out of ``investigation.studies``;
+    their entries are returned in ``_ConversionRun.cached`` instead.
+    """
+    model = build_payload_model(isa_phm_info)
+    logger = logger or logging.getLogger("isa_phm_converter")
+    recorder = recorder or StageRecorder()
+    context = ConversionContext(
+        id_seed=payload_digest(model.raw) if deterministic_ids else None,
+        diagnostics=diagnostics if diagnostics is not None else ConversionDiagnostics(),
+    )
+    run = _ConversionRun(model, recorder, context, _create_investigation(model, output_path, context, recorder))
 
-    return investigation
+    for study_index, study_model in enumerate(model.studies, start=1):
+        if study_cache is None:
+            run.investigation.studies.append(
+                _convert_study(study_index, study_model, model, run.investigation, context, context.diagnostics, recorder)
+            )
+            continue
+
+        with recorder.stage("study_cache"):
+            key = study_cache.key(model, study_index, study_model.raw)
+            entry = study_cache.load(key)
+        if entry is not None:
+            context.diagnostics.extend(entry["diagnostics"])
+            run.cached[study_index] = entry
+            continue
+        # Collected per study so they can be cached with it and replayed in the same order on a hit.
+        study_diagnostics = ConversionDiagnostics(context.diagnostics.max_samples)
+        run.investigation.studies.append(
+            _convert_study(study_index, study_model, model, run.investigation, context, study_diagnostics, recorder)
+        )
+        context.diagnostics.extend(study_diagnostics.as_list())
+        run.converted[study_index] = (key, study_diagnostics.as_list())
+
+    context.diagnostics.log_summary(logger)
+    return run
+
+
+def create_isa_data(
+    isa_phm_info: Union[Dict[str, Any], PayloadModel],
+    output_path: Optional[str] = None,
+    logger: Optional[logging.Logger] = None,
+    deterministic_ids: bool = False,
+    recorder: Optional[StageRecorder] = None,
+    diagnostics: Optional[ConversionDiagnostics] = None,
+) -> Investigation:
+    return _convert_payload(
+        isa_phm_info, output_path, logger, deterministic_ids, recorder, diagnostics, study_cache=None
+    ).investigation
+
+
+def create_isa_document(
+    isa_phm_info: Union[Dict[str, Any], PayloadModel],
+    output_path: Optional[str] = None,
+    logger: Optional[logging.Logger] = None,
+    deterministic_ids: bool = False,
+    recorder: Optional[StageRecorder] = None,
+    diagnostics: Optional[ConversionDiagnostics] = None,
+    study_cache: Optional[StudyCache] = None,
+) -> Dict[str, Any]:
+    """
+    The ISA-JSON document of :func:`create_isa_data`, as ``Investigation.to_dict()`` returns it.
+
+    With a ``study_cache``, studies whose inputs were converted before are
+    taken from the cache and only the others are converted; the document and
+    the diagnostics are the same as without it, except for the random ids of
+    the cached studies.
+    """
+    run = _convert_payload(isa_phm_info, output_path, logger, deterministic_ids, recorder, diagnostics, study_cache)
+    with run.recorder.stage("serialization"):
+        document = run.investigation.to_dict()
+    if study_cache is None:
+        return document
+
+    with run.recorder.stage("study_cache"):
+        converted_documents = iter(document["studies"])
+        studies = []
+        for study_index in range(1, len(run.model.studies) + 1):
+            if study_index in run.cached:
+                studies.append(
+                    attach_study(run.cached[study_index], document, lambda term: run.context.get_or_create_unit(term).id)
+                )
+                continue
+            study_document = next(converted_documents)
+            key, study_diagnostics = run.converted[study_index]
+            study_cache.store(key, study_document, study_diagnostics)
+            studies.append(study_document)
+        document["studies"] = studies
+        study_cache.prune()
+    return document
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from logging import Logger
 from typing import Any, Callable, Dict, List
 
 from isatools.model import Comment, FactorValue, OntologyAnnotation, Study, StudyFactor
 
+from .diagnostics import ConversionDiagnostics
 from .normalization import as_comment_value
+from .payload_model import StudyModel
 
 
 def add_study_factors(study_obj: Study, study_variables: List[Dict[str, Any]]) -> None:
@@ -24,11 +25,11 @@ def add_study_factors(study_obj: Study, study_variables: List[Dict[str, Any]]) -
 
 def assign_factor_values(
     study_obj: Study,
-    study_payload: Dict[str, Any],
+    study_model: StudyModel,
     study_variables: List[Dict[str, Any]],
     study_total_runs: int,
     add_unit_to_study: Callable[[Study, Any], Any],
-    logger: Logger,
+    diagnostics: ConversionDiagnostics,
 ) -> None:
     for run_number in range(1, study_total_runs + 1):
         sample = study_obj.samples[run_number - 1]
@@ -37,23 +38,22 @@ def assign_factor_values(
             variable_name = variable.get("name", "")
             study_factor = next((factor for factor in study_obj.factors if factor.name == variable_name), None)
             if not study_factor:
-                logger.warning("Missing study factor for variable", extra={"variable_name": variable_name})
+                diagnostics.add(
+                    "missing_study_factor",
+                    "Missing study factor for variable",
+                    variable_name=variable_name,
+                    run_number=run_number,
+                )
                 continue
 
-            mapping = next(
-                (
-                    mapping_value
-                    for mapping_value in study_payload.get("study_to_study_variable_mapping", [])
-                    if mapping_value.get("variableName") == variable_name
-                    and mapping_value.get("runNumber") == run_number
-                ),
-                None,
-            )
+            mapping = study_model.mapping_for(variable_name, run_number)
 
             if not mapping:
-                logger.warning(
+                diagnostics.add(
+                    "missing_variable_mapping",
                     "No mapping found for run variable",
-                    extra={"variable_name": variable_name, "run_number": run_number},
+                    variable_name=variable_name,
+                    run_number=run_number,
                 )
                 continue
 
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from typing import Any, Dict
+from uuid import NAMESPACE_URL, uuid5
+
+ID_NAMESPACE = uuid5(NAMESPACE_URL, "https://github.com/NathanHouwaart/ISA-PHM-Backend")
+
+_GENERATED_ID_PATTERN = re.compile(
+    r"^(#[a-z_]+/)([0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12})$"
+)
+
+
+def payload_digest(isa_phm_info: Dict[str, Any]) -> str:
+    canonical = json.dumps(isa_phm_info, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    # json.loads accepts lone surrogate escapes ("\ud800"), which strict UTF-8 cannot encode.
+    return hashlib.sha256(canonical.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def deterministic_uuid(seed: str, *parts: Any) -> str:
+    return str(uuid5(ID_NAMESPACE, ":".join([seed, *(str(part) for part in parts)])))
+
+
+def relabel_generated_ids(isa_json: Any, seed: str) -> Any:
+    """
+    Replace random ``@id`` values assigned by isatools with seeded ones.
+
+    isatools gives every identifiable object a ``#<kind>/<uuid4>`` id. Each
+    distinct uuid4 is renumbered in order of first appearance (walking keys in
+    sorted order, like the serialized output), so identical inputs produce
+    identical ids. Ids that share a uuid across kinds (e.g. a characteristic
+    category and its ontology annotation) keep sharing it. Ids that are not
+    uuid4-based, such as seeded unit ids, are left untouched.
+    """
+    relabeled: Dict[str, str] = {}
+
+    def _relabel(value: str) -> str:
+        match = _GENERATED_ID_PATTERN.match(value)
+        if not match:
+            return value
+        prefix, token = match.groups()
+        replacement = relabeled.get(token)
+        if replacement is None:
+            replacement = deterministic_uuid(seed, "id", len(relabeled))
+            relabeled[token] = replacement
+        return prefix + replacement
+
+    def _walk(node: Any) -> Any:
+        if isinstance(node, dict):
+            return {
+                key: _relabel(node[key]) if key == "@id" and isinstance(node[key], str) else _walk(node[key])
+                for key in sorted(node)
+            }
+        if isinstance(node, list):
+            return [_walk(item) for item in node]
+        return node
+
+    return _walk(isa_json)
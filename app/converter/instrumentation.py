@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import sysconfig
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List
+
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+_STDLIB_PREFIX = sysconfig.get_paths()["stdlib"].rstrip("/") + "/"
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_STDLIB_PREFIX):
+        return filename[len(_STDLIB_PREFIX):]
+    for marker in ("site-packages/", "/app/"):
+        index = filename.rfind(marker)
+        if index != -1:
+            return filename[index + len(marker):]
+    return filename
+
+
+@dataclass
+class _StageTiming:
+    calls: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "seconds": round(self.seconds, 6)}
+
+
+@dataclass
+class _StageMemory:
+    calls: int = 0
+    peak_bytes: int = 0
+    net_bytes: int = 0
+    sites: Dict[str, List[int]] = field(default_factory=dict)
+
+    def record(self, peak_bytes: int, net_bytes: int, differences: List[tracemalloc.StatisticDiff]) -> None:
+        self.calls += 1
+        self.peak_bytes = max(self.peak_bytes, peak_bytes)
+        self.net_bytes += net_bytes
+        for difference in differences:
+            if difference.size_diff <= 0:
+                continue
+            frame = difference.traceback[0]
+            totals = self.sites.setdefault(f"{_short_path(frame.filename)}:{frame.lineno}", [0, 0])
+            totals[0] += difference.size_diff
+            totals[1] += difference.count_diff
+
+    def as_dict(self, top_sites: int) -> Dict[str, Any]:
+        ranked = sorted(self.sites.items(), key=lambda item: -item[1][0])[:top_sites]
+        return {
+            "calls": self.calls,
+            "peak_bytes": self.peak_bytes,
+            "net_bytes": self.net_bytes,
+            "top_sites": [{"site": site, "size_bytes": size, "count": count} for site, (size, count) in ranked],
+        }
+
+
+class StageRecorder:
+    """
+    Collects measurements for the named stages of one conversion.
+
+    Wrap each stage in ``with recorder.stage(name):``. A stage that runs
+    several times, such as once per study, is aggregated under one name.
+    Wall-clock time and the number of calls are always recorded. With
+    ``trace_memory`` the recorder uses ``tracemalloc`` to record, per
+    stage, the peak traced memory above the stage's starting point, the net
+    retained allocation and the top allocation sites (by line). Tracing
+    slows the conversion down several times, so it is opt-in, and stages
+    must not be nested because the tracemalloc peak is reset per stage.
+    """
+
+    def __init__(self, trace_memory: bool = False, top_sites: int = 10) -> None:
+        self.trace_memory = trace_memory
+        self.top_sites = top_sites
+        self._timings: Dict[str, _StageTiming] = {}
+        self._memory: Dict[str, _StageMemory] = {}
+        self._peak_traced_bytes = 0
+        self._owns_tracing = False
+
+    def start(self) -> None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+
+    def stop(self) -> None:
+        if self._owns_tracing:
+            self._peak_traced_bytes = max(self._peak_traced_bytes, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            before = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+            tracemalloc.reset_peak()
+            start_bytes = tracemalloc.get_traced_memory()[0]
+        # Started after the snapshot so that tracing overhead is not timed.
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            timing = self._timings.setdefault(name, _StageTiming())
+            timing.calls += 1
+            timing.seconds += elapsed
+            if tracing:
+                self._record_memory(name, before, start_bytes)
+
+    def _record_memory(self, name: str, before: tracemalloc.Snapshot, start_bytes: int) -> None:
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        self._peak_traced_bytes = max(self._peak_traced_bytes, peak_bytes)
+        self._memory.setdefault(name, _StageMemory()).record(
+            peak_bytes - start_bytes,
+            current_bytes - start_bytes,
+            after.compare_to(before, "lineno"),
+        )
+
+    def timing_report(self) -> Dict[str, Dict[str, Any]]:
+        """Seconds and calls per stage, in the order the stages first ran."""
+        return {name: timing.as_dict() for name, timing in self._timings.items()}
+
+    def memory_report(self) -> Dict[str, Any]:
+        return {
+            "peak_traced_bytes": self._peak_traced_bytes,
+            "stages": {name: memory.as_dict(self.top_sites) for name, memory in self._memory.items()},
+        }
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from isatools import isajson
+from isatools.isajson import ISAJSONEncoder
+from isatools.model import Investigation
+
+IGNORED_ERROR_CODES = {4002}
+
+
+def _issue_code_as_int(issue: Dict[str, Any]) -> Optional[int]:
+    code = issue.get("code")
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_investigation(investigation: Union[Investigation, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Validate an in-memory investigation (or its ``to_dict()`` document) with the isatools ISA-JSON validator.
+
+    The validator re-opens ``fp.name`` for its encoding check, so the
+    investigation is encoded once into an ASCII-safe temp file (the same
+    normalization ``tools/verify-isa-json.py`` applies) and validated from there.
+    """
+    temp_path: Optional[str] = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            mode="w",
+            encoding="utf-8",
+            newline="\n",
+            suffix=".json",
+            delete=False,
+        ) as temp_handle:
+            temp_path = temp_handle.name
+            json.dump(investigation, temp_handle, cls=ISAJSONEncoder, ensure_ascii=True, separators=(",", ":"))
+
+        with open(temp_path, "r", encoding="utf-8") as handle:
+            report = isajson.validate(handle, log_level=logging.WARNING)
+    finally:
+        if temp_path:
+            Path(temp_path).unlink(missing_ok=True)
+
+    errors: List[Dict[str, Any]] = report.get("errors", [])
+    blocking_errors = [error for error in errors if _issue_code_as_int(error) not in IGNORED_ERROR_CODES]
+    ignored_errors = [error for error in errors if _issue_code_as_int(error) in IGNORED_ERROR_CODES]
+
+    return {
+        "valid": not blocking_errors,
+        "errors": blocking_errors,
+        "ignored_errors": ignored_errors,
+        "warnings": report.get("warnings", []),
+    }
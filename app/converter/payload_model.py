@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+from .identifiers import payload_digest
+
+# Stdlib-only: the API imports this module for semantic validation without loading isatools.
+
+
+def as_list(value: Any) -> List[Any]:
+    return value if isinstance(value, list) else []
+
+
+def as_object(value: Any) -> Dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+
+def index_by_id(items: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Objects in ``items`` by their non-empty string ``id``; the last one wins."""
+    result: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        item_id = as_object(item).get("id")
+        if isinstance(item_id, str) and item_id:
+            result[item_id] = item
+    return result
+
+
+def parameter_ids(protocol: Optional[Dict[str, Any]]) -> Set[str]:
+    """Non-empty string ids of the parameters of a protocol variant."""
+    if not protocol:
+        return set()
+    return set(index_by_id(as_list(protocol.get("parameters"))))
+
+
+def _selected_id(study: Dict[str, Any], camel_key: str, snake_key: str) -> Any:
+    return study.get(camel_key) or study.get(snake_key) or ""
+
+
+def _first_with_id(items: List[Any], item_id: Any) -> Optional[Dict[str, Any]]:
+    return next((item for item in items if isinstance(item, dict) and item.get("id") == item_id), None)
+
+
+def _entries_by_source(assays: List[Any], key: str) -> Tuple[List[Any], Dict[str, List[Any]]]:
+    entries: List[Any] = []
+    by_source: Dict[str, List[Any]] = {}
+    for assay in assays:
+        for entry in as_list(as_object(assay).get(key)):
+            entries.append(entry)
+            source_id = as_object(entry).get("sourceId")
+            if isinstance(source_id, str):
+                by_source.setdefault(source_id, []).append(entry)
+    return entries, by_source
+
+
+class SetupProtocols:
+    """
+    The measurement or processing protocol variants of one test setup.
+
+    ``resolve``, ``parameter_ids`` and ``all_parameter_ids`` are computed on
+    first use and memoized for every study sharing the setup.
+    ``protocol_by_id`` follows the validator: the variants, or the global
+    protocols when the setup has none.
+    """
+
+    __slots__ = (
+        "variants",
+        "global_protocols",
+        "protocol_by_id",
+        "_all_parameter_ids",
+        "_parameter_ids",
+        "_resolved",
+    )
+
+    def __init__(
+        self,
+        variants: List[Any],
+        global_protocols: List[Any],
+        global_protocol_by_id: Dict[str, Dict[str, Any]],
+    ) -> None:
+        self.variants = variants
+        self.global_protocols = global_protocols
+        self.protocol_by_id = index_by_id(variants) if variants else global_protocol_by_id
+        self._all_parameter_ids: Optional[FrozenSet[str]] = None
+        self._parameter_ids: Dict[str, FrozenSet[str]] = {}
+        self._resolved: Dict[Hashable, Tuple[Optional[Dict[str, Any]], List[Any], Dict[Any, Dict[str, Any]]]] = {}
+
+    def all_parameter_ids(self) -> FrozenSet[str]:
+        """Parameter ids of every protocol in ``protocol_by_id``."""
+        if self._all_parameter_ids is None:
+            self._all_parameter_ids = frozenset().union(*map(parameter_ids, self.protocol_by_id.values()))
+        return self._all_parameter_ids
+
+    def parameter_ids(self, protocol_id: str) -> FrozenSet[str]:
+        """Parameter ids of ``protocol_by_id[protocol_id]`` (empty if unknown)."""
+        cached = self._parameter_ids.get(protocol_id)
+        if cached is None:
+            cached = self._parameter_ids[protocol_id] = frozenset(parameter_ids(self.protocol_by_id.get(protocol_id)))
+        return cached
+
+    def resolve(self, selected_id: Any) -> Tuple[Optional[Dict[str, Any]], List[Any], Dict[Any, Dict[str, Any]]]:
+        """
+        ``(selected, parameters, parameter_defs)`` for ``selected_id``, as the converter uses them.
+
+        ``selected`` is the first variant with that id. ``parameters`` are its
+        parameters, or the global protocol list when the setup has no
+        variants; ``parameter_defs`` indexes them by truthy id, last one wins.
+        """
+        try:
+            return self._resolved[selected_id]
+        except KeyError:
+            resolved = self._resolved[selected_id] = self._resolve(selected_id)
+            return resolved
+        except TypeError:  # unhashable id from a malformed payload
+            return self._resolve(selected_id)
+
+    def _resolve(self, selected_id: Any) -> Tuple[Optional[Dict[str, Any]], List[Any], Dict[Any, Dict[str, Any]]]:
+        selected = _first_with_id(self.variants, selected_id)
+        if selected:
+            parameters = selected.get("parameters", [])
+        else:
+            parameters = [] if self.variants else self.global_protocols
+        parameter_defs = (
+            {parameter.get("id"): parameter for parameter in parameters if parameter.get("id")} if parameters else {}
+        )
+        return selected, parameters, parameter_defs
+
+
+class SetupModel:
+    """A ``used_setup`` and what is derived from it."""
+
+    __slots__ = ("raw", "sensors", "sensor_ids", "measurement", "processing")
+
+    def __init__(self, raw: Dict[str, Any], payload: PayloadModel) -> None:
+        self.raw = raw
+        self.sensors = as_list(raw.get("sensors"))
+        self.sensor_ids = frozenset(
+            str(sensor.get("id"))
+            for sensor in self.sensors
+            if isinstance(sensor, dict) and sensor.get("id") not in (None, "")
+        )
+        self.measurement = SetupProtocols(
+            as_list(raw.get("measurementProtocols")),
+            payload.measurement_protocols,
+            payload.measurement_protocol_by_id,
+        )
+        self.processing = SetupProtocols(
+            as_list(raw.get("processingProtocols")),
+            payload.processing_protocols,
+            payload.processing_protocol_by_id,
+        )
+
+
+class ProtocolSelection:
+    """
+    One study's choice among its setup's measurement or processing protocols,
+    plus the study's assay protocol entries of that kind.
+    """
+
+    __slots__ = (
+        "setup_protocols",
+        "variants",
+        "selected_id",
+        "selected",
+        "parameters",
+        "parameter_defs",
+        "_assays",
+        "_entries_key",
+        "_entries",
+        "_entries_by_source",
+    )
+
+    def __init__(self, setup_protocols: SetupProtocols, selected_id: Any, assays: List[Any], entries_key: str) -> None:
+        self.setup_protocols = setup_protocols
+        self.variants = setup_protocols.variants
+        self.selected_id = selected_id
+        self.selected, self.parameters, self.parameter_defs = setup_protocols.resolve(selected_id)
+        self._assays = assays
+        self._entries_key = entries_key
+        self._entries: Optional[List[Any]] = None
+        self._entries_by_source: Dict[str, List[Any]] = {}
+
+    def entries_for_source(self, source_id: Any) -> List[Any]:
+        """
+        Assay protocol entries that can belong to ``source_id``, in assay order.
+
+        Only a pre-filter: entries without a string ``sourceId`` never equal a
+        string sensor id, and a sensor without an id accepts every entry.
+        Indexed on first use; semantic validation walks the assays itself.
+        """
+        if self._entries is None:
+            self._entries, self._entries_by_source = _entries_by_source(self._assays, self._entries_key)
+        if isinstance(source_id, str) and source_id:
+            return self._entries_by_source.get(source_id, [])
+        return self._entries
+
+
+class StudyModel:
+    __slots__ = (
+        "raw",
+        "setup",
+        "assays",
+        "measurement",
+        "processing",
+        "mappings",
+        "_mapping_by_variable_run",
+    )
+
+    def __init__(self, raw: Dict[str, Any], payload: PayloadModel) -> None:
+        self.raw = raw
+        self.setup = payload.setup_model(as_object(raw.get("used_setup")))
+        self.assays = as_list(raw.get("assay_details"))
+        self.measurement = ProtocolSelection(
+            self.setup.measurement,
+            _selected_id(raw, "selectedMeasurementProtocolId", "selected_measurement_protocol_id"),
+            self.assays,
+            "measurement_protocols",
+        )
+        self.processing = ProtocolSelection(
+            self.setup.processing,
+            _selected_id(raw, "selectedProcessingProtocolId", "selected_processing_protocol_id"),
+            self.assays,
+            "processing_protocols",
+        )
+        self.mappings = as_list(raw.get("study_to_study_variable_mapping"))
+        self._mapping_by_variable_run: Optional[Dict[Tuple[Hashable, Hashable], Dict[str, Any]]] = None
+
+    def mapping_for(self, variable_name: Any, run_number: int) -> Optional[Dict[str, Any]]:
+        """The first mapping of ``variable_name`` for ``run_number`` (indexed on first use)."""
+        if self._mapping_by_variable_run is None:
+            self._mapping_by_variable_run = {}
+            for mapping in self.mappings:
+                mapping = as_object(mapping)
+                try:
+                    self._mapping_by_variable_run.setdefault((mapping.get("variableName"), mapping.get("runNumber")), mapping)
+                except TypeError:  # unhashable name or run number; it can never match a lookup
+                    continue
+        try:
+            return self._mapping_by_variable_run.get((variable_name, run_number))
+        except TypeError:
+            return None
+
+
+class PayloadModel:
+    """
+    One normalization pass over an ISA-PHM payload.
+
+    Resolves the aliased keys (``selectedMeasurementProtocolId`` or
+    ``selected_measurement_protocol_id``, ...) and precomputes the protocol,
+    sensor and mapping indexes that semantic validation and the converter
+    both need. ``raw`` keeps the payload itself for everything else.
+
+    Studies whose ``used_setup`` has the same content share one
+    :class:`SetupModel`, keyed by a digest of the setup's canonical JSON, so
+    its protocol maps are resolved once however many studies repeat it.
+    """
+
+    __slots__ = (
+        "raw",
+        "study_variables",
+        "study_variable_by_id",
+        "measurement_protocols",
+        "measurement_protocol_by_id",
+        "processing_protocols",
+        "processing_protocol_by_id",
+        "setups",
+        "studies",
+    )
+
+    def __init__(self, raw: Dict[str, Any]) -> None:
+        self.raw = raw
+        self.study_variables = as_list(raw.get("study_variables"))
+        self.study_variable_by_id = index_by_id(self.study_variables)
+        self.measurement_protocols = as_list(raw.get("measurement_protocols"))
+        self.measurement_protocol_by_id = index_by_id(self.measurement_protocols)
+        self.processing_protocols = as_list(raw.get("processing_protocols"))
+        self.processing_protocol_by_id = index_by_id(self.processing_protocols)
+        self.setups: Dict[str, SetupModel] = {}
+        self.studies = [StudyModel(as_object(study), self) for study in as_list(raw.get("studies"))]
+
+    def setup_model(self, setup: Dict[str, Any]) -> SetupModel:
+        try:
+            key = payload_digest(setup)
+        except (TypeError, ValueError):  # not JSON-serializable: only this object can match
+            # The model keeps ``setup`` referenced, so its id cannot be reused meanwhile.
+            key = f"id:{id(setup)}"
+        model = self.setups.get(key)
+        if model is None:
+            model = self.setups[key] = SetupModel(setup, self)
+        return model
+
+
+def build_payload_model(payload: Any) -> PayloadModel:
+    """``payload`` as a :class:`PayloadModel`; a model is returned unchanged."""
+    if isinstance(payload, PayloadModel):
+        return payload
+    return PayloadModel(as_object(payload))
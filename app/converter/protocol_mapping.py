@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from isatools.model import OntologyAnnotation, ProtocolParameter
 
@@ -33,28 +33,27 @@ def parse_protocol_entry(
 
 
 def build_processing_parameters_for_sensor(
-    study: Dict[str, Any],
+    entries: Iterable[Dict[str, Any]],
     sensor: Dict[str, Any],
     processing_defs: Dict[str, Dict[str, Any]],
     selected_protocol_id: Optional[str] = None,
 ) -> List[ProtocolParameter]:
     params: List[ProtocolParameter] = []
-    target_ids = set()
+    target_ids: Dict[str, None] = {}
 
     sensor_id = sensor.get("id")
-    for assay in study.get("assay_details", []):
-        for entry in assay.get("processing_protocols", []):
-            parsed = parse_protocol_entry(
-                entry,
-                sensor_id,
-                processing_defs,
-                expected_protocol_id=selected_protocol_id,
-            )
-            if not parsed:
-                continue
-            target_id, _, _, _ = parsed
-            if target_id:
-                target_ids.add(target_id)
+    for entry in entries:
+        parsed = parse_protocol_entry(
+            entry,
+            sensor_id,
+            processing_defs,
+            expected_protocol_id=selected_protocol_id,
+        )
+        if not parsed:
+            continue
+        target_id, _, _, _ = parsed
+        if target_id:
+            target_ids[target_id] = None
 
     if processing_defs:
         for parameter_id in processing_defs.keys():
@@ -70,28 +69,27 @@ def build_processing_parameters_for_sensor(
 
 
 def build_measurement_parameters_for_sensor(
-    study: Dict[str, Any],
+    entries: Iterable[Dict[str, Any]],
     sensor: Dict[str, Any],
     measurement_defs: Dict[str, Dict[str, Any]],
     selected_protocol_id: Optional[str] = None,
 ) -> List[ProtocolParameter]:
     params: List[ProtocolParameter] = []
-    target_ids = set()
+    target_ids: Dict[str, None] = {}
 
     sensor_id = sensor.get("id")
-    for assay in study.get("assay_details", []):
-        for entry in assay.get("measurement_protocols", []):
-            parsed = parse_protocol_entry(
-                entry,
-                sensor_id,
-                measurement_defs,
-                expected_protocol_id=selected_protocol_id,
-            )
-            if not parsed:
-                continue
-            target_id, _, _, _ = parsed
-            if target_id:
-                target_ids.add(target_id)
+    for entry in entries:
+        parsed = parse_protocol_entry(
+            entry,
+            sensor_id,
+            measurement_defs,
+            expected_protocol_id=selected_protocol_id,
+        )
+        if not parsed:
+            continue
+        target_id, _, _, _ = parsed
+        if target_id:
+            target_ids[target_id] = None
 
     if measurement_defs:
         for parameter_id in measurement_defs.keys():
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter, deque
+from types import FrameType
+from typing import Deque, Dict, Mapping, Optional, Tuple
+
+# Innermost frames of threads that are blocked rather than running Python code.
+IDLE_FRAMES = {
+    ("threading", "Condition.wait"),
+    ("threading", "Event.wait"),
+    ("threading", "Thread._wait_for_tstate_lock"),
+    ("selectors", "EpollSelector.select"),
+    ("selectors", "KqueueSelector.select"),
+    ("selectors", "PollSelector.select"),
+    ("selectors", "SelectSelector.select"),
+    ("concurrent.futures.thread", "_worker"),
+}
+TRUNCATED_STACK = "[truncated]"
+
+
+def _frame_label(frame: FrameType) -> Tuple[str, str]:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return module, getattr(code, "co_qualname", code.co_name)
+
+
+def collapse_stack(frame: FrameType, thread_name: str, max_depth: int) -> Optional[str]:
+    """
+    Render a thread's stack in collapsed format (``root;...;leaf``).
+
+    Returns ``None`` for idle threads. Only the ``max_depth`` innermost
+    frames are kept.
+    """
+    labels = []
+    current: Optional[FrameType] = frame
+    while current is not None and len(labels) < max_depth:
+        labels.append(_frame_label(current))
+        current = current.f_back
+    if not labels or labels[0] in IDLE_FRAMES:
+        return None
+    parts = [f"thread:{thread_name}"]
+    parts.extend(f"{module}:{function}".replace(";", ":").replace(" ", "_") for module, function in reversed(labels))
+    return ";".join(parts)
+
+
+class StackSampler:
+    """
+    Periodic wall-clock stack sampler for all threads of the current process.
+
+    A daemon thread records the stacks of all other threads every
+    ``interval_seconds``. Counts are kept in time buckets of
+    ``bucket_seconds``, and buckets older than ``window_seconds`` are
+    dropped, so memory stays bounded. Each bucket holds at most
+    ``max_stacks_per_bucket`` distinct stacks; further ones are counted as
+    ``[truncated]``. Idle threads (blocked in waits, selectors or queues) are
+    skipped.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 0.05,
+        window_seconds: float = 300.0,
+        bucket_seconds: float = 10.0,
+        max_depth: int = 64,
+        max_stacks_per_bucket: int = 5000,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.max_depth = max_depth
+        self.max_stacks_per_bucket = max_stacks_per_bucket
+        self.samples_taken = 0
+        self._buckets: Deque[Tuple[float, Counter]] = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.sample_once()
+
+    def sample_once(self) -> None:
+        own_ident = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = collapse_stack(frame, thread_names.get(ident, str(ident)), self.max_depth)
+            if stack is not None:
+                stacks.append(stack)
+        self.samples_taken += 1
+        self.add(dict(Counter(stacks)))
+
+    def add(self, stacks: Mapping[str, int], prefix: Optional[str] = None) -> None:
+        """Add collapsed stack counts, e.g. samples reported by a converter process."""
+        if not stacks:
+            return
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._current_bucket(now)
+            for stack, count in stacks.items():
+                if prefix:
+                    stack = f"{prefix};{stack}"
+                if stack not in bucket and len(bucket) >= self.max_stacks_per_bucket:
+                    stack = TRUNCATED_STACK
+                bucket[stack] += int(count)
+
+    def _current_bucket(self, now: float) -> Counter:
+        while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+            self._buckets.popleft()
+        if not self._buckets or now - self._buckets[-1][0] >= self.bucket_seconds:
+            self._buckets.append((now, Counter()))
+        return self._buckets[-1][1]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Stack counts aggregated over the rolling window."""
+        cutoff = time.monotonic() - self.window_seconds
+        totals: Counter = Counter()
+        with self._lock:
+            for started, bucket in self._buckets:
+                if started > cutoff:
+                    totals.update(bucket)
+        return dict(totals)
+
+    def collapsed(self) -> str:
+        """The rolling window in the collapsed format read by flamegraph.pl, inferno and speedscope."""
+        lines = [f"{stack} {count}" for stack, count in sorted(self.snapshot().items(), key=lambda item: -item[1])]
+        return "\n".join(lines) + ("\n" if lines else "")
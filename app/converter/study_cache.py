@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .payload_model import PayloadModel
+
+STUDY_CACHE_SUFFIX = ".study.json"
+
+# Copies of the investigation's contacts and publications; their role and status
+# annotations carry ids shared with the investigation, so they are never cached.
+_INVESTIGATION_SECTIONS = ("people", "publications")
+
+logger = logging.getLogger("isa_phm_converter")
+
+
+def converter_source_digest() -> str:
+    """Hash of the converter package; studies cached by another converter version are never used."""
+    digest = hashlib.sha256()
+    for source in sorted(Path(__file__).resolve().parent.glob("*.py")):
+        digest.update(source.name.encode("utf-8"))
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def study_cache_key(model: PayloadModel, study_index: int, study: Dict[str, Any], converter_version: str) -> str:
+    """
+    Hash of everything a converted study depends on.
+
+    That is the study itself, its position (which names its file), the study
+    variables (its factors), the global protocols and the converter version.
+    Contacts and publications are not part of it: they are taken from the
+    current conversion when a cached study is used.
+    """
+    canonical = json.dumps(
+        [
+            converter_version,
+            study_index,
+            study,
+            model.study_variables,
+            model.measurement_protocols,
+            model.processing_protocols,
+        ],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    # Payload strings can hold lone surrogate escapes, which strict UTF-8 cannot encode.
+    return hashlib.sha256(canonical.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _id_token(reference: str) -> str:
+    # isatools re-prefixes some references, e.g. a factor value's unit is "#ontology_annotation/<token of the unit>".
+    return reference.rpartition("/")[2]
+
+
+def _remap_ids(node: Any, mapping: Dict[str, str]) -> None:
+    if isinstance(node, dict):
+        reference = node.get("@id")
+        if isinstance(reference, str):
+            prefix, _, token = reference.rpartition("/")
+            if token in mapping:
+                node["@id"] = f"{prefix}/{mapping[token]}"
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                _remap_ids(value, mapping)
+    elif isinstance(node, list):
+        for item in node:
+            if isinstance(item, (dict, list)):
+                _remap_ids(item, mapping)
+
+
+def attach_study(
+    entry: Dict[str, Any],
+    investigation_document: Dict[str, Any],
+    unit_id: Callable[[str], str],
+) -> Dict[str, Any]:
+    """
+    The study of a cache ``entry`` as part of ``investigation_document``.
+
+    Units are shared across the studies of one conversion, so references to
+    the cached units are rewritten to ``unit_id(term)`` of the current
+    conversion, and the investigation's people and publications are put back.
+    """
+    study = entry["study"]
+    mapping = {token: _id_token(unit_id(term)) for token, term in entry["units"].items()}
+    if any(old_token != new_token for old_token, new_token in mapping.items()):
+        _remap_ids(study, mapping)
+    for section in _INVESTIGATION_SECTIONS:
+        study[section] = investigation_document.get(section, [])
+    return study
+
+
+class StudyCache:
+    """
+    Converted studies on disk, so that re-converting a payload in which only
+    some studies changed rebuilds just those.
+
+    Each entry is one study's ISA-JSON subtree plus the diagnostics its
+    conversion produced, keyed by :func:`study_cache_key`. Entries are written
+    atomically, so concurrent converter processes can share the directory.
+    Reading an entry marks it as recently used, and :meth:`prune` removes the
+    least recently used beyond ``max_entries``. Cache failures are logged and
+    the study is converted as usual.
+    """
+
+    def __init__(self, directory: Path, max_entries: int = 1000, converter_version: Optional[str] = None) -> None:
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.converter_version = converter_version or converter_source_digest()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, model: PayloadModel, study_index: int, study: Dict[str, Any]) -> str:
+        return study_cache_key(model, study_index, study, self.converter_version)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{STUDY_CACHE_SUFFIX}"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable study cache entry %s: %s", path, exc)
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, key: str, study_document: Dict[str, Any], diagnostics: List[Dict[str, Any]]) -> None:
+        entry = {
+            "study": {key_: value for key_, value in study_document.items() if key_ not in _INVESTIGATION_SECTIONS},
+            "units": {
+                _id_token(unit["@id"]): unit.get("annotationValue", "")
+                for unit in study_document.get("unitCategories", [])
+                if isinstance(unit.get("@id"), str)
+            },
+            "diagnostics": diagnostics,
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # json.dump to a file would use the pure-Python encoder; dumps uses the C one.
+            encoded = json.dumps(entry, separators=(",", ":"))
+            handle, temp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(handle, "w", encoding="utf-8") as temp_file:
+                    temp_file.write(encoded)
+                os.replace(temp_name, self._path(key))
+            except BaseException:
+                Path(temp_name).unlink(missing_ok=True)
+                raise
+        except OSError as exc:
+            logger.warning("Could not write study cache entry to %s: %s", self.directory, exc)
+
+    def prune(self) -> None:
+        try:
+            entries = []
+            for path in self.directory.glob(f"*{STUDY_CACHE_SUFFIX}"):
+                try:
+                    entries.append((path.stat().st_mtime, path))
+                except FileNotFoundError:  # pruned by another converter process
+                    continue
+        except OSError:
+            return
+        entries.sort()
+        for _, stale in entries[: max(0, len(entries) - self.max_entries)]:
+            stale.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class PayloadCost:
+    studies: int
+    sensors: int
+    assays: int
+    total_runs: int
+    run_entries: int
+    protocol_entries: int
+    mappings: int
+    study_variables: int
+    score: int
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+def _as_list(value: Any) -> list[Any]:
+    return value if isinstance(value, list) else []
+
+
+def _as_object(value: Any) -> dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+
+def estimate_payload_cost(payload: Any) -> PayloadCost:
+    """
+    Count the payload elements that drive converter work and combine them into a score.
+
+    The score follows the converter's loops: every run becomes a sample that is
+    matched against each study variable, every run entry becomes assay
+    processes, and protocol entries are scanned once per sensor when protocol
+    parameters are built. Only lengths are read, so this is safe to run before
+    schema validation.
+    """
+    payload = _as_object(payload)
+    study_variables = len(_as_list(payload.get("study_variables")))
+
+    studies = sensors = assays = total_runs = run_entries = protocol_entries = mappings = 0
+    score = 0
+    for study_value in _as_list(payload.get("studies")):
+        study = _as_object(study_value)
+        runs = study.get("total_runs")
+        study_runs = runs if isinstance(runs, int) and runs > 0 else 0
+        study_sensors = len(_as_list(_as_object(study.get("used_setup")).get("sensors")))
+        study_mappings = len(_as_list(study.get("study_to_study_variable_mapping")))
+
+        study_run_entries = 0
+        study_protocol_entries = 0
+        study_assays = _as_list(study.get("assay_details"))
+        for assay_value in study_assays:
+            assay = _as_object(assay_value)
+            study_run_entries += len(_as_list(assay.get("runs")))
+            study_protocol_entries += len(_as_list(assay.get("measurement_protocols")))
+            study_protocol_entries += len(_as_list(assay.get("processing_protocols")))
+
+        studies += 1
+        sensors += study_sensors
+        assays += len(study_assays)
+        total_runs += study_runs
+        run_entries += study_run_entries
+        protocol_entries += study_protocol_entries
+        mappings += study_mappings
+        score += (
+            study_runs * (1 + study_variables)
+            + study_run_entries
+            + study_mappings
+            + study_protocol_entries * (1 + study_sensors)
+        )
+
+    return PayloadCost(
+        studies=studies,
+        sensors=sensors,
+        assays=assays,
+        total_runs=total_runs,
+        run_entries=run_entries,
+        protocol_entries=protocol_entries,
+        mappings=mappings,
+        study_variables=study_variables,
+        score=score,
+    )
@@ -32,3 +32,17 @@ class ConverterTimeoutError(RuntimeError):
 
 class ConverterFailedError(RuntimeError):
     pass
+
+
+class IdempotencyKeyConflictError(RuntimeError):
+    pass
+
+
+class ConversionCancelledError(RuntimeError):
+    pass
+
+
+class ConverterResourceLimitError(RuntimeError):
+    def __init__(self, resource: str, message: str) -> None:
+        super().__init__(message)
+        self.resource = resource
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+from app.config import Settings
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+# Attributes every LogRecord has; anything else was passed via ``extra``.
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", logging.INFO, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Log arguments of these types cannot change between the logging call and formatting.
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+_queue_handler: DroppingQueueHandler | None = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, including any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hand records to a bounded queue without blocking the caller.
+
+    Unlike ``QueueHandler``, records whose arguments are all immutable
+    scalars are enqueued unformatted, so the message is built by the listener
+    thread rather than by the logging call. Other records are formatted
+    first, because their arguments could change before the listener gets to
+    them. When the queue is full, because the output stream cannot keep up,
+    the record is dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.listener: QueueListener | None = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE_ARG_TYPES) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Handler.handle() holds the handler lock here, so the increment is safe.
+            self.dropped += 1
+
+
+def _formatter(log_format: str) -> logging.Formatter:
+    return JSONFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+def configure_logging(settings: Settings | None = None) -> None:
+    """
+    Set up root logging once per process (existing handlers are left alone).
+
+    With ``LOG_QUEUE_SIZE`` > 0, records go through a bounded queue to a
+    background listener thread that formats and writes them, so logging
+    never blocks a request on a slow or back-pressured stdout.
+    """
+    global _queue_handler
+
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    log_format = settings.log_format if settings else "text"
+    queue_size = settings.log_queue_size if settings else 0
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(_formatter(log_format))
+    root.setLevel(logging.INFO)
+    if queue_size <= 0:
+        root.addHandler(stream_handler)
+        return
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.listener = QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+    handler.listener.start()
+    # Flush what is still queued when the process exits.
+    atexit.register(handler.listener.stop)
+    root.addHandler(handler)
+    _queue_handler = handler
+
+
+def dropped_log_records() -> int:
+    """Records dropped because the logging queue was full (0 without a queue)."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -1,36 +1,78 @@
 from __future__ import annotations
 
+import asyncio
+import cProfile
+import hashlib
+import hmac
 import json
 import logging
+import os
+import signal
 import subprocess
+import sys
 import tempfile
+import threading
 import time
-from contextlib import asynccontextmanager
+import zlib
+from contextlib import asynccontextmanager, suppress
+from dataclasses import asdict, dataclass, fields
 from pathlib import Path
 from typing import Any
 from uuid import uuid4
 
 import jsonschema
-from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile
 from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.capture import TrafficCapture
 from app.config import Settings
-from app.errors import APIError, ConverterFailedError, ConverterNotFoundError, ConverterTimeoutError
+from app.converter.sampling import StackSampler
+from app.cost_estimation import PayloadCost, estimate_payload_cost
+from app.errors import (
+    APIError,
+    ConversionCancelledError,
+    ConverterFailedError,
+    ConverterNotFoundError,
+    ConverterResourceLimitError,
+    ConverterTimeoutError,
+    IdempotencyKeyConflictError,
+)
+from app.logging_setup import configure_logging, dropped_log_records
+from app.metrics import MetricsRegistry
+from app.profiling import (
+    PROFILE_HEADER,
+    PROFILE_ID_HEADER,
+    new_profile_id,
+    profile_path,
+    profile_requested,
+    profiled,
+    prune_profiles,
+)
+from app.scheduling import ConverterScheduler, converter_timeout_for_cost
+from app.schema_registry import (
+    SCHEMA_MODES,
+    CompiledSchema,
+    compile_schema,
+    compile_schemas,
+    default_schema_mode,
+    schema_file_stamp,
+    schema_paths,
+)
 from app.semantic_validation import validate_payload_semantics
+from app.singleflight import SingleFlight
 
 logger = logging.getLogger("isa_phm_backend")
 
-
-def configure_logging() -> None:
-    if logging.getLogger().handlers:
-        return
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(name)s %(message)s",
-    )
+# Exit status of web-to-isa-phm.py when it hits the address-space limit.
+CONVERTER_MEMORY_LIMIT_EXIT_CODE = 3
+CONVERTER_RSS_BUCKETS = tuple(mb * 1024 * 1024 for mb in (64, 128, 256, 512, 1024, 2048, 4096, 8192))
+DISCONNECT_POLL_INTERVAL_SECONDS = 0.5
 
 
 def _schema_validation_error_details(exc: jsonschema.ValidationError) -> dict[str, Any]:
@@ -80,22 +122,160 @@ def _json_error_response(
     return response
 
 
-def _load_schema(settings: Settings) -> tuple[dict[str, Any] | None, Path, list[str]]:
-    errors: list[str] = []
-    schema_path = settings.strict_schema_path if settings.strict_schema else settings.schema_path
+def _converter_version(settings: Settings) -> str:
+    """Hash of the converter sources; changes whenever the produced ISA-JSON may change."""
+    script_path = settings.converter_script_path
+    sources = [script_path, *sorted((script_path.parent / "converter").glob("*.py"))]
+    digest = hashlib.sha256()
+    for source in sources:
+        if source.exists():
+            digest.update(source.name.encode("utf-8"))
+            digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def _conversion_etag(
+    payload_hash: str,
+    options: ConversionOptions,
+    converter_version: str,
+    schema_sha256: str | None,
+) -> str:
+    key = f"{payload_hash}:{options.cache_key()}:{converter_version}:{schema_sha256}"
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so a W/ prefix on the client's tag is ignored.
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def _select_schema(request: Request, schema_mode: str | None) -> CompiledSchema:
+    requested = (schema_mode or request.headers.get("X-Schema-Mode") or "").strip().lower()
+    mode = requested or request.app.state.default_schema_mode
+    if mode not in SCHEMA_MODES:
+        raise APIError(
+            status_code=400,
+            code="invalid_schema_mode",
+            message="Unknown schema mode",
+            details={"schema_mode": requested, "allowed": list(SCHEMA_MODES)},
+        )
+
+    compiled = request.app.state.schemas.get(mode)
+    if compiled is None:
+        raise APIError(
+            status_code=503,
+            code="schema_unavailable",
+            message="Payload schema is not available",
+            details={"schema_mode": mode, "schema_path": str(schema_paths(request.app.state.settings)[mode])},
+        )
+    return compiled
+
+
+def _schema_validation_error(
+    validator: jsonschema.protocols.Validator, payload: Any
+) -> jsonschema.ValidationError | None:
+    # Same error selection as jsonschema.validate(), without recompiling the schema per call.
+    return jsonschema.exceptions.best_match(validator.iter_errors(payload))
+
+
+JSON_CONTENT_TYPES = {"application/json", "text/json"}
+
+
+def _payload_too_large(settings: Settings) -> APIError:
+    return APIError(
+        status_code=413,
+        code="payload_too_large",
+        message=f"Request body exceeds {settings.max_upload_mb} MB limit",
+    )
+
 
-    if not schema_path.exists():
-        errors.append(f"Schema file not found: {schema_path}")
-        return None, schema_path, errors
+async def _read_request_body(request: Request, settings: Settings) -> bytes:
+    """
+    Stream the raw request body, enforcing ``max_upload_bytes`` while reading.
+
+    ``Content-Encoding: gzip`` bodies are inflated incrementally; the limit
+    applies to both the compressed and the decompressed size.
+    """
+    limit = settings.max_upload_bytes
+    content_length = request.headers.get("Content-Length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise _payload_too_large(settings)
+
+    content_encoding = request.headers.get("Content-Encoding", "identity").strip().lower()
+    if content_encoding not in {"identity", "gzip"}:
+        raise APIError(
+            status_code=415,
+            code="unsupported_content_encoding",
+            message="Unsupported Content-Encoding",
+            details={"content_encoding": content_encoding, "allowed": ["gzip", "identity"]},
+        )
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if content_encoding == "gzip" else None
 
+    body = bytearray()
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit:
+                raise _payload_too_large(settings)
+            body += decompressor.decompress(chunk, limit + 1 - len(body)) if decompressor else chunk
+            if len(body) > limit:
+                raise _payload_too_large(settings)
+
+        if decompressor is not None:
+            body += decompressor.flush()
+            if not decompressor.eof:
+                raise zlib.error("truncated gzip stream")
+    except zlib.error as exc:
+        raise APIError(
+            status_code=400,
+            code="invalid_encoding",
+            message="Request body is not valid gzip data",
+            details={"message": str(exc)},
+        ) from exc
+
+    if len(body) > limit:
+        raise _payload_too_large(settings)
+    return bytes(body)
+
+
+def _parse_json_payload(raw_bytes: bytes) -> Any:
     try:
-        with schema_path.open("r", encoding="utf-8") as handle:
-            schema = json.load(handle)
-    except Exception as exc:
-        errors.append(f"Failed to load schema {schema_path}: {exc}")
-        return None, schema_path, errors
+        payload_text = raw_bytes.decode("utf-8-sig")
+    except UnicodeDecodeError as exc:
+        raise APIError(
+            status_code=400,
+            code="invalid_encoding",
+            message="Payload must be UTF-8 encoded JSON",
+            details={"message": str(exc)},
+        ) from exc
 
-    return schema, schema_path, errors
+    try:
+        return json.loads(payload_text)
+    except json.JSONDecodeError as exc:
+        raise APIError(
+            status_code=400,
+            code="invalid_json",
+            message="Invalid JSON payload",
+            details={"line": exc.lineno, "column": exc.colno, "message": exc.msg},
+        ) from exc
+
+
+def _validation_result(validator: jsonschema.protocols.Validator, payload: Any) -> dict[str, Any]:
+    schema_errors = [
+        _schema_validation_error_details(error)
+        for error in sorted(validator.iter_errors(payload), key=jsonschema.exceptions.relevance)
+    ]
+    semantic_issues = (
+        [issue.as_dict() for issue in validate_payload_semantics(payload)] if isinstance(payload, dict) else []
+    )
+    return {
+        "valid": not schema_errors and not semantic_issues,
+        "schema_errors": schema_errors,
+        "semantic_issues": semantic_issues,
+    }
 
 
 def _check_converter_readiness(settings: Settings) -> list[str]:
@@ -129,55 +309,641 @@ def _check_converter_readiness(settings: Settings) -> list[str]:
     return errors
 
 
-def _run_converter_subprocess(settings: Settings, input_path: str, output_path: str) -> None:
+@dataclass(frozen=True)
+class ConversionOptions:
+    validate_isa: bool = False
+    deterministic_ids: bool = False
+    include_diagnostics: bool = False
+
+    def cache_key(self) -> str:
+        return ",".join(f"{field.name}={getattr(self, field.name)}" for field in fields(self))
+
+
+@dataclass(frozen=True)
+class ConverterUsage:
+    peak_rss_bytes: int
+    cpu_seconds: float
+
+
+def _run_converter_subprocess(
+    settings: Settings,
+    input_path: str,
+    output_path: str,
+    report_path: str | None = None,
+    options: ConversionOptions | None = None,
+    process_handle: ConverterProcess | None = None,
+    profile_path: str | None = None,
+) -> ConverterUsage | None:
+    """
+    Run the converter and block until it exits.
+
+    The caller enforces timeouts and cancellation by killing the process
+    through ``process_handle``; the conversion then fails with
+    :class:`ConversionCancelledError`.
+    """
+    options = options or ConversionOptions()
     command = [
         settings.converter_python,
         str(settings.converter_script_path),
         input_path,
         output_path,
     ]
+    if report_path:
+        command.extend(["--report", report_path])
+    if options.validate_isa:
+        command.append("--validate-isa")
+    if options.deterministic_ids:
+        command.append("--deterministic-ids")
+    if profile_path:
+        command.extend(["--profile", profile_path])
+    if settings.sampling_profiler_enabled:
+        command.extend(["--sample-interval-ms", str(settings.sampling_interval_ms)])
+    if settings.converter_cpu_limit_seconds:
+        command.extend(["--max-cpu-seconds", str(settings.converter_cpu_limit_seconds)])
+    if settings.converter_memory_limit_mb:
+        command.extend(["--max-memory-mb", str(settings.converter_memory_limit_mb)])
+    if settings.converter_trace_memory:
+        command.append("--trace-memory")
+    if settings.study_cache_dir is not None:
+        command.extend(
+            [
+                "--study-cache-dir",
+                str(settings.study_cache_dir),
+                "--study-cache-max-entries",
+                str(settings.study_cache_max_entries),
+            ]
+        )
+
+    process_handle = process_handle or ConverterProcess()
+    # Output goes to files rather than pipes, so the converter can never block on a full pipe buffer.
+    with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+        try:
+            process = subprocess.Popen(command, stdout=stdout_file, stderr=stderr_file, start_new_session=True)
+        except FileNotFoundError as exc:
+            raise ConverterNotFoundError(str(exc)) from exc
+
+        process_handle.attach(process)
+        try:
+            rusage = _wait_for_process(process, process_handle)
+        finally:
+            if process.returncode is None:
+                _kill_process_group(process)
+        if process_handle.killed:
+            raise ConversionCancelledError("converter process was killed")
+
+        usage = _converter_usage(rusage)
+        _raise_for_resource_limit(settings, process.returncode, usage, _read_process_output(stderr_file))
+        if process.returncode != 0:
+            stderr = _read_process_output(stderr_file)
+            stdout = _read_process_output(stdout_file)
+            detail = stderr or stdout or "converter process exited with non-zero status"
+            raise ConverterFailedError(detail)
+        return usage
+
+
+class ConverterProcess:
+    """
+    The converter process of one conversion, so the side awaiting it can kill it.
+
+    :meth:`kill` may be called from any thread, before the process has started
+    (it is then killed on :meth:`attach`) or after it has exited (a no-op).
+    The worker detaches the process before reaping it, so a kill can never hit
+    a reused pid.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._process: subprocess.Popen | None = None
+        self.killed = False
+
+    def attach(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._process = process
+            if self.killed:
+                _signal_process_group(process)
+
+    def detach(self) -> None:
+        with self._lock:
+            self._process = None
+
+    def kill(self) -> None:
+        with self._lock:
+            self.killed = True
+            if self._process is not None:
+                _signal_process_group(self._process)
+
+
+def _wait_for_process(process: subprocess.Popen, process_handle: ConverterProcess) -> Any:
+    """
+    Block until the converter exits, reap it and return its ``rusage``.
+
+    ``os.wait4`` is used instead of ``Popen.wait`` because it reports the
+    resource usage of exactly this child. ``os.waitid`` with ``WNOWAIT`` waits
+    without reaping first, so the pid stays valid until the process is
+    detached from ``process_handle``. Returns ``None`` on platforms without
+    ``wait4``.
+    """
+    if hasattr(os, "waitid"):
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        process_handle.detach()
+    if not hasattr(os, "wait4"):
+        process.wait()
+        process_handle.detach()
+        return None
+    _, status, rusage = os.wait4(process.pid, 0)
+    process_handle.detach()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+
+def _converter_usage(rusage: Any) -> ConverterUsage | None:
+    if rusage is None:
+        return None
+    # ru_maxrss is reported in KiB on Linux and in bytes on macOS.
+    rss_scale = 1 if sys.platform == "darwin" else 1024
+    return ConverterUsage(
+        peak_rss_bytes=rusage.ru_maxrss * rss_scale,
+        cpu_seconds=round(rusage.ru_utime + rusage.ru_stime, 3),
+    )
+
+
+def _raise_for_resource_limit(settings: Settings, returncode: int, usage: ConverterUsage | None, stderr: str) -> None:
+    if returncode == CONVERTER_MEMORY_LIMIT_EXIT_CODE and settings.converter_memory_limit_mb:
+        raise ConverterResourceLimitError("memory", stderr or "converter exceeded the memory limit")
+
+    cpu_limit = settings.converter_cpu_limit_seconds
+    killed_by_cpu_limit = hasattr(signal, "SIGXCPU") and returncode == -signal.SIGXCPU
+    # Past the hard limit the kernel sends SIGKILL instead.
+    killed_at_hard_limit = returncode == -signal.SIGKILL and usage is not None and usage.cpu_seconds >= cpu_limit
+    if cpu_limit and (killed_by_cpu_limit or killed_at_hard_limit):
+        raise ConverterResourceLimitError("cpu", f"converter exceeded the CPU time limit of {cpu_limit} seconds")
+
 
+def _signal_process_group(process: subprocess.Popen) -> None:
+    """Kill the converter and anything it spawned; it runs in its own session."""
     try:
-        result = subprocess.run(
-            command,
-            check=False,
-            capture_output=True,
-            text=True,
-            timeout=settings.converter_timeout_seconds,
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    _signal_process_group(process)
+    process.wait()
+
+
+def _read_process_output(handle: Any) -> str:
+    handle.seek(0)
+    return handle.read().decode("utf-8", errors="replace").strip()
+
+
+@dataclass(frozen=True)
+class ConversionJob:
+    raw_bytes: bytes
+    options: ConversionOptions
+    cost: PayloadCost
+    size_class: str
+    timeout_seconds: int
+    profile_path: str | None = None
+
+
+@dataclass(frozen=True)
+class ConversionResult:
+    # Only the serialized output is kept: results are retained for Idempotency-Key replays,
+    # and a parsed copy would hold the document in memory a second time.
+    raw_json: bytes
+    report: dict[str, Any]
+    usage: ConverterUsage | None = None
+
+
+def _envelope_json(raw_json: bytes, envelope: dict[str, Any]) -> bytes:
+    """``{"isa_json": <raw_json>, **envelope}`` without parsing and re-serializing the converter output."""
+    members = json.dumps(envelope, separators=(",", ":")).encode("utf-8")[1:]
+    return b'{"isa_json":' + raw_json + (b"," + members if len(members) > 1 else b"}")
+
+
+def _execute_conversion(
+    settings: Settings,
+    job: ConversionJob,
+    process_handle: ConverterProcess | None = None,
+) -> ConversionResult:
+    input_path: str | None = None
+    output_path: str | None = None
+    report_path: str | None = None
+
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as input_file:
+            input_path = input_file.name
+            input_file.write(job.raw_bytes)
+
+        output_file = tempfile.NamedTemporaryFile(delete=False, suffix=".json")
+        output_path = output_file.name
+        output_file.close()
+
+        report_file = tempfile.NamedTemporaryFile(delete=False, suffix=".report.json")
+        report_path = report_file.name
+        report_file.close()
+
+        usage = _run_converter_subprocess(
+            settings,
+            input_path,
+            output_path,
+            report_path,
+            job.options,
+            process_handle=process_handle,
+            profile_path=job.profile_path,
         )
-    except FileNotFoundError as exc:
-        raise ConverterNotFoundError(str(exc)) from exc
-    except subprocess.TimeoutExpired as exc:
-        raise ConverterTimeoutError(str(exc)) from exc
 
-    if result.returncode != 0:
-        stderr = (result.stderr or "").strip()
-        stdout = (result.stdout or "").strip()
-        detail = stderr or stdout or "converter process exited with non-zero status"
-        raise ConverterFailedError(detail)
+        with open(output_path, "rb") as output_handle:
+            raw_json = output_handle.read()
+
+        try:
+            json.loads(raw_json)
+        except json.JSONDecodeError as exc:
+            raise APIError(
+                status_code=500,
+                code="invalid_converter_output",
+                message="Converter produced invalid JSON",
+                details={"line": exc.lineno, "column": exc.colno, "message": exc.msg},
+            ) from exc
+
+        return ConversionResult(
+            raw_json=raw_json,
+            report=_read_converter_report(report_path),
+            usage=usage,
+        )
+
+    finally:
+        for temp_path in (input_path, output_path, report_path):
+            if temp_path and Path(temp_path).exists():
+                Path(temp_path).unlink(missing_ok=True)
+
+
+def _record_converter_usage(metrics: MetricsRegistry, size_class: str, usage: ConverterUsage | None) -> None:
+    if usage is None:
+        return
+    metrics.histogram(
+        "isa_phm_converter_peak_rss_bytes",
+        "Peak resident set size of converter processes",
+        ("size_class",),
+        CONVERTER_RSS_BUCKETS,
+    ).observe(usage.peak_rss_bytes, size_class=size_class)
+    metrics.histogram(
+        "isa_phm_converter_cpu_seconds",
+        "CPU time (user + system) used by converter processes",
+        ("size_class",),
+    ).observe(usage.cpu_seconds, size_class=size_class)
+
+
+def _converter_stage_seconds(report: dict[str, Any]) -> dict[str, float]:
+    return {
+        stage: float(timing.get("seconds", 0.0))
+        for stage, timing in (report.get("stage_timings") or {}).items()
+        if isinstance(timing, dict)
+    }
+
+
+def _record_converter_stages(metrics: MetricsRegistry, report: dict[str, Any]) -> None:
+    histogram = metrics.histogram(
+        "isa_phm_converter_stage_seconds",
+        "Time spent in each stage of a conversion inside the converter process",
+        ("stage",),
+    )
+    for stage, seconds in _converter_stage_seconds(report).items():
+        histogram.observe(seconds, stage=stage)
+    study_cache = report.get("study_cache")
+    if study_cache:
+        counter = metrics.counter(
+            "isa_phm_converter_study_cache_total",
+            "Studies taken from (hit) or converted and added to (miss) the per-study conversion cache",
+            ("result",),
+        )
+        counter.inc(study_cache.get("hits", 0), result="hit")
+        counter.inc(study_cache.get("misses", 0), result="miss")
+
+
+def _server_timing(durations: dict[str, float]) -> str:
+    """Render ``{name: seconds}`` as a Server-Timing header value (durations in milliseconds)."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items())
+
+
+async def _run_conversion(
+    settings: Settings,
+    job: ConversionJob,
+    scheduler: ConverterScheduler,
+    metrics: MetricsRegistry,
+) -> ConversionResult:
+    process_handle = ConverterProcess()
+    try:
+        async with scheduler.slot(job.size_class):
+            worker = asyncio.ensure_future(run_in_threadpool(_execute_conversion, settings, job, process_handle))
+            try:
+                result = await asyncio.wait_for(asyncio.shield(worker), job.timeout_seconds)
+            except (asyncio.CancelledError, asyncio.TimeoutError) as exc:
+                # The worker blocks until the converter exits, so kill the converter
+                # and hold the slot until the process is actually gone.
+                process_handle.kill()
+                with suppress(Exception):
+                    await worker
+                if isinstance(exc, asyncio.TimeoutError):
+                    raise ConverterTimeoutError(
+                        f"converter process did not finish within {job.timeout_seconds} seconds"
+                    ) from exc
+                raise
+            _record_converter_usage(metrics, job.size_class, result.usage)
+            _record_converter_stages(metrics, result.report)
+            return result
+    except ConverterNotFoundError as exc:
+        raise APIError(
+            status_code=503,
+            code="converter_not_found",
+            message="Converter runtime is not available",
+            details={"converter_python": settings.converter_python, "error": str(exc)},
+        ) from exc
+    except ConverterTimeoutError as exc:
+        raise APIError(
+            status_code=504,
+            code="converter_timeout",
+            message="Converter process timed out",
+            details={"timeout_seconds": job.timeout_seconds, "error": str(exc)},
+        ) from exc
+    except ConverterResourceLimitError as exc:
+        metrics.counter(
+            "isa_phm_converter_resource_limit_total",
+            "Converter processes stopped by a resource limit",
+            ("resource",),
+        ).inc(resource=exc.resource)
+        limit = settings.converter_cpu_limit_seconds if exc.resource == "cpu" else settings.converter_memory_limit_mb
+        raise APIError(
+            status_code=413,
+            code="converter_resource_limit_exceeded",
+            message="Converter process exceeded its resource limits",
+            details={"resource": exc.resource, "limit": limit, "error": str(exc)},
+        ) from exc
+    except ConverterFailedError as exc:
+        raise APIError(
+            status_code=500,
+            code="converter_failed",
+            message="Conversion process failed",
+            details={"error": str(exc)},
+        ) from exc
+
+
+def _prepare_conversion_job(
+    settings: Settings,
+    compiled_schema: CompiledSchema,
+    raw_bytes: bytes,
+    options: ConversionOptions,
+    scheduler: ConverterScheduler,
+    metrics: MetricsRegistry,
+    converter_profile_path: str | None = None,
+) -> ConversionJob:
+    """Parse, cost-check and validate a /convert payload (all synchronous, so it can run under a profiler)."""
+    payload = _parse_json_payload(raw_bytes)
+
+    cost = estimate_payload_cost(payload)
+    if settings.max_payload_cost and cost.score > settings.max_payload_cost:
+        metrics.counter("isa_phm_payload_cost_rejections_total", "Conversions rejected by the payload cost budget").inc()
+        raise APIError(
+            status_code=413,
+            code="payload_too_costly",
+            message="Payload exceeds the conversion cost budget",
+            details={"max_cost": settings.max_payload_cost, "cost": cost.as_dict()},
+        )
+
+    schema_error = _schema_validation_error(compiled_schema.validator, payload)
+    if schema_error is not None:
+        raise APIError(
+            status_code=422,
+            code="schema_validation_failed",
+            message="Payload validation failed",
+            details=_schema_validation_error_details(schema_error),
+        )
+
+    semantic_issues = [issue.as_dict() for issue in validate_payload_semantics(payload)]
+    if semantic_issues:
+        raise APIError(
+            status_code=422,
+            code="semantic_validation_failed",
+            message="Payload semantic validation failed",
+            details=semantic_issues,
+        )
+
+    return ConversionJob(
+        raw_bytes=raw_bytes,
+        options=options,
+        cost=cost,
+        size_class=scheduler.classify(cost),
+        timeout_seconds=converter_timeout_for_cost(settings, cost),
+        profile_path=converter_profile_path,
+    )
+
+
+async def _await_unless_disconnected(request: Request, awaitable: Any) -> Any:
+    """Await ``awaitable``, cancelling it if the client disconnects in the meantime."""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise APIError(
+                    status_code=499,
+                    code="client_disconnected",
+                    message="Client disconnected before the conversion finished",
+                )
+    finally:
+        if not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await task
+
+
+def _read_converter_report(report_path: str | None) -> dict[str, Any]:
+    if not report_path or not Path(report_path).exists():
+        return {}
+    try:
+        with open(report_path, "r", encoding="utf-8") as report_handle:
+            report = json.load(report_handle)
+    except (OSError, json.JSONDecodeError):
+        logger.warning("converter_report_unreadable path=%s", report_path)
+        return {}
+    return report if isinstance(report, dict) else {}
+
+
+def _schema_readiness(
+    settings: Settings, schemas: dict[str, CompiledSchema], default_mode: str
+) -> dict[str, Any]:
+    return {
+        "schema_loaded": default_mode in schemas,
+        "schema_sha256": schemas[default_mode].sha256 if default_mode in schemas else None,
+        "schemas": {
+            mode: {
+                "loaded": mode in schemas,
+                "path": str(path),
+                "sha256": schemas[mode].sha256 if mode in schemas else None,
+            }
+            for mode, path in schema_paths(settings).items()
+        },
+    }
+
+
+def _publish_schema_metrics(app: FastAPI) -> None:
+    schema_info = app.state.metrics.gauge(
+        "isa_phm_schema_info",
+        "Active payload schema per mode; the sha256 label identifies the compiled file",
+        ("mode", "sha256"),
+    )
+    for mode in SCHEMA_MODES:
+        schema_info.remove_matching(mode=mode)
+        compiled = app.state.schemas.get(mode)
+        if compiled is not None:
+            schema_info.set(1, mode=mode, sha256=compiled.sha256)
+
+
+async def _reload_changed_schemas(app: FastAPI) -> list[str]:
+    """Recompile schema files whose contents changed and swap them onto ``app.state``."""
+    settings: Settings = app.state.settings
+    reloads = app.state.metrics.counter(
+        "isa_phm_schema_reloads_total",
+        "Schema reload attempts after a file change",
+        ("mode", "result"),
+    )
+
+    reloaded: list[str] = []
+    for mode, schema_path in schema_paths(settings).items():
+        stamp = schema_file_stamp(schema_path)
+        if stamp is None or stamp == app.state.schema_stamps.get(mode):
+            continue
+        app.state.schema_stamps = {**app.state.schema_stamps, mode: stamp}
+
+        compiled, errors = await asyncio.to_thread(compile_schema, mode, schema_path)
+        if compiled is None:
+            reloads.inc(mode=mode, result="failure")
+            logger.error("schema_reload_failed mode=%s path=%s errors=%s", mode, schema_path, errors)
+            if mode not in app.state.schemas:
+                # Still unloaded; report the latest reason rather than the startup one.
+                app.state.schema_errors = {**app.state.schema_errors, mode: errors}
+                _refresh_readiness(app)
+            continue
+
+        current = app.state.schemas.get(mode)
+        if current is not None and current.sha256 == compiled.sha256:
+            continue
+
+        # Replace the whole mapping so in-flight requests keep a consistent view.
+        app.state.schemas = {**app.state.schemas, mode: compiled}
+        app.state.schema_errors = {key: value for key, value in app.state.schema_errors.items() if key != mode}
+        reloads.inc(mode=mode, result="success")
+        reloaded.append(mode)
+        logger.info("schema_reloaded mode=%s path=%s sha256=%s", mode, schema_path, compiled.sha256)
+
+    if reloaded:
+        _refresh_readiness(app)
+        _publish_schema_metrics(app)
+    return reloaded
+
+
+def _refresh_readiness(app: FastAPI) -> None:
+    """Recompute the schema part of ``app.state.readiness``, including its errors, after a reload."""
+    readiness = {
+        **app.state.readiness,
+        **_schema_readiness(app.state.settings, app.state.schemas, app.state.default_schema_mode),
+    }
+    readiness["errors"] = [
+        *(error for errors in app.state.schema_errors.values() for error in errors),
+        *app.state.converter_errors,
+    ]
+    readiness["ready"] = readiness["converter_ready"] and all(
+        schema["loaded"] for schema in readiness["schemas"].values()
+    )
+    app.state.readiness = readiness
+
+
+async def _watch_schema_files(app: FastAPI, interval_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await _reload_changed_schemas(app)
+        except Exception:
+            logger.exception("schema_watch_failed")
+
+
+class RequestContextMiddleware:
+    """
+    Assign ``request.state.request_id``, return it as ``X-Request-ID`` and log every request.
+
+    Plain ASGI rather than ``@app.middleware("http")``: Starlette's
+    BaseHTTPMiddleware hides the client's ``http.disconnect`` from
+    ``request.is_disconnected()``, which /convert relies on to cancel
+    conversions of clients that went away.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("X-Request-ID") or str(uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
+        logger.info(
+            "request_complete request_id=%s method=%s path=%s status=%s duration_ms=%s",
+            request_id,
+            scope["method"],
+            scope["path"],
+            status_code,
+            int((time.perf_counter() - started) * 1000),
+        )
 
 
 def create_app(settings: Settings | None = None) -> FastAPI:
-    configure_logging()
     runtime_settings = settings or Settings.from_env()
+    configure_logging(runtime_settings)
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
-        schema, schema_path, schema_errors = _load_schema(runtime_settings)
+        schemas, schema_errors = compile_schemas(runtime_settings)
         converter_errors = _check_converter_readiness(runtime_settings)
 
-        app.state.payload_schema = schema
-        app.state.schema_path = str(schema_path)
+        default_mode = default_schema_mode(runtime_settings)
+        app.state.schemas = schemas
+        app.state.schema_errors = schema_errors
+        app.state.converter_errors = converter_errors
+        app.state.schema_stamps = {
+            mode: schema_file_stamp(path) for mode, path in schema_paths(runtime_settings).items()
+        }
+        app.state.default_schema_mode = default_mode
+        app.state.converter_version = _converter_version(runtime_settings)
 
-        errors = [*schema_errors, *converter_errors]
+        errors = [*(error for mode_errors in schema_errors.values() for error in mode_errors), *converter_errors]
         app.state.readiness = {
             "ready": len(errors) == 0,
-            "schema_loaded": schema is not None,
-            "schema_path": str(schema_path),
+            "schema_path": str(schema_paths(runtime_settings)[default_mode]),
             "strict_schema": runtime_settings.strict_schema,
+            **_schema_readiness(runtime_settings, schemas, default_mode),
             "converter_ready": len(converter_errors) == 0,
             "converter_python": runtime_settings.converter_python,
             "converter_script_path": str(runtime_settings.converter_script_path),
+            "converter_version": app.state.converter_version,
             "errors": errors,
         }
 
@@ -189,38 +955,61 @@ def create_app(settings: Settings | None = None) -> FastAPI:
             app.state.readiness["strict_schema"],
             app.state.readiness["errors"],
         )
-        yield
+        _publish_schema_metrics(app)
+
+        watcher: asyncio.Task | None = None
+        if runtime_settings.schema_reload_interval_seconds > 0:
+            watcher = asyncio.create_task(
+                _watch_schema_files(app, runtime_settings.schema_reload_interval_seconds)
+            )
+        if app.state.sampler is not None:
+            app.state.sampler.start()
+        try:
+            yield
+        finally:
+            if app.state.sampler is not None:
+                app.state.sampler.stop()
+            if watcher is not None:
+                watcher.cancel()
+                with suppress(asyncio.CancelledError):
+                    await watcher
 
     app = FastAPI(lifespan=lifespan)
     app.state.settings = runtime_settings
+    app.state.conversions = SingleFlight(
+        max_retained_bytes=runtime_settings.idempotency_max_retained_mb * 1024 * 1024,
+        result_size=lambda result: len(result.raw_json),
+    )
+    app.state.metrics = MetricsRegistry()
+    app.state.scheduler = ConverterScheduler(runtime_settings, app.state.metrics)
+    app.state.capture = TrafficCapture(runtime_settings) if runtime_settings.capture_sample_rate > 0 else None
+    app.state.sampler = (
+        StackSampler(
+            interval_seconds=runtime_settings.sampling_interval_ms / 1000,
+            window_seconds=runtime_settings.sampling_window_seconds,
+        )
+        if runtime_settings.sampling_profiler_enabled
+        else None
+    )
 
     app.add_middleware(
         CORSMiddleware,
         allow_origins=runtime_settings.cors_allow_origins,
         allow_credentials=True,
         allow_methods=["POST", "GET", "OPTIONS"],
-        allow_headers=["Content-Type", "X-Request-ID"],
+        allow_headers=[
+            "Content-Type",
+            "Content-Encoding",
+            "X-Request-ID",
+            "X-Schema-Mode",
+            "Idempotency-Key",
+            "If-None-Match",
+            PROFILE_HEADER,
+        ],
+        expose_headers=["ETag", "X-Request-ID", "Server-Timing", PROFILE_ID_HEADER],
     )
 
-    @app.middleware("http")
-    async def request_context_middleware(request: Request, call_next):
-        request_id = request.headers.get("X-Request-ID") or str(uuid4())
-        request.state.request_id = request_id
-
-        started = time.perf_counter()
-        response = await call_next(request)
-        duration_ms = int((time.perf_counter() - started) * 1000)
-
-        response.headers["X-Request-ID"] = request_id
-        logger.info(
-            "request_complete request_id=%s method=%s path=%s status=%s duration_ms=%s",
-            request_id,
-            request.method,
-            request.url.path,
-            response.status_code,
-            duration_ms,
-        )
-        return response
+    app.add_middleware(RequestContextMiddleware)
 
     @app.exception_handler(APIError)
     async def api_error_handler(request: Request, exc: APIError):
@@ -287,28 +1076,83 @@ def create_app(settings: Settings | None = None) -> FastAPI:
             },
         )
 
-    @app.post("/convert")
-    async def convert_json(request: Request, file: UploadFile = File(...)):
-        request_id = _request_id_from_request(request)
+    @app.get("/metrics")
+    async def metrics(request: Request):
+        request.app.state.scheduler.publish_metrics()
+        request.app.state.metrics.gauge(
+            "isa_phm_log_records_dropped",
+            "Log records dropped since start because the logging queue was full",
+        ).set(dropped_log_records())
+        return PlainTextResponse(
+            content=request.app.state.metrics.render(),
+            media_type="text/plain; version=0.0.4",
+        )
+
+    @app.get("/debug/profile/stacks")
+    async def debug_profile_stacks(request: Request):
+        sampler: StackSampler | None = request.app.state.sampler
+        token = request.app.state.settings.debug_token
+        if sampler is None or not token:
+            raise APIError(status_code=404, code="not_found", message="Sampling profiler is not enabled")
+        supplied = request.headers.get("X-Debug-Token") or request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.strip().encode(), token.encode()):
+            raise APIError(status_code=403, code="invalid_debug_token", message="Missing or invalid debug token")
+        return PlainTextResponse(content=sampler.collapsed())
+
+    @app.post("/validate")
+    async def validate_json(request: Request, schema: str | None = Query(None)):
         current_settings: Settings = request.app.state.settings
+        validator = _select_schema(request, schema).validator
+
+        raw_bytes = await _read_request_body(request, current_settings)
+        payload = _parse_json_payload(raw_bytes)
 
-        if not file.filename or not file.filename.lower().endswith(".json"):
-            raise APIError(status_code=400, code="invalid_file_extension", message="Only .json files are allowed")
+        if not isinstance(payload, list):
+            return _validation_result(validator, payload)
 
-        allowed_content_types = {"application/json", "text/json"}
-        if file.content_type not in allowed_content_types:
+        if len(payload) > current_settings.max_validate_batch:
             raise APIError(
-                status_code=400,
-                code="invalid_file_type",
-                message="Invalid file type",
-                details={"content_type": file.content_type, "allowed": sorted(allowed_content_types)},
+                status_code=413,
+                code="batch_too_large",
+                message=f"Batch exceeds {current_settings.max_validate_batch} payloads",
+                details={"batch_size": len(payload), "max_batch_size": current_settings.max_validate_batch},
             )
 
-        input_path: str | None = None
-        output_path: str | None = None
+        results = [
+            {"index": index, **_validation_result(validator, item)}
+            for index, item in enumerate(payload)
+        ]
+        return {"valid": all(result["valid"] for result in results), "results": results}
+
+    @app.post("/convert")
+    async def convert_json(
+        request: Request,
+        file: UploadFile | None = File(None),
+        validate_isa: bool = Query(False),
+        deterministic_ids: bool | None = Query(None),
+        include_diagnostics: bool = Query(False),
+        schema: str | None = Query(None),
+    ):
+        request_id = _request_id_from_request(request)
+        current_settings: Settings = request.app.state.settings
+        compiled_schema = _select_schema(request, schema)
+
         started = time.perf_counter()
+        request_content_type = request.headers.get("Content-Type", "").split(";")[0].strip().lower()
 
-        try:
+        if file is not None:
+            if not file.filename or not file.filename.lower().endswith(".json"):
+                raise APIError(status_code=400, code="invalid_file_extension", message="Only .json files are allowed")
+
+            if file.content_type not in JSON_CONTENT_TYPES:
+                raise APIError(
+                    status_code=400,
+                    code="invalid_file_type",
+                    message="Invalid file type",
+                    details={"content_type": file.content_type, "allowed": sorted(JSON_CONTENT_TYPES)},
+                )
+
+            source_name = file.filename
             raw_bytes = await file.read()
             if len(raw_bytes) > current_settings.max_upload_bytes:
                 raise APIError(
@@ -316,115 +1160,188 @@ def create_app(settings: Settings | None = None) -> FastAPI:
                     code="payload_too_large",
                     message=f"Uploaded file exceeds {current_settings.max_upload_mb} MB limit",
                 )
+        elif request_content_type in JSON_CONTENT_TYPES:
+            source_name = "<request-body>"
+            raw_bytes = await _read_request_body(request, current_settings)
+        elif request_content_type == "multipart/form-data":
+            raise APIError(status_code=422, code="missing_file", message="Multipart uploads need a 'file' field")
+        else:
+            raise APIError(
+                status_code=415,
+                code="unsupported_media_type",
+                message="Send a multipart 'file' field or a raw JSON request body",
+                details={"content_type": request_content_type, "allowed": sorted(JSON_CONTENT_TYPES)},
+            )
 
-            try:
-                payload_text = raw_bytes.decode("utf-8-sig")
-            except UnicodeDecodeError as exc:
-                raise APIError(
-                    status_code=400,
-                    code="invalid_encoding",
-                    message="Payload must be UTF-8 encoded JSON",
-                    details={"message": str(exc)},
-                ) from exc
-
-            try:
-                payload = json.loads(payload_text)
-            except json.JSONDecodeError as exc:
-                raise APIError(
-                    status_code=400,
-                    code="invalid_json",
-                    message="Invalid JSON payload",
-                    details={"line": exc.lineno, "column": exc.colno, "message": exc.msg},
-                ) from exc
+        payload_hash = hashlib.sha256(raw_bytes).hexdigest()
+        options = ConversionOptions(
+            validate_isa=validate_isa,
+            deterministic_ids=current_settings.deterministic_ids if deterministic_ids is None else deterministic_ids,
+            include_diagnostics=include_diagnostics,
+        )
 
-            schema = request.app.state.payload_schema
-            if schema is None:
-                raise APIError(
-                    status_code=503,
-                    code="schema_unavailable",
-                    message="Payload schema is not available",
-                    details={"schema_path": request.app.state.schema_path},
-                )
+        # Profiling is opt-in per request; when it is off no profiler object exists at all.
+        api_profiler = cProfile.Profile() if profile_requested(current_settings, request.headers) else None
+        request_profile_id = ""
+        if api_profiler is not None:
+            request_profile_id = new_profile_id(request_id)
+            prune_profiles(current_settings)
+
+        # Only deterministic output is a pure function of the inputs, so only then can a strong ETag be
+        # computed up front and a matching If-None-Match short-circuit validation and conversion.
+        # Profiled requests always run so there is something to profile.
+        etag: str | None = None
+        if options.deterministic_ids:
+            etag = _conversion_etag(
+                payload_hash,
+                options,
+                request.app.state.converter_version,
+                compiled_schema.sha256,
+            )
+            if api_profiler is None and _etag_matches(request.headers.get("If-None-Match"), etag):
+                logger.info("convert_not_modified request_id=%s etag=%s", request_id, etag)
+                return Response(status_code=304, headers={"ETag": etag})
 
-            try:
-                jsonschema.validate(instance=payload, schema=schema)
-            except jsonschema.ValidationError as exc:
-                raise APIError(
-                    status_code=422,
-                    code="schema_validation_failed",
-                    message="Payload validation failed",
-                    details=_schema_validation_error_details(exc),
-                ) from exc
-
-            semantic_issues = [issue.as_dict() for issue in validate_payload_semantics(payload)]
-            if semantic_issues:
-                raise APIError(
-                    status_code=422,
-                    code="semantic_validation_failed",
-                    message="Payload semantic validation failed",
-                    details=semantic_issues,
+        prepare_started = time.perf_counter()
+        try:
+            with profiled(api_profiler):
+                job = _prepare_conversion_job(
+                    current_settings,
+                    compiled_schema,
+                    raw_bytes,
+                    options,
+                    request.app.state.scheduler,
+                    request.app.state.metrics,
+                    converter_profile_path=(
+                        str(profile_path(current_settings, request_profile_id, "converter")) if api_profiler else None
+                    ),
                 )
+        finally:
+            if api_profiler is not None:
+                api_profiler.dump_stats(profile_path(current_settings, request_profile_id, "api"))
+        conversion_started = time.perf_counter()
+
+        fingerprint = f"{payload_hash}:{options.cache_key()}"
+        idempotency_key = request.headers.get("Idempotency-Key", "").strip()
+        if api_profiler is not None:
+            # A profiled request must run its own conversion rather than join or replay another one.
+            flight_key = f"profile:{request_profile_id}"
+            retain_seconds = 0.0
+        elif idempotency_key:
+            flight_key = f"idempotency:{idempotency_key}"
+            retain_seconds = float(current_settings.idempotency_ttl_seconds)
+        else:
+            flight_key = f"payload:{fingerprint}"
+            retain_seconds = 0.0
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as input_file:
-                input_path = input_file.name
-                input_file.write(raw_bytes)
-
-            output_file = tempfile.NamedTemporaryFile(delete=False, suffix=".json")
-            output_path = output_file.name
-            output_file.close()
-
-            try:
-                await run_in_threadpool(_run_converter_subprocess, current_settings, input_path, output_path)
-            except ConverterNotFoundError as exc:
-                raise APIError(
-                    status_code=503,
-                    code="converter_not_found",
-                    message="Converter runtime is not available",
-                    details={"converter_python": current_settings.converter_python, "error": str(exc)},
-                ) from exc
-            except ConverterTimeoutError as exc:
-                raise APIError(
-                    status_code=504,
-                    code="converter_timeout",
-                    message="Converter process timed out",
-                    details={"timeout_seconds": current_settings.converter_timeout_seconds, "error": str(exc)},
-                ) from exc
-            except ConverterFailedError as exc:
-                raise APIError(
-                    status_code=500,
-                    code="converter_failed",
-                    message="Conversion process failed",
-                    details={"error": str(exc)},
-                ) from exc
+        try:
+            result, shared = await _await_unless_disconnected(
+                request,
+                request.app.state.conversions.do(
+                    flight_key,
+                    fingerprint,
+                    lambda: _run_conversion(
+                        current_settings, job, request.app.state.scheduler, request.app.state.metrics
+                    ),
+                    retain_seconds=retain_seconds,
+                ),
+            )
+        except IdempotencyKeyConflictError as exc:
+            raise APIError(
+                status_code=422,
+                code="idempotency_key_conflict",
+                message="Idempotency-Key was already used with a different payload",
+                details={"idempotency_key": idempotency_key},
+            ) from exc
+        converted_at = time.perf_counter()
+
+        if request.app.state.sampler is not None and not shared:
+            request.app.state.sampler.add(result.report.get("stack_samples") or {}, prefix="converter")
+
+        stage_seconds = _converter_stage_seconds(result.report)
+        duration_ms = int((converted_at - started) * 1000)
+        logger.info(
+            "convert_success request_id=%s filename=%s size_bytes=%s duration_ms=%s shared=%s "
+            "cost=%s size_class=%s timeout_seconds=%s peak_rss_bytes=%s cpu_seconds=%s converter_stages_ms=%s",
+            request_id,
+            source_name,
+            len(raw_bytes),
+            duration_ms,
+            shared,
+            job.cost.score,
+            job.size_class,
+            job.timeout_seconds,
+            result.usage.peak_rss_bytes if result.usage else None,
+            result.usage.cpu_seconds if result.usage else None,
+            json.dumps({stage: round(seconds * 1000, 1) for stage, seconds in stage_seconds.items()}, separators=(",", ":")),
+        )
+        memory_report = result.report.get("memory")
+        if memory_report and not shared:
+            logger.info(
+                "convert_memory request_id=%s peak_traced_bytes=%s stages=%s",
+                request_id,
+                memory_report.get("peak_traced_bytes"),
+                json.dumps(memory_report.get("stages", {}), separators=(",", ":")),
+            )
 
-            with open(output_path, "r", encoding="utf-8") as output_handle:
-                raw_json = output_handle.read()
+        diagnostics = result.report.get("diagnostics") or []
+        if diagnostics and not shared:
+            logger.info(
+                "convert_diagnostics request_id=%s counts=%s",
+                request_id,
+                json.dumps({item["code"]: item["count"] for item in diagnostics}, separators=(",", ":")),
+            )
 
-            try:
-                json.loads(raw_json)
-            except json.JSONDecodeError as exc:
+        envelope: dict[str, Any] = {}
+        if validate_isa:
+            isa_validation = result.report.get("isa_validation")
+            if isa_validation is None:
                 raise APIError(
                     status_code=500,
-                    code="invalid_converter_output",
-                    message="Converter produced invalid JSON",
-                    details={"line": exc.lineno, "column": exc.colno, "message": exc.msg},
-                ) from exc
-
-            duration_ms = int((time.perf_counter() - started) * 1000)
+                    code="isa_validation_unavailable",
+                    message="Converter did not report ISA-JSON validation results",
+                )
             logger.info(
-                "convert_success request_id=%s filename=%s size_bytes=%s duration_ms=%s",
+                "isa_validation request_id=%s valid=%s errors=%s warnings=%s",
                 request_id,
-                file.filename,
-                len(raw_bytes),
-                duration_ms,
+                isa_validation.get("valid"),
+                len(isa_validation.get("errors", [])),
+                len(isa_validation.get("warnings", [])),
             )
-            return PlainTextResponse(content=raw_json, media_type="application/json")
-
-        finally:
-            if input_path and Path(input_path).exists():
-                Path(input_path).unlink(missing_ok=True)
-            if output_path and Path(output_path).exists():
-                Path(output_path).unlink(missing_ok=True)
+            envelope["isa_validation"] = isa_validation
+        if include_diagnostics:
+            envelope["diagnostics"] = diagnostics
+
+        if envelope:
+            response = Response(content=_envelope_json(result.raw_json, envelope), media_type="application/json")
+        else:
+            response = Response(content=result.raw_json, media_type="application/json")
+
+        # "conversion" covers queueing and the converter process; the converter's own stages follow it.
+        timings = {
+            "prepare": conversion_started - prepare_started,
+            "conversion": converted_at - conversion_started,
+            **stage_seconds,
+            "total": converted_at - started,
+        }
+        response.headers["Server-Timing"] = _server_timing(timings)
+        capture: TrafficCapture | None = request.app.state.capture
+        if capture is not None and capture.sampled():
+            # Written after the response is sent, off the event loop.
+            response.background = BackgroundTask(
+                capture.record,
+                request_id,
+                raw_bytes,
+                asdict(options),
+                job.cost.as_dict(),
+                job.size_class,
+                timings,
+            )
+        if etag:
+            response.headers["ETag"] = etag
+        if api_profiler is not None:
+            response.headers[PROFILE_ID_HEADER] = request_profile_id
+        return response
 
     return app
 
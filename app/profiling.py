@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import cProfile
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Mapping
+
+from app.config import Settings
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_SUFFIX = ".pstats"
+
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def profile_requested(settings: Settings, headers: Mapping[str, str]) -> bool:
+    """A request is profiled only if profiling is enabled and it sends ``X-Profile: 1``."""
+    if not settings.profiling_enabled:
+        return False
+    return headers.get(PROFILE_HEADER, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def profile_id(request_id: str) -> str:
+    # Request ids can come from the client (X-Request-ID), so keep them safe as file names.
+    return _UNSAFE_FILENAME_CHARS.sub("_", request_id)[:128] or "request"
+
+
+def new_profile_id(request_id: str) -> str:
+    """
+    Id under which one profiled request's files are stored.
+
+    It starts with a server-side timestamp and a random part, so a client that
+    reuses an ``X-Request-ID`` cannot overwrite another request's profile.
+    """
+    return f"{int(time.time() * 1000):015d}-{uuid.uuid4().hex[:8]}-{profile_id(request_id)}"
+
+
+def profile_path(settings: Settings, request_profile_id: str, stage: str) -> Path:
+    """Where the pstats file of one stage (``api`` or ``converter``) of a profiled request is stored."""
+    settings.profile_dir.mkdir(parents=True, exist_ok=True)
+    return settings.profile_dir / f"{request_profile_id}.{stage}{PROFILE_SUFFIX}"
+
+
+def prune_profiles(settings: Settings) -> None:
+    """
+    Make room for the two files of a new profiled request, so that no more than
+    ``PROFILE_MAX_FILES`` profile files exist once it has written them.
+    """
+    # Profile ids start with a zero-padded timestamp, so name order is request order.
+    profiles = sorted(settings.profile_dir.glob(f"*{PROFILE_SUFFIX}"))
+    for stale in profiles[: max(0, len(profiles) - (settings.profile_max_files - 2))]:
+        stale.unlink(missing_ok=True)
+
+
+@contextmanager
+def profiled(profiler: cProfile.Profile | None) -> Iterator[None]:
+    """Run the block under ``profiler``; a ``None`` profiler makes this a no-op."""
+    if profiler is None:
+        yield
+        return
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
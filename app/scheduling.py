@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.config import Settings
+from app.cost_estimation import PayloadCost
+from app.metrics import MetricsRegistry
+
+SIZE_CLASSES = ("small", "medium", "large")
+
+QUEUE_WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class ConverterQueue:
+    """A FIFO queue in front of a fixed number of converter slots."""
+
+    def __init__(self, size_class: str, slots: int) -> None:
+        self.size_class = size_class
+        self.slots = slots
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(slots)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Wait for a free slot and yield how long the wait took, in seconds."""
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield time.perf_counter() - started
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+class ConverterScheduler:
+    """
+    Route conversions into per-size-class queues with their own slot quotas.
+
+    Small jobs never wait behind large ones: each class has a separate queue
+    and only competes with jobs of the same class.
+    """
+
+    def __init__(self, settings: Settings, metrics: MetricsRegistry) -> None:
+        self._settings = settings
+        self.queues = {
+            "small": ConverterQueue("small", settings.converter_small_slots),
+            "medium": ConverterQueue("medium", settings.converter_medium_slots),
+            "large": ConverterQueue("large", settings.converter_large_slots),
+        }
+        self._wait_seconds = metrics.histogram(
+            "isa_phm_converter_queue_wait_seconds",
+            "Time conversions waited for a converter slot",
+            ("size_class",),
+            QUEUE_WAIT_BUCKETS,
+        )
+        self._queue_depth = metrics.gauge(
+            "isa_phm_converter_queue_depth", "Conversions waiting for a converter slot", ("size_class",)
+        )
+        self._active = metrics.gauge("isa_phm_converter_active", "Converter slots in use", ("size_class",))
+        self._slots = metrics.gauge("isa_phm_converter_slots", "Configured converter slots", ("size_class",))
+        self._cancellations = metrics.counter(
+            "isa_phm_converter_cancellations_total",
+            "Conversions cancelled before completion (e.g. the client disconnected)",
+            ("size_class",),
+        )
+        self.publish_metrics()
+
+    def classify(self, cost: PayloadCost) -> str:
+        if cost.score >= self._settings.large_cost_threshold:
+            return "large"
+        if cost.score >= self._settings.medium_cost_threshold:
+            return "medium"
+        return "small"
+
+    @asynccontextmanager
+    async def slot(self, size_class: str) -> AsyncIterator[None]:
+        queue = self.queues[size_class]
+        try:
+            async with queue.slot() as waited:
+                self._wait_seconds.observe(waited, size_class=size_class)
+                yield
+        except asyncio.CancelledError:
+            self._cancellations.inc(size_class=size_class)
+            raise
+
+    def publish_metrics(self) -> None:
+        for size_class, queue in self.queues.items():
+            self._queue_depth.set(queue.waiting, size_class=size_class)
+            self._active.set(queue.active, size_class=size_class)
+            self._slots.set(queue.slots, size_class=size_class)
+
+
+def converter_timeout_for_cost(settings: Settings, cost: PayloadCost) -> int:
+    """Scale the base converter timeout with the estimated cost, capped at the configured maximum."""
+    scaled = settings.converter_timeout_seconds + cost.score * settings.converter_timeout_per_1k_cost_seconds / 1000
+    return int(min(max(scaled, settings.converter_timeout_seconds), settings.converter_max_timeout_seconds))
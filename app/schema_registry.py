@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import jsonschema
+
+from app.config import Settings
+
+SCHEMA_MODES = ("compat", "strict")
+
+
+@dataclass(frozen=True)
+class CompiledSchema:
+    mode: str
+    path: Path
+    sha256: str
+    schema: dict[str, Any]
+    validator: jsonschema.protocols.Validator
+
+
+def schema_paths(settings: Settings) -> dict[str, Path]:
+    return {"compat": settings.schema_path, "strict": settings.strict_schema_path}
+
+
+def default_schema_mode(settings: Settings) -> str:
+    return "strict" if settings.strict_schema else "compat"
+
+
+def schema_file_stamp(schema_path: Path) -> tuple[int, int] | None:
+    """Cheap change marker for a schema file: ``(mtime_ns, size)``, or ``None`` if it is missing."""
+    try:
+        stat = schema_path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def compile_schema(mode: str, schema_path: Path) -> tuple[CompiledSchema | None, list[str]]:
+    if not schema_path.exists():
+        return None, [f"Schema file not found: {schema_path}"]
+
+    try:
+        raw_bytes = schema_path.read_bytes()
+        schema = json.loads(raw_bytes.decode("utf-8-sig"))
+    except Exception as exc:
+        return None, [f"Failed to load schema {schema_path}: {exc}"]
+
+    validator_cls = jsonschema.validators.validator_for(schema)
+    try:
+        validator_cls.check_schema(schema)
+    except jsonschema.SchemaError as exc:
+        return None, [f"Invalid schema {schema_path}: {exc.message}"]
+
+    return (
+        CompiledSchema(
+            mode=mode,
+            path=schema_path,
+            sha256=hashlib.sha256(raw_bytes).hexdigest(),
+            schema=schema,
+            validator=validator_cls(schema),
+        ),
+        [],
+    )
+
+
+def compile_schemas(settings: Settings) -> tuple[dict[str, CompiledSchema], dict[str, list[str]]]:
+    """Compiled schemas and the errors of each mode that failed to compile."""
+    compiled: dict[str, CompiledSchema] = {}
+    errors: dict[str, list[str]] = {}
+    for mode, schema_path in schema_paths(settings).items():
+        schema, schema_errors = compile_schema(mode, schema_path)
+        if schema_errors:
+            errors[mode] = schema_errors
+        if schema is not None:
+            compiled[mode] = schema
+    return compiled, errors
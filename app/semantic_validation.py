@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Iterable
+from typing import Any
+
+from app.converter.payload_model import PayloadModel, as_list, as_object, build_payload_model
 
 
 @dataclass(frozen=True)
@@ -14,45 +16,16 @@ class SemanticIssue:
         return {"path": self.path, "code": self.code, "message": self.message}
 
 
-def _as_list(value: Any) -> list[Any]:
-    return value if isinstance(value, list) else []
-
-
-def _as_object(value: Any) -> dict[str, Any]:
-    return value if isinstance(value, dict) else {}
-
-
-def _collect_protocol_by_id(protocols: Iterable[dict[str, Any]]) -> dict[str, dict[str, Any]]:
-    result: dict[str, dict[str, Any]] = {}
-    for protocol in protocols:
-        protocol_id = protocol.get("id")
-        if isinstance(protocol_id, str) and protocol_id:
-            result[protocol_id] = protocol
-    return result
-
-
-def _collect_parameter_ids(protocol: dict[str, Any] | None) -> set[str]:
-    if not protocol:
-        return set()
-    param_ids: set[str] = set()
-    for parameter in _as_list(protocol.get("parameters")):
-        parameter_id = _as_object(parameter).get("id")
-        if isinstance(parameter_id, str) and parameter_id:
-            param_ids.add(parameter_id)
-    return param_ids
-
-
-def validate_payload_semantics(payload: dict[str, Any]) -> list[SemanticIssue]:
+def validate_payload_semantics(payload: dict[str, Any] | PayloadModel) -> list[SemanticIssue]:
+    """Cross-reference checks the schema cannot express; ``payload`` may be a pre-built :class:`PayloadModel`."""
+    model = build_payload_model(payload)
     issues: list[SemanticIssue] = []
 
     def add(path: str, code: str, message: str) -> None:
         issues.append(SemanticIssue(path=path, code=code, message=message))
 
-    top_study_variables = _collect_protocol_by_id(_as_list(payload.get("study_variables")))
-
-    studies = _as_list(payload.get("studies"))
-    for study_index, study_value in enumerate(studies):
-        study = _as_object(study_value)
+    for study_index, study_model in enumerate(model.studies):
+        study = study_model.raw
         study_path = f"$.studies[{study_index}]"
         total_runs = study.get("total_runs")
         if not isinstance(total_runs, int) or total_runs < 1:
@@ -63,34 +36,14 @@ def validate_payload_semantics(payload: dict[str, Any]) -> list[SemanticIssue]:
             )
             total_runs = None
 
-        used_setup = _as_object(study.get("used_setup"))
-        sensors = _as_list(used_setup.get("sensors"))
-        sensor_ids = {
-            str(sensor.get("id"))
-            for sensor in sensors
-            if isinstance(sensor, dict) and sensor.get("id") not in (None, "")
-        }
-
-        measurement_protocols = _as_list(used_setup.get("measurementProtocols"))
-        processing_protocols = _as_list(used_setup.get("processingProtocols"))
-        if not measurement_protocols:
-            measurement_protocols = _as_list(payload.get("measurement_protocols"))
-        if not processing_protocols:
-            processing_protocols = _as_list(payload.get("processing_protocols"))
-
-        measurement_protocol_by_id = _collect_protocol_by_id(measurement_protocols)
-        processing_protocol_by_id = _collect_protocol_by_id(processing_protocols)
-
-        selected_measurement_protocol_id = (
-            study.get("selectedMeasurementProtocolId")
-            or study.get("selected_measurement_protocol_id")
-            or ""
-        )
-        selected_processing_protocol_id = (
-            study.get("selectedProcessingProtocolId")
-            or study.get("selected_processing_protocol_id")
-            or ""
-        )
+        # Setup-derived maps and id sets are shared by all studies with the same used_setup.
+        sensor_ids = study_model.setup.sensor_ids
+        measurement_protocols = study_model.measurement.setup_protocols
+        processing_protocols = study_model.processing.setup_protocols
+        measurement_protocol_by_id = measurement_protocols.protocol_by_id
+        processing_protocol_by_id = processing_protocols.protocol_by_id
+        selected_measurement_protocol_id = study_model.measurement.selected_id
+        selected_processing_protocol_id = study_model.processing.selected_id
 
         if selected_measurement_protocol_id and selected_measurement_protocol_id not in measurement_protocol_by_id:
             add(
@@ -106,12 +59,11 @@ def validate_payload_semantics(payload: dict[str, Any]) -> list[SemanticIssue]:
                 f"Unknown processing protocol id '{selected_processing_protocol_id}'",
             )
 
-        study_variable_mappings = _as_list(study.get("study_to_study_variable_mapping"))
-        for mapping_index, mapping_value in enumerate(study_variable_mappings):
-            mapping = _as_object(mapping_value)
+        for mapping_index, mapping_value in enumerate(study_model.mappings):
+            mapping = as_object(mapping_value)
             mapping_path = f"{study_path}.study_to_study_variable_mapping[{mapping_index}]"
             variable_id = mapping.get("studyVariableId")
-            if isinstance(variable_id, str) and variable_id and variable_id not in top_study_variables:
+            if isinstance(variable_id, str) and variable_id and variable_id not in model.study_variable_by_id:
                 add(
                     f"{mapping_path}.studyVariableId",
                     "unknown_study_variable",
@@ -133,7 +85,7 @@ def validate_payload_semantics(payload: dict[str, Any]) -> list[SemanticIssue]:
                         f"runNumber {run_number} is outside 1..{total_runs}",
                     )
 
-        assay_details = _as_list(study.get("assay_details"))
+        assay_details = study_model.assays
         processed_outputs_present = False
         if measurement_protocol_by_id and assay_details and not selected_measurement_protocol_id:
             add(
@@ -142,24 +94,16 @@ def validate_payload_semantics(payload: dict[str, Any]) -> list[SemanticIssue]:
                 "selectedMeasurementProtocolId is required when measurement protocol variants are present",
             )
 
-        selected_measurement_protocol = measurement_protocol_by_id.get(selected_measurement_protocol_id)
-        selected_processing_protocol = processing_protocol_by_id.get(selected_processing_protocol_id)
-
-        all_measurement_target_ids: set[str] = set()
-        all_processing_target_ids: set[str] = set()
-        for protocol in measurement_protocol_by_id.values():
-            all_measurement_target_ids.update(_collect_parameter_ids(protocol))
-        for protocol in processing_protocol_by_id.values():
-            all_processing_target_ids.update(_collect_parameter_ids(protocol))
-
-        selected_measurement_target_ids = _collect_parameter_ids(selected_measurement_protocol)
-        selected_processing_target_ids = _collect_parameter_ids(selected_processing_protocol)
+        all_measurement_target_ids = measurement_protocols.all_parameter_ids()
+        all_processing_target_ids = processing_protocols.all_parameter_ids()
+        selected_measurement_target_ids = measurement_protocols.parameter_ids(selected_measurement_protocol_id)
+        selected_processing_target_ids = processing_protocols.parameter_ids(selected_processing_protocol_id)
 
         for assay_index, assay_value in enumerate(assay_details):
-            assay = _as_object(assay_value)
+            assay = as_object(assay_value)
             assay_path = f"{study_path}.assay_details[{assay_index}]"
 
-            used_sensor = _as_object(assay.get("used_sensor"))
+            used_sensor = as_object(assay.get("used_sensor"))
             used_sensor_id = used_sensor.get("id")
             if sensor_ids and isinstance(used_sensor_id, str) and used_sensor_id and used_sensor_id not in sensor_ids:
                 add(
@@ -168,7 +112,7 @@ def validate_payload_semantics(payload: dict[str, Any]) -> list[SemanticIssue]:
                     f"Unknown sensor id '{used_sensor_id}'",
                 )
 
-            runs = _as_list(assay.get("runs"))
+            runs = as_list(assay.get("runs"))
             if total_runs is not None and len(runs) != total_runs:
                 add(
                     f"{assay_path}.runs",
@@ -178,7 +122,7 @@ def validate_payload_semantics(payload: dict[str, Any]) -> list[SemanticIssue]:
 
             run_numbers: list[int] = []
             for run_index, run_value in enumerate(runs):
-                run = _as_object(run_value)
+                run = as_object(run_value)
                 run_path = f"{assay_path}.runs[{run_index}]"
                 run_number = run.get("run_number")
                 if not isinstance(run_number, int) or run_number < 1:
@@ -203,9 +147,9 @@ def validate_payload_semantics(payload: dict[str, Any]) -> list[SemanticIssue]:
                         f"run_number values must match {expected_run_numbers}",
                     )
 
-            measurement_entries = _as_list(assay.get("measurement_protocols"))
+            measurement_entries = as_list(assay.get("measurement_protocols"))
             for entry_index, entry_value in enumerate(measurement_entries):
-                entry = _as_object(entry_value)
+                entry = as_object(entry_value)
                 entry_path = f"{assay_path}.measurement_protocols[{entry_index}]"
 
                 source_id = entry.get("sourceId")
@@ -240,9 +184,9 @@ def validate_payload_semantics(payload: dict[str, Any]) -> list[SemanticIssue]:
                         f"Unknown measurement target id '{target_id}'",
                     )
 
-            processing_entries = _as_list(assay.get("processing_protocols"))
+            processing_entries = as_list(assay.get("processing_protocols"))
             for entry_index, entry_value in enumerate(processing_entries):
-                entry = _as_object(entry_value)
+                entry = as_object(entry_value)
                 entry_path = f"{assay_path}.processing_protocols[{entry_index}]"
 
                 source_id = entry.get("sourceId")
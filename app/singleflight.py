@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from app.errors import IdempotencyKeyConflictError
+
+
+@dataclass
+class _Call:
+    task: asyncio.Future
+    fingerprint: str
+    waiters: int = 0
+
+
+@dataclass(frozen=True)
+class _RetainedResult:
+    fingerprint: str
+    result: Any
+    expires_at: float
+    size: int
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key onto one execution.
+
+    The first caller for a key starts ``func`` as an independent task; callers
+    that arrive while it is running await the same task. Results can optionally
+    be retained for a while after completion (used for ``Idempotency-Key``
+    replays). Retained results are bounded by count and by their total
+    ``result_size``; the oldest are dropped first, and a result larger than
+    ``max_retained_bytes`` on its own is not retained. A key reused with a
+    different fingerprint is rejected. When every caller waiting on a call has
+    been cancelled, the call itself is cancelled.
+    """
+
+    def __init__(
+        self,
+        max_retained: int = 64,
+        max_retained_bytes: int = 0,
+        result_size: Callable[[Any], int] | None = None,
+    ) -> None:
+        self._calls: dict[str, _Call] = {}
+        self._retained: OrderedDict[str, _RetainedResult] = OrderedDict()
+        self._max_retained = max_retained
+        self._max_retained_bytes = max_retained_bytes
+        self._result_size = result_size or (lambda _result: 0)
+        self._retained_bytes = 0
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Awaitable[Any]],
+        retain_seconds: float = 0.0,
+    ) -> tuple[Any, bool]:
+        """Return ``(result, shared)`` where ``shared`` is true for callers that reused another call."""
+        self._evict_expired(time.monotonic())
+
+        retained = self._retained.get(key)
+        if retained is not None:
+            if retained.fingerprint != fingerprint:
+                raise IdempotencyKeyConflictError(key)
+            return retained.result, True
+
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = _Call(task=asyncio.ensure_future(func()), fingerprint=fingerprint)
+            self._calls[key] = call
+            call.task.add_done_callback(
+                lambda task: self._finish(key, call, task, retain_seconds)
+            )
+        elif call.fingerprint != fingerprint:
+            raise IdempotencyKeyConflictError(key)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _finish(self, key: str, call: _Call, task: asyncio.Future, retain_seconds: float) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        if retain_seconds <= 0:
+            return
+        result = task.result()
+        size = self._result_size(result)
+        if self._max_retained_bytes and size > self._max_retained_bytes:
+            return
+        self._discard(key)
+        self._retained[key] = _RetainedResult(
+            fingerprint=call.fingerprint,
+            result=result,
+            expires_at=time.monotonic() + retain_seconds,
+            size=size,
+        )
+        self._retained_bytes += size
+        while len(self._retained) > self._max_retained or (
+            self._max_retained_bytes and self._retained_bytes > self._max_retained_bytes
+        ):
+            self._discard(next(iter(self._retained)))
+
+    def retained_bytes(self) -> int:
+        return self._retained_bytes
+
+    def _discard(self, key: str) -> None:
+        retained = self._retained.pop(key, None)
+        if retained is not None:
+            self._retained_bytes -= retained.size
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [key for key, retained in self._retained.items() if retained.expires_at <= now]
+        for key in expired:
+            self._discard(key)
@@ -1,33 +1,123 @@
 from __future__ import annotations
 
 import argparse
+import cProfile
 import json
 import logging
+import sys
+from pathlib import Path
 
 from isatools.isajson import ISAJSONEncoder
 
-from converter.entrypoint import create_isa_data
+from converter.diagnostics import ConversionDiagnostics
+from converter.entrypoint import create_isa_document
+from converter.identifiers import payload_digest, relabel_generated_ids
+from converter.instrumentation import StageRecorder
+from converter.isa_validation import validate_investigation
+from converter.payload_model import build_payload_model
+from converter.sampling import StackSampler
+from converter.study_cache import StudyCache
 
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
 
-def convert_file(input_path: str, output_path: str) -> None:
+# Exit status used when the address-space limit is hit; keep in sync with
+# CONVERTER_MEMORY_LIMIT_EXIT_CODE in app/main.py.
+MEMORY_LIMIT_EXIT_CODE = 3
+
+
+def apply_resource_limits(max_cpu_seconds: int = 0, max_memory_mb: int = 0) -> None:
+    """
+    Cap CPU time and address space for this process (``0`` leaves a limit unset).
+
+    The CPU limit counts from process start, so it includes interpreter and
+    isatools start-up. Exceeding it ends the process with ``SIGXCPU``.
+    Exceeding the address-space limit raises ``MemoryError``.
+    """
+    if resource is None:
+        return
+    if max_cpu_seconds > 0:
+        # The hard limit leaves a short grace period after SIGXCPU before the kernel sends SIGKILL.
+        resource.setrlimit(resource.RLIMIT_CPU, (max_cpu_seconds, max_cpu_seconds + 5))
+    if max_memory_mb > 0:
+        limit_bytes = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+
+
+def convert_file(
+    input_path: str,
+    output_path: str,
+    validate_isa: bool = False,
+    report_path: str | None = None,
+    deterministic_ids: bool = False,
+    sampler: StackSampler | None = None,
+    recorder: StageRecorder | None = None,
+    study_cache: StudyCache | None = None,
+) -> None:
     logger = logging.getLogger("isa_phm_converter")
-    with open(input_path, "r", encoding="utf-8-sig") as infile:
-        payload = json.load(infile)
+    recorder = recorder or StageRecorder()
+    with recorder.stage("payload_load"):
+        with open(input_path, "r", encoding="utf-8-sig") as infile:
+            payload = json.load(infile)
+        model = build_payload_model(payload)
 
     logger.info("Loading ISA-PHM JSON file: %s", input_path)
-    investigation = create_isa_data(isa_phm_info=payload, output_path=output_path, logger=logger)
-
-    with open(investigation.filename, "w", encoding="utf-8", newline="\n") as outfile:
-        json.dump(
-            investigation,
-            outfile,
-            cls=ISAJSONEncoder,
-            sort_keys=True,
-            indent=4,
-            separators=(",", ": "),
+    diagnostics = ConversionDiagnostics()
+    investigation_document = create_isa_document(
+        isa_phm_info=model,
+        output_path=output_path,
+        logger=logger,
+        deterministic_ids=deterministic_ids,
+        recorder=recorder,
+        diagnostics=diagnostics,
+        study_cache=study_cache,
+    )
+
+    with recorder.stage("serialization"):
+        document = (
+            relabel_generated_ids(investigation_document, payload_digest(payload))
+            if deterministic_ids
+            else investigation_document
         )
+        with open(output_path, "w", encoding="utf-8", newline="\n") as outfile:
+            json.dump(
+                document,
+                outfile,
+                cls=ISAJSONEncoder,
+                sort_keys=True,
+                indent=4,
+                separators=(",", ": "),
+            )
 
-    logger.info("ISA-PHM JSON file created: %s", investigation.filename)
+    logger.info("ISA-PHM JSON file created: %s", output_path)
+
+    report: dict = {"stage_timings": recorder.timing_report(), "diagnostics": diagnostics.as_list()}
+    if study_cache is not None:
+        report["study_cache"] = study_cache.stats()
+        logger.info("Study cache: %s hits, %s misses", study_cache.hits, study_cache.misses)
+    if validate_isa:
+        report["isa_validation"] = validate_investigation(investigation_document)
+        logger.info(
+            "ISA-JSON validation finished: valid=%s errors=%s warnings=%s",
+            report["isa_validation"]["valid"],
+            len(report["isa_validation"]["errors"]),
+            len(report["isa_validation"]["warnings"]),
+        )
+
+    if sampler is not None:
+        sampler.stop()
+        report["stack_samples"] = sampler.snapshot()
+
+    if recorder.trace_memory:
+        recorder.stop()
+        report["memory"] = recorder.memory_report()
+        logger.info("Peak traced memory: %s bytes", report["memory"]["peak_traced_bytes"])
+
+    if report_path:
+        with open(report_path, "w", encoding="utf-8", newline="\n") as report_file:
+            json.dump(report, report_file)
 
 
 def parse_args() -> argparse.Namespace:
@@ -40,6 +130,60 @@ def parse_args() -> argparse.Namespace:
         "outfile",
         help="Output file name for the ISA-PHM JSON file",
     )
+    parser.add_argument(
+        "--validate-isa",
+        action="store_true",
+        help="Validate the generated ISA-JSON with isatools and add the result to the report",
+    )
+    parser.add_argument(
+        "--deterministic-ids",
+        action="store_true",
+        help="Derive identifiers from a hash of the input so identical inputs give identical output",
+    )
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="Optional path for a JSON report written next to the ISA-PHM JSON file",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Run the conversion under cProfile and write pstats to this path",
+    )
+    parser.add_argument(
+        "--sample-interval-ms",
+        type=int,
+        default=0,
+        help="Sample stacks at this interval and add collapsed stack counts to the report (0 = off)",
+    )
+    parser.add_argument(
+        "--max-cpu-seconds",
+        type=int,
+        default=0,
+        help="CPU time limit for the conversion process (0 = unlimited)",
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=0,
+        help="Address-space limit for the conversion process in MiB (0 = unlimited)",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Trace allocations with tracemalloc and add per-stage peaks and top allocation sites to the report",
+    )
+    parser.add_argument(
+        "--study-cache-dir",
+        default=None,
+        help="Reuse converted studies cached in this directory and cache the ones converted now",
+    )
+    parser.add_argument(
+        "--study-cache-max-entries",
+        type=int,
+        default=1000,
+        help="Studies kept in --study-cache-dir; the least recently used beyond this are removed",
+    )
     return parser.parse_args()
 
 
@@ -49,7 +193,44 @@ def main() -> None:
         format="%(asctime)s %(levelname)s %(name)s %(message)s",
     )
     args = parse_args()
-    convert_file(args.file, args.outfile)
+    apply_resource_limits(args.max_cpu_seconds, args.max_memory_mb)
+    profiler = cProfile.Profile() if args.profile else None
+    sampler = None
+    if args.sample_interval_ms > 0:
+        # One bucket for the whole (short-lived) process.
+        sampler = StackSampler(
+            interval_seconds=args.sample_interval_ms / 1000,
+            window_seconds=float("inf"),
+            bucket_seconds=float("inf"),
+        )
+        sampler.start()
+    recorder = StageRecorder(trace_memory=args.trace_memory)
+    recorder.start()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        convert_file(
+            args.file,
+            args.outfile,
+            validate_isa=args.validate_isa,
+            report_path=args.report,
+            deterministic_ids=args.deterministic_ids,
+            sampler=sampler,
+            recorder=recorder,
+            study_cache=(
+                StudyCache(Path(args.study_cache_dir), max_entries=args.study_cache_max_entries)
+                if args.study_cache_dir
+                else None
+            ),
+        )
+    except MemoryError:
+        # Report without allocating much: the traceback machinery may itself fail here.
+        sys.stderr.write(f"converter exceeded the memory limit of {args.max_memory_mb} MiB\n")
+        sys.exit(MEMORY_LIMIT_EXIT_CODE)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
 
 
 if __name__ == "__main__":
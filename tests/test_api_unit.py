@@ -1,14 +1,25 @@
 from __future__ import annotations
 
+import asyncio
 import copy
+import gzip
 import json
+import threading
+import time
 from dataclasses import replace
 
+import httpx
+import pytest
 from fastapi.testclient import TestClient
 
 import app.main as main_module
 from app.config import Settings
-from app.errors import ConverterNotFoundError, ConverterTimeoutError
+from app.errors import (
+    ConversionCancelledError,
+    ConverterNotFoundError,
+    ConverterResourceLimitError,
+    ConverterTimeoutError,
+)
 from app.main import create_app
 
 
@@ -17,6 +28,15 @@ def _post_payload(client: TestClient, payload: dict, filename: str = "input.json
     return client.post("/convert", files={"file": (filename, body, content_type)})
 
 
+def _fake_converter(calls: list):
+    def _convert(_settings, _input_path, output_path, *_args, **_kwargs):
+        calls.append(output_path)
+        with open(output_path, "w", encoding="utf-8") as handle:
+            json.dump({"title": "converted"}, handle)
+
+    return _convert
+
+
 def test_convert_rejects_non_json_extension(client: TestClient, minimal_payload: dict):
     response = _post_payload(client, minimal_payload, filename="input.txt")
     assert response.status_code == 400
@@ -39,6 +59,40 @@ def test_convert_rejects_malformed_json(client: TestClient):
     assert body["error"]["code"] == "invalid_json"
 
 
+def test_convert_accepts_raw_and_gzip_json_bodies(client: TestClient, minimal_payload: dict, monkeypatch):
+    calls: list = []
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _fake_converter(calls))
+    body = json.dumps(minimal_payload).encode("utf-8")
+
+    raw = client.post("/convert", content=body, headers={"Content-Type": "application/json"})
+    compressed = client.post(
+        "/convert",
+        content=gzip.compress(body),
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+
+    assert raw.status_code == 200
+    assert compressed.status_code == 200
+    assert len(calls) == 2
+
+
+def test_convert_limits_decompressed_body_size(client: TestClient, test_settings: Settings):
+    bomb = gzip.compress(b" " * (test_settings.max_upload_bytes + 1))
+    response = client.post(
+        "/convert",
+        content=bomb,
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert response.status_code == 413
+    assert response.json()["error"]["code"] == "payload_too_large"
+
+
+def test_convert_rejects_unsupported_body_type(client: TestClient):
+    response = client.post("/convert", content=b"title=x", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+    assert response.json()["error"]["code"] == "unsupported_media_type"
+
+
 def test_convert_rejects_semantic_mismatch(client: TestClient, minimal_payload: dict):
     broken = copy.deepcopy(minimal_payload)
     broken["studies"][0]["study_to_study_variable_mapping"][0]["studyVariableId"] = "missing-variable"
@@ -73,6 +127,348 @@ def test_convert_reports_converter_timeout(client: TestClient, minimal_payload:
     assert body["error"]["code"] == "converter_timeout"
 
 
+def test_convert_rejects_payload_over_cost_budget(test_settings: Settings, minimal_payload: dict, monkeypatch):
+    calls: list = []
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _fake_converter(calls))
+    app = create_app(replace(test_settings, max_payload_cost=1))
+
+    with TestClient(app) as budget_client:
+        response = _post_payload(budget_client, minimal_payload)
+        assert response.status_code == 413
+        body = response.json()
+        assert body["error"]["code"] == "payload_too_costly"
+        assert body["error"]["details"]["cost"]["score"] > 1
+        assert calls == []
+        assert "isa_phm_payload_cost_rejections_total 1" in budget_client.get("/metrics").text
+
+
+def test_convert_ignores_profile_header_unless_enabled(client: TestClient, minimal_payload: dict, monkeypatch):
+    seen_profile_paths: list = []
+
+    def _convert(_settings, _input_path, output_path, *_args, profile_path=None, **_kwargs):
+        seen_profile_paths.append(profile_path)
+        with open(output_path, "w", encoding="utf-8") as handle:
+            json.dump({"title": "converted"}, handle)
+
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _convert)
+    body = json.dumps(minimal_payload)
+
+    response = client.post("/convert", headers={"X-Profile": "1"}, files={"file": ("input.json", body, "application/json")})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert seen_profile_paths == [None]
+
+
+def test_convert_reports_converter_stage_timings(client: TestClient, minimal_payload: dict, monkeypatch):
+    def _convert(_settings, _input_path, output_path, report_path=None, *_args, **_kwargs):
+        with open(output_path, "w", encoding="utf-8") as handle:
+            json.dump({"title": "converted"}, handle)
+        with open(report_path, "w", encoding="utf-8") as handle:
+            json.dump({"stage_timings": {"protocols": {"calls": 2, "seconds": 0.012}}}, handle)
+
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _convert)
+    response = _post_payload(client, minimal_payload)
+    assert response.status_code == 200
+    server_timing = [entry.strip() for entry in response.headers["Server-Timing"].split(",")]
+    assert [entry.split(";")[0] for entry in server_timing] == ["prepare", "conversion", "protocols", "total"]
+    assert "protocols;dur=12.0" in server_timing
+
+    metrics = client.get("/metrics").text
+    assert 'isa_phm_converter_stage_seconds_count{stage="protocols"} 1' in metrics
+
+
+def test_convert_returns_diagnostics_when_requested(client: TestClient, minimal_payload: dict, monkeypatch):
+    diagnostics = [{"code": "run_without_output_files", "message": "...", "count": 3, "samples": [{"run_number": 2}]}]
+
+    def _convert(_settings, _input_path, output_path, report_path=None, *_args, **_kwargs):
+        with open(output_path, "w", encoding="utf-8") as handle:
+            json.dump({"title": "converted"}, handle)
+        with open(report_path, "w", encoding="utf-8") as handle:
+            json.dump({"diagnostics": diagnostics}, handle)
+
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _convert)
+    assert _post_payload(client, minimal_payload).json() == {"title": "converted"}
+
+    response = client.post(
+        "/convert?include_diagnostics=true",
+        files={"file": ("input.json", json.dumps(minimal_payload), "application/json")},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"isa_json": {"title": "converted"}, "diagnostics": diagnostics}
+
+
+def test_convert_captures_sampled_inputs_scrubbed(test_settings: Settings, minimal_payload: dict, monkeypatch, tmp_path):
+    def _convert(_settings, _input_path, output_path, report_path=None, *_args, **_kwargs):
+        with open(output_path, "w", encoding="utf-8") as handle:
+            json.dump({"title": "converted"}, handle)
+        with open(report_path, "w", encoding="utf-8") as handle:
+            json.dump({"stage_timings": {"assays": {"calls": 1, "seconds": 0.5}}}, handle)
+
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _convert)
+    minimal_payload["contacts"] = [{"id": "c1", "firstName": "Ada", "email": "ada@example.org", "roles": ["Author"]}]
+    settings = replace(test_settings, capture_sample_rate=1.0, capture_dir=tmp_path, capture_max_files=2)
+    with TestClient(create_app(settings)) as capture_client:
+        for index in range(3):
+            minimal_payload["description"] = f"request {index}"
+            assert _post_payload(capture_client, minimal_payload).status_code == 200
+            time.sleep(0.002)
+
+    captures = sorted(tmp_path.glob("*.capture.json"))
+    assert len(captures) == 2
+    capture = json.loads(captures[-1].read_text(encoding="utf-8"))
+    assert capture["payload"]["description"] == "request 2"
+    assert capture["payload"]["contacts"] == [{"id": "c1", "firstName": "[scrubbed]", "email": "[scrubbed]", "roles": ["Author"]}]
+    assert capture["timings"]["assays"] == 0.5
+    assert capture["options"]["validate_isa"] is False
+    assert capture["size_class"] == "small"
+
+
+def test_debug_stacks_endpoint_requires_token(test_settings: Settings, minimal_payload: dict, monkeypatch):
+    def _convert(_settings, _input_path, output_path, report_path=None, *_args, **_kwargs):
+        with open(output_path, "w", encoding="utf-8") as handle:
+            json.dump({"title": "converted"}, handle)
+        with open(report_path, "w", encoding="utf-8") as handle:
+            json.dump({"stack_samples": {"__main__:main;__main__:convert_file": 4}}, handle)
+
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _convert)
+    assert TestClient(create_app(test_settings)).get("/debug/profile/stacks").status_code == 404
+
+    settings = replace(test_settings, sampling_profiler_enabled=True, debug_token="secret")
+    with TestClient(create_app(settings)) as sampling_client:
+        assert _post_payload(sampling_client, minimal_payload).status_code == 200
+        assert sampling_client.get("/debug/profile/stacks").status_code == 403
+        response = sampling_client.get("/debug/profile/stacks", headers={"Authorization": "Bearer secret"})
+
+    assert response.status_code == 200
+    assert "converter;__main__:main;__main__:convert_file 4" in response.text.splitlines()
+
+
+def test_validate_reports_valid_payload(client: TestClient, minimal_payload: dict):
+    response = client.post("/validate", json=minimal_payload)
+    assert response.status_code == 200
+    assert response.json() == {"valid": True, "schema_errors": [], "semantic_issues": []}
+
+
+def test_validate_batch_reports_issues_per_payload(client: TestClient, minimal_payload: dict, monkeypatch):
+    calls: list = []
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _fake_converter(calls))
+    broken = copy.deepcopy(minimal_payload)
+    broken["studies"][0]["study_to_study_variable_mapping"][0]["studyVariableId"] = "missing-variable"
+
+    response = client.post("/validate", json=[minimal_payload, broken, {"title": 5}])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["valid"] is False
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert body["results"][0]["valid"] is True
+    assert [issue["code"] for issue in body["results"][1]["semantic_issues"]] == ["unknown_study_variable"]
+    assert body["results"][2]["schema_errors"][0]["path"] == "$.title"
+    assert calls == []
+
+
+def test_validate_selects_schema_per_request(client: TestClient, minimal_payload: dict):
+    extended = {**minimal_payload, "unexpected_field": True}
+
+    compat = client.post("/validate", json=extended)
+    strict_by_query = client.post("/validate", params={"schema": "strict"}, json=extended)
+    strict_by_header = client.post("/validate", headers={"X-Schema-Mode": "strict"}, json=extended)
+    unknown = client.post("/validate", params={"schema": "lenient"}, json=extended)
+
+    assert compat.json()["valid"] is True
+    assert strict_by_query.json()["valid"] is False
+    assert strict_by_header.json() == strict_by_query.json()
+    assert unknown.status_code == 400
+    assert unknown.json()["error"]["code"] == "invalid_schema_mode"
+
+
+def test_converter_subprocess_is_killed_on_cancel(test_settings: Settings, tmp_path):
+    script = tmp_path / "slow_converter.py"
+    script.write_text("import time\ntime.sleep(30)\n", encoding="utf-8")
+    settings = replace(test_settings, converter_script_path=script)
+    process_handle = main_module.ConverterProcess()
+    threading.Timer(0.2, process_handle.kill).start()
+
+    started = time.monotonic()
+    with pytest.raises(ConversionCancelledError):
+        main_module._run_converter_subprocess(
+            settings, str(tmp_path / "in.json"), str(tmp_path / "out.json"), process_handle=process_handle
+        )
+    assert time.monotonic() - started < 10
+
+
+def test_convert_cancels_conversion_when_client_disconnects(test_settings: Settings, minimal_payload: dict, tmp_path):
+    script = tmp_path / "slow_converter.py"
+    script.write_text("import time\ntime.sleep(30)\n", encoding="utf-8")
+    app = create_app(replace(test_settings, converter_script_path=script))
+    upload = httpx.Request(
+        "POST",
+        "http://testserver/convert",
+        files={"file": ("input.json", json.dumps(minimal_payload), "application/json")},
+    )
+    body = upload.read()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/convert",
+        "raw_path": b"/convert",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in upload.headers.items()],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+
+    async def _request_then_disconnect() -> list:
+        # Goes through every middleware, unlike calling the endpoint's helpers directly.
+        body_sent = False
+        disconnect_at = time.monotonic() + 0.5
+        sent = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # No await once due: is_disconnected() receives in an already cancelled scope.
+            if time.monotonic() < disconnect_at:
+                await asyncio.sleep(disconnect_at - time.monotonic())
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        await app(scope, receive, send)
+        return sent
+
+    cancelled = 'isa_phm_converter_cancellations_total{size_class="small"} 1'
+    with TestClient(app) as test_client:
+        started = time.monotonic()
+        sent = test_client.portal.call(_request_then_disconnect)
+        # The shared conversion is torn down after the 499 is sent; the count follows once the converter is gone.
+        metrics = test_client.get("/metrics").text
+        while cancelled not in metrics and time.monotonic() - started < 10:
+            time.sleep(0.05)
+            metrics = test_client.get("/metrics").text
+        elapsed = time.monotonic() - started
+
+    start = next(message for message in sent if message["type"] == "http.response.start")
+    assert start["status"] == 499
+    assert (b"x-request-id", scope["state"]["request_id"].encode()) in start["headers"]
+    assert cancelled in metrics
+    assert elapsed < 10
+
+
+def test_convert_kills_converter_at_its_timeout(test_settings: Settings, minimal_payload: dict, tmp_path):
+    script = tmp_path / "slow_converter.py"
+    script.write_text("import time\ntime.sleep(30)\n", encoding="utf-8")
+    settings = replace(
+        test_settings,
+        converter_script_path=script,
+        converter_timeout_seconds=1,
+        converter_timeout_per_1k_cost_seconds=0.0,
+    )
+
+    started = time.monotonic()
+    with TestClient(create_app(settings)) as timeout_client:
+        response = _post_payload(timeout_client, minimal_payload)
+
+    assert response.status_code == 504
+    assert response.json()["error"]["code"] == "converter_timeout"
+    assert time.monotonic() - started < 10
+
+
+def test_converter_subprocess_reports_resource_usage(test_settings: Settings, tmp_path):
+    script = tmp_path / "converter.py"
+    script.write_text("buffer = bytearray(64 * 1024 * 1024)\n", encoding="utf-8")
+    settings = replace(test_settings, converter_script_path=script)
+
+    usage = main_module._run_converter_subprocess(settings, str(tmp_path / "in.json"), str(tmp_path / "out.json"))
+
+    assert usage is not None
+    assert usage.peak_rss_bytes >= 64 * 1024 * 1024
+    assert usage.cpu_seconds >= 0
+
+
+def test_converter_resource_limit_breaches_are_distinct(test_settings: Settings, tmp_path):
+    memory_script = tmp_path / "memory.py"
+    memory_script.write_text(
+        f"import sys\nsys.exit({main_module.CONVERTER_MEMORY_LIMIT_EXIT_CODE})\n", encoding="utf-8"
+    )
+    cpu_script = tmp_path / "cpu.py"
+    cpu_script.write_text(
+        "import resource\nresource.setrlimit(resource.RLIMIT_CPU, (1, 5))\nwhile True:\n    pass\n",
+        encoding="utf-8",
+    )
+    args = (str(tmp_path / "in.json"), str(tmp_path / "out.json"))
+    limited = replace(test_settings, converter_cpu_limit_seconds=1, converter_memory_limit_mb=4096)
+
+    with pytest.raises(ConverterResourceLimitError) as memory_exc:
+        main_module._run_converter_subprocess(replace(limited, converter_script_path=memory_script), *args)
+    with pytest.raises(ConverterResourceLimitError) as cpu_exc:
+        main_module._run_converter_subprocess(replace(limited, converter_script_path=cpu_script), *args)
+
+    assert memory_exc.value.resource == "memory"
+    assert cpu_exc.value.resource == "cpu"
+
+
+def test_convert_replays_result_for_idempotency_key(client: TestClient, minimal_payload: dict, monkeypatch):
+    calls: list = []
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _fake_converter(calls))
+    headers = {"Idempotency-Key": "submit-1"}
+    body = json.dumps(minimal_payload)
+
+    first = client.post("/convert", headers=headers, files={"file": ("input.json", body, "application/json")})
+    second = client.post("/convert", headers=headers, files={"file": ("input.json", body, "application/json")})
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.text == first.text
+    assert len(calls) == 1
+
+
+def test_convert_rejects_reused_idempotency_key(client: TestClient, minimal_payload: dict, monkeypatch):
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _fake_converter([]))
+    headers = {"Idempotency-Key": "submit-2"}
+    changed = copy.deepcopy(minimal_payload)
+    changed["title"] = "Changed title"
+
+    first = client.post("/convert", headers=headers, files={"file": ("input.json", json.dumps(minimal_payload), "application/json")})
+    second = client.post("/convert", headers=headers, files={"file": ("input.json", json.dumps(changed), "application/json")})
+
+    assert first.status_code == 200
+    assert second.status_code == 422
+    assert second.json()["error"]["code"] == "idempotency_key_conflict"
+
+
+def test_convert_honors_if_none_match_for_deterministic_output(client: TestClient, minimal_payload: dict, monkeypatch):
+    calls: list = []
+    monkeypatch.setattr(main_module, "_run_converter_subprocess", _fake_converter(calls))
+    body = json.dumps(minimal_payload)
+    params = {"deterministic_ids": "true"}
+
+    first = client.post("/convert", params=params, files={"file": ("input.json", body, "application/json")})
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    second = client.post(
+        "/convert",
+        params=params,
+        headers={"If-None-Match": etag},
+        files={"file": ("input.json", body, "application/json")},
+    )
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert len(calls) == 1
+
+    random_ids = client.post("/convert", files={"file": ("input.json", body, "application/json")})
+    assert random_ids.status_code == 200
+    assert "ETag" not in random_ids.headers
+
+
 def test_healthz_and_readyz(client: TestClient):
     health = client.get("/healthz")
     assert health.status_code == 200
@@ -81,6 +477,52 @@ def test_healthz_and_readyz(client: TestClient):
     ready = client.get("/readyz")
     assert ready.status_code == 200
     assert ready.json()["status"] == "ready"
+    assert set(ready.json()["readiness"]["schemas"]) == {"compat", "strict"}
+
+
+def test_schema_changes_are_hot_reloaded(test_settings: Settings, minimal_payload: dict, tmp_path):
+    schema_path = tmp_path / "IsaPhmInfo.schema.json"
+    schema_path.write_bytes(test_settings.schema_path.read_bytes())
+    settings = replace(test_settings, schema_path=schema_path, schema_reload_interval_seconds=0)
+    app = create_app(settings)
+
+    with TestClient(app) as reload_client:
+        original_sha = reload_client.get("/readyz").json()["readiness"]["schemas"]["compat"]["sha256"]
+        assert reload_client.post("/validate", json=minimal_payload).json()["valid"] is True
+
+        schema = json.loads(schema_path.read_text(encoding="utf-8"))
+        schema["required"] = [*schema.get("required", []), "added_by_reload"]
+        schema_path.write_text(json.dumps(schema), encoding="utf-8")
+
+        assert reload_client.portal.call(main_module._reload_changed_schemas, app) == ["compat"]
+
+        reloaded_sha = reload_client.get("/readyz").json()["readiness"]["schemas"]["compat"]["sha256"]
+        assert reloaded_sha != original_sha
+        assert reload_client.post("/validate", json=minimal_payload).json()["valid"] is False
+        assert f'isa_phm_schema_info{{mode="compat",sha256="{reloaded_sha}"}} 1' in reload_client.get("/metrics").text
+
+
+def test_schema_missing_at_startup_is_loaded_when_it_appears(test_settings: Settings, tmp_path):
+    schema_path = tmp_path / "IsaPhmInfo.schema.json"
+    settings = replace(test_settings, schema_path=schema_path, schema_reload_interval_seconds=0)
+    app = create_app(settings)
+
+    with TestClient(app) as reload_client:
+        missing = reload_client.get("/readyz")
+        assert missing.status_code == 503
+        assert missing.json()["readiness"]["errors"] == [f"Schema file not found: {schema_path}"]
+
+        schema_path.write_text("{not json", encoding="utf-8")
+        assert reload_client.portal.call(main_module._reload_changed_schemas, app) == []
+        assert reload_client.get("/readyz").json()["readiness"]["errors"][0].startswith("Failed to load schema")
+
+        schema_path.write_bytes(test_settings.schema_path.read_bytes())
+        assert reload_client.portal.call(main_module._reload_changed_schemas, app) == ["compat"]
+        ready = reload_client.get("/readyz")
+
+    assert ready.status_code == 200
+    assert ready.json()["readiness"]["ready"] is True
+    assert ready.json()["readiness"]["errors"] == []
 
 
 def test_readyz_degraded_when_converter_missing(test_settings: Settings):
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import copy
+
+from app.config import Settings
+from app.cost_estimation import estimate_payload_cost
+from app.metrics import MetricsRegistry
+from app.scheduling import ConverterScheduler, converter_timeout_for_cost
+
+
+def test_payload_cost_scales_timeout_and_size_class(test_settings: Settings, minimal_payload: dict):
+    small = estimate_payload_cost(minimal_payload)
+    large_payload = copy.deepcopy(minimal_payload)
+    for study in large_payload["studies"]:
+        study["total_runs"] = 100_000
+    large = estimate_payload_cost(large_payload)
+
+    assert small.studies == len(minimal_payload["studies"])
+    assert large.score > small.score
+    scheduler = ConverterScheduler(test_settings, MetricsRegistry())
+    assert scheduler.classify(small) == "small"
+    assert scheduler.classify(large) == "large"
+    assert converter_timeout_for_cost(test_settings, small) >= test_settings.converter_timeout_seconds
+    assert converter_timeout_for_cost(test_settings, large) > converter_timeout_for_cost(test_settings, small)
+    assert converter_timeout_for_cost(test_settings, large) <= test_settings.converter_max_timeout_seconds
+    assert estimate_payload_cost({"studies": "not-a-list"}).score == 0
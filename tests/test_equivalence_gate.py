@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+from pathlib import Path
+
+GATE_PATH = Path(__file__).resolve().parents[1] / "tools" / "equivalence-gate.py"
+
+
+def _load_gate():
+    spec = importlib.util.spec_from_file_location("equivalence_gate", GATE_PATH)
+    gate = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gate)
+    return gate
+
+
+def test_gate_runs_revisions_without_deterministic_ids(tmp_path, minimal_payload: dict):
+    # Converter packages from before converter/identifiers.py only have create_isa_data(payload).
+    app_dir = tmp_path / "app"
+    (app_dir / "converter").mkdir(parents=True)
+    (app_dir / "converter" / "__init__.py").write_text("", encoding="utf-8")
+    (app_dir / "converter" / "entrypoint.py").write_text(
+        "def create_isa_data(payload):\n"
+        "    return {'identifier': '3f2b8a4e-1c9d-4e7a-9b6f-0a1b2c3d4e5f', 'studies': len(payload['studies'])}\n",
+        encoding="utf-8",
+    )
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    (corpus_dir / "payload.json").write_text(json.dumps(minimal_payload), encoding="utf-8")
+    gate = _load_gate()
+
+    for out_name in ("out-reference", "out-candidate"):
+        results = gate.run_implementation(app_dir, corpus_dir, tmp_path / out_name, 1, check_production=True)
+        assert results["payload.json"]["variants"] == []
+
+    reference = json.loads((tmp_path / "out-reference" / "payload.json").read_text(encoding="utf-8"))
+    assert reference == {"identifier": "3f2b8a4e-1c9d-4e7a-9b6f-0a1b2c3d4e5f", "studies": 1}
+    assert gate.production_differences(tmp_path, "payload.json", [], []) == {}
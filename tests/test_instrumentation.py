@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from app.converter.instrumentation import StageRecorder
+
+
+def test_stage_recorder_reports_memory_per_stage():
+    assert StageRecorder().memory_report() == {"peak_traced_bytes": 0, "stages": {}}
+
+    recorder = StageRecorder(trace_memory=True, top_sites=3)
+    recorder.start()
+    try:
+        for _ in range(2):
+            with recorder.stage("samples"):
+                retained = [bytearray(1024) for _ in range(200)]
+        with recorder.stage("assays"):
+            scratch = bytearray(4 * 1024 * 1024)
+            del scratch
+    finally:
+        recorder.stop()
+
+    assert recorder.timing_report()["samples"]["calls"] == 2
+    report = recorder.memory_report()
+    samples = report["stages"]["samples"]
+    assert samples["calls"] == 2
+    assert samples["peak_bytes"] >= 200 * 1024
+    assert "test_instrumentation.py" in samples["top_sites"][0]["site"]
+    assert report["stages"]["assays"]["peak_bytes"] >= 4 * 1024 * 1024
+    assert report["stages"]["assays"]["net_bytes"] < 1024 * 1024
+    assert report["peak_traced_bytes"] >= 4 * 1024 * 1024
+    assert len(retained) == 200
@@ -2,12 +2,19 @@ from __future__ import annotations
 
 import json
 import os
+import pstats
 import subprocess
 import sys
+import copy
 import tempfile
+from dataclasses import replace
 
 from fastapi.testclient import TestClient
 
+from app.converter.diagnostics import ConversionDiagnostics
+from app.converter.entrypoint import create_isa_data
+from app.main import create_app
+
 
 def _post_payload(client: TestClient, payload: dict):
     return client.post("/convert", files={"file": ("input.json", json.dumps(payload), "application/json")})
@@ -17,6 +24,19 @@ def test_convert_integration_returns_parsable_isa_json(client: TestClient, minim
     response = _post_payload(client, minimal_payload)
     assert response.status_code == 200
     assert response.headers["content-type"].startswith("application/json")
+    timed_stages = {entry.split(";")[0].strip() for entry in response.headers["Server-Timing"].split(",")}
+    assert {
+        "prepare",
+        "conversion",
+        "payload_load",
+        "investigation_metadata",
+        "protocols",
+        "samples",
+        "factor_values",
+        "assays",
+        "serialization",
+        "total",
+    } <= timed_stages
 
     output = json.loads(response.text)
     assert isinstance(output, dict)
@@ -40,3 +60,137 @@ def test_convert_integration_returns_parsable_isa_json(client: TestClient, minim
         os.unlink(path)
 
     assert verify.returncode == 0, verify.stdout + "\n" + verify.stderr
+
+
+def test_convert_integration_validates_isa_in_converter(client: TestClient, minimal_payload: dict):
+    response = client.post(
+        "/convert",
+        params={"validate_isa": "true"},
+        files={"file": ("input.json", json.dumps(minimal_payload), "application/json")},
+    )
+    assert response.status_code == 200
+
+    body = response.json()
+    assert body["isa_json"].get("title") == minimal_payload["title"]
+    assert body["isa_validation"]["valid"] is True
+    assert body["isa_validation"]["errors"] == []
+    assert isinstance(body["isa_validation"]["warnings"], list)
+
+
+def test_convert_integration_deterministic_ids_are_reproducible(client: TestClient, minimal_payload: dict):
+    responses = [
+        client.post(
+            "/convert",
+            params={"deterministic_ids": "true"},
+            files={"file": ("input.json", json.dumps(minimal_payload), "application/json")},
+        )
+        for _ in range(2)
+    ]
+    assert [response.status_code for response in responses] == [200, 200]
+    assert responses[0].text == responses[1].text
+
+
+def test_convert_integration_deterministic_ids_accept_lone_surrogates(client: TestClient, minimal_payload: dict):
+    # json.loads accepts lone surrogate escapes, so they must not break the payload digest.
+    minimal_payload["title"] = "Bearing run \ud800"
+    response = client.post(
+        "/convert",
+        params={"deterministic_ids": "true"},
+        files={"file": ("input.json", json.dumps(minimal_payload), "application/json")},
+    )
+    assert response.status_code == 200
+    assert json.loads(response.text)["title"] == "Bearing run \ud800"
+
+
+def test_convert_integration_stores_profiles_when_requested(test_settings, minimal_payload: dict, tmp_path):
+    settings = replace(test_settings, profiling_enabled=True, profile_dir=tmp_path, profile_max_files=2)
+    with TestClient(create_app(settings)) as profiling_client:
+        responses = [
+            profiling_client.post(
+                "/convert",
+                headers={"X-Profile": "1", "X-Request-ID": "profile-me"},
+                files={"file": ("input.json", json.dumps(minimal_payload), "application/json")},
+            )
+            for _ in range(2)
+        ]
+
+    assert [response.status_code for response in responses] == [200, 200]
+    first_id, second_id = (response.headers["X-Profile-Id"] for response in responses)
+    assert first_id != second_id
+    assert second_id.endswith("-profile-me")
+    # The reused request id gets its own files, and only the newest request's files are kept.
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"{second_id}.api.pstats",
+        f"{second_id}.converter.pstats",
+    ]
+    api_stats = pstats.Stats(str(tmp_path / f"{second_id}.api.pstats"))
+    converter_stats = pstats.Stats(str(tmp_path / f"{second_id}.converter.pstats"))
+    assert any(function == "validate_payload_semantics" for _, _, function in api_stats.stats)
+    assert any(function == "create_isa_document" for _, _, function in converter_stats.stats)
+
+
+def test_convert_integration_reuses_cached_studies(client: TestClient, test_settings, minimal_payload: dict, tmp_path):
+    minimal_payload["studies"][0]["study_to_study_variable_mapping"] = []  # one diagnostic per study
+    second_study = copy.deepcopy(minimal_payload["studies"][0])
+    second_study["id"] = "study-2"
+    minimal_payload["studies"].append(second_study)
+    changed_payload = copy.deepcopy(minimal_payload)
+    changed_payload["studies"][1]["name"] = "Changed study"
+    # Contacts are not part of the cache key; cached studies get the current ones.
+    changed_payload["contacts"] = [{"id": "author-1", "firstName": "Ada", "lastName": "Lovelace", "roles": ["Author"]}]
+
+    def _convert(test_client: TestClient, payload: dict):
+        response = test_client.post(
+            "/convert",
+            params={"deterministic_ids": "true"},
+            files={"file": ("input.json", json.dumps(payload), "application/json")},
+        )
+        assert response.status_code == 200
+        return response
+
+    settings = replace(test_settings, study_cache_dir=tmp_path)
+    with TestClient(create_app(settings)) as caching_client:
+        _convert(caching_client, minimal_payload)
+        cached = _convert(caching_client, changed_payload)
+        metrics = caching_client.get("/metrics").text
+
+    assert "study_cache" in cached.headers["Server-Timing"]
+    assert cached.text == _convert(client, changed_payload).text
+    assert len(list(tmp_path.glob("*.study.json"))) == 3
+    assert 'isa_phm_converter_study_cache_total{result="hit"} 1' in metrics
+    assert 'isa_phm_converter_study_cache_total{result="miss"} 3' in metrics
+
+
+def test_convert_integration_caches_studies_with_lone_surrogates(client: TestClient, test_settings, minimal_payload: dict, tmp_path):
+    minimal_payload["studies"][0]["name"] = "Bearing run \ud800"
+
+    def _convert(test_client: TestClient):
+        response = test_client.post(
+            "/convert",
+            params={"deterministic_ids": "true"},
+            files={"file": ("input.json", json.dumps(minimal_payload), "application/json")},
+        )
+        assert response.status_code == 200
+        return response.text
+
+    with TestClient(create_app(replace(test_settings, study_cache_dir=tmp_path))) as caching_client:
+        cold, warm = _convert(caching_client), _convert(caching_client)
+
+    assert cold == warm == _convert(client)
+    assert len(list(tmp_path.glob("*.study.json"))) == 1
+
+
+def test_create_isa_data_counts_diagnostics_instead_of_logging_each(minimal_payload: dict, caplog):
+    study = minimal_payload["studies"][0]
+    study["study_to_study_variable_mapping"] = []
+    run = study["assay_details"][0]["runs"][0]
+    run["raw_file_name"] = run["processed_file_name"] = ""
+
+    diagnostics = ConversionDiagnostics(max_samples=1)
+    with caplog.at_level("WARNING", logger="isa_phm_converter"):
+        create_isa_data(minimal_payload, diagnostics=diagnostics)
+
+    assert diagnostics.counts() == {"missing_variable_mapping": 1, "run_without_output_files": 1}
+    assert diagnostics.as_list()[0]["samples"] == [{"variable_name": "Load", "run_number": 1}]
+    assert len(caplog.records) == 1
+    assert caplog.records[0].diagnostics == diagnostics.counts()
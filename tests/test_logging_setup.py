@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+
+from app.logging_setup import DroppingQueueHandler, JSONFormatter
+
+
+def test_queue_logging_defers_formatting_and_drops_when_full():
+    log_queue: queue.Queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    test_logger = logging.getLogger("isa_phm_test_queue")
+    test_logger.propagate = False
+    test_logger.addHandler(handler)
+    try:
+        errors = ["a"]
+        test_logger.warning("convert_success request_id=%s", "r1", extra={"size_class": "small"})
+        test_logger.warning("errors=%s", errors)
+        errors.append("b")
+        test_logger.warning("dropped")
+    finally:
+        test_logger.removeHandler(handler)
+
+    assert handler.dropped == 1
+    deferred, eager = log_queue.get_nowait(), log_queue.get_nowait()
+    assert deferred.args == ("r1",)
+    assert eager.getMessage() == "errors=['a']"
+
+    entry = json.loads(JSONFormatter().format(deferred))
+    assert entry["message"] == "convert_success request_id=r1"
+    assert entry["level"] == "WARNING"
+    assert entry["size_class"] == "small"
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+from app.cost_estimation import estimate_payload_cost
+from app.semantic_validation import validate_payload_semantics
+
+from tools.payload_generator import SIZES, PayloadShape, generate_payload
+
+
+def test_generated_payloads_are_valid(client: TestClient):
+    shapes = [SIZES["small"], SIZES["medium"], PayloadShape(studies=2, sensors=3, assays=5, runs=4, contacts=0)]
+    for shape in shapes:
+        payload = generate_payload(shape)
+        assert client.post("/validate", json=payload).json()["valid"] is True
+        assert validate_payload_semantics(payload) == []
+
+    large = estimate_payload_cost(generate_payload(SIZES["large"]))
+    assert large.studies == SIZES["large"].studies
+    assert large.total_runs == SIZES["large"].studies * SIZES["large"].runs
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import json
+
+from app.converter.payload_model import build_payload_model
+from app.semantic_validation import validate_payload_semantics
+
+from tools.payload_generator import PayloadShape, generate_payload
+
+
+def test_payload_model_resolves_aliases_and_indexes_once():
+    # Round-tripped like a request body, so no two studies share a setup object.
+    payload = json.loads(json.dumps(generate_payload(PayloadShape(studies=3, sensors=2, assays=2, runs=3, contacts=0))))
+    study = payload["studies"][1]
+    study["selected_measurement_protocol_id"] = study.pop("selectedMeasurementProtocolId")
+
+    model = build_payload_model(payload)
+    assert build_payload_model(model) is model
+    study_model = model.studies[1]
+    assert study_model.measurement.selected_id == study["selected_measurement_protocol_id"]
+    assert study_model.measurement.selected["id"] == study_model.measurement.selected_id
+    assert study_model.setup.sensor_ids == {sensor["id"] for sensor in study["used_setup"]["sensors"]}
+
+    sensor_id = study["used_setup"]["sensors"][0]["id"]
+    entries = study_model.measurement.entries_for_source(sensor_id)
+    assert entries and all(entry["sourceId"] == sensor_id for entry in entries)
+
+    mapping = study["study_to_study_variable_mapping"][-1]
+    assert study_model.mapping_for(mapping["variableName"], mapping["runNumber"]) is mapping
+    assert study_model.mapping_for(mapping["variableName"], 99) is None
+    assert validate_payload_semantics(model) == []
+
+    # Studies with content-equal setups share its derived maps; a different setup gets its own.
+    assert model.studies[0].setup is model.studies[1].setup
+    assert model.studies[1].measurement.selected is model.studies[0].measurement.selected
+    payload["studies"][2]["used_setup"]["name"] = "Other rig"
+    changed = build_payload_model(payload)
+    assert changed.studies[0].setup is changed.studies[1].setup is not changed.studies[2].setup
+    assert len(changed.setups) == 2
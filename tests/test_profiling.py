@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
+from app.config import Settings
+from app.profiling import PROFILE_SUFFIX, new_profile_id, profile_path, profile_requested, prune_profiles
+
+
+def test_profile_requested_only_when_enabled(test_settings: Settings):
+    enabled = replace(test_settings, profiling_enabled=True)
+
+    assert profile_requested(enabled, {"X-Profile": "1"}) is True
+    assert profile_requested(enabled, {"X-Profile": "0"}) is False
+    assert profile_requested(replace(test_settings, profiling_enabled=False), {"X-Profile": "1"}) is False
+
+
+def test_profile_ids_are_unique_per_request_and_safe_as_file_names(test_settings: Settings, tmp_path):
+    settings = replace(test_settings, profile_dir=tmp_path / "profiles")
+    first, second = new_profile_id("../same id"), new_profile_id("../same id")
+
+    assert first != second
+    assert first.endswith("-.._same_id")
+    assert profile_path(settings, first, "api") == tmp_path / "profiles" / f"{first}.api{PROFILE_SUFFIX}"
+
+
+def test_prune_profiles_leaves_room_for_one_request(test_settings: Settings, tmp_path):
+    settings = replace(test_settings, profile_dir=tmp_path, profile_max_files=4)
+    names = [f"{index:015d}-abcd1234-request.{stage}{PROFILE_SUFFIX}" for index in range(3) for stage in ("api", "converter")]
+    for name in names:
+        (tmp_path / name).write_bytes(b"")
+
+    prune_profiles(settings)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == names[-2:]
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import threading
+
+from app.converter.sampling import StackSampler
+
+
+def test_stack_sampler_collapses_busy_threads():
+    stop = threading.Event()
+
+    def _busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=_busy_loop, name="busy")
+    worker.start()
+    sampler = StackSampler(interval_seconds=0.001, window_seconds=60)
+    try:
+        for _ in range(5):
+            sampler.sample_once()
+    finally:
+        stop.set()
+        worker.join()
+
+    sampler.add({"main:convert_file": 3}, prefix="converter")
+    collapsed = sampler.collapsed().splitlines()
+    assert any(line.startswith("thread:busy;") and "_busy_loop" in line for line in collapsed)
+    assert "converter;main:convert_file 3" in collapsed
+    assert not any("stack-sampler" in line for line in collapsed)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import replace
+
+from app.config import Settings
+from app.metrics import MetricsRegistry
+from app.scheduling import ConverterScheduler
+
+
+def test_scheduler_keeps_small_jobs_out_of_large_queue(test_settings: Settings):
+    settings = replace(test_settings, converter_small_slots=1, converter_large_slots=1)
+    metrics = MetricsRegistry()
+
+    async def _scenario():
+        scheduler = ConverterScheduler(settings, metrics)
+        release_large = asyncio.Event()
+        order: list[str] = []
+
+        async def _job(size_class: str, name: str, hold: asyncio.Event | None = None):
+            async with scheduler.slot(size_class):
+                order.append(name)
+                if hold is not None:
+                    await hold.wait()
+
+        large_running = asyncio.create_task(_job("large", "large-1", release_large))
+        large_queued = asyncio.create_task(_job("large", "large-2"))
+        await asyncio.sleep(0)
+        scheduler.publish_metrics()
+        assert metrics.get("isa_phm_converter_queue_depth").value(size_class="large") == 1
+
+        await _job("small", "small-1")
+        release_large.set()
+        await asyncio.gather(large_running, large_queued)
+        return order
+
+    assert asyncio.run(_scenario()) == ["large-1", "small-1", "large-2"]
+    assert metrics.get("isa_phm_converter_queue_wait_seconds").snapshot(size_class="large")[0] == 2
+    assert metrics.get("isa_phm_converter_queue_wait_seconds").snapshot(size_class="small")[0] == 1
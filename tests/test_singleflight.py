@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.singleflight import SingleFlight
+
+
+def test_singleflight_collapses_concurrent_calls():
+    calls = []
+
+    async def _work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def _run():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("key", "fingerprint", _work) for _ in range(5)))
+
+    results = asyncio.run(_run())
+    assert len(calls) == 1
+    assert [result for result, _shared in results] == ["result"] * 5
+    assert sorted(shared for _result, shared in results) == [False, True, True, True, True]
+
+
+def test_singleflight_cancels_call_when_all_waiters_leave():
+    cancelled = []
+
+    async def _work():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def _scenario():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do("k", "fp", _work))
+        second = asyncio.ensure_future(flight.do("k", "fp", _work))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        assert cancelled == []
+
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flight.in_flight()
+
+    assert asyncio.run(_scenario()) == 0
+    assert cancelled == [True]
+
+
+def test_singleflight_bounds_retained_results_by_size():
+    async def _scenario():
+        flight = SingleFlight(max_retained_bytes=10, result_size=len)
+        for key, result in (("a", b"aaaa"), ("b", b"bbbb"), ("c", b"cccc"), ("huge", b"x" * 11)):
+            await flight.do(key, "fp", lambda result=result: asyncio.sleep(0, result), retain_seconds=60)
+        retained_bytes = flight.retained_bytes()
+        replays = {key: await flight.do(key, "fp", lambda: asyncio.sleep(0, b"new"), retain_seconds=60) for key in "ba"}
+        return retained_bytes, replays
+
+    retained_bytes, replays = asyncio.run(_scenario())
+    # "a" was dropped to make room for "c", and "huge" alone exceeds the budget.
+    assert retained_bytes == 8
+    assert replays == {"a": (b"new", False), "b": (b"bbbb", True)}
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import copy
+import os
+
+from app.converter.payload_model import build_payload_model
+from app.converter.study_cache import STUDY_CACHE_SUFFIX, StudyCache, study_cache_key
+
+
+def test_study_cache_key_covers_study_inputs_but_not_contacts(minimal_payload: dict):
+    def _key(payload: dict) -> str:
+        model = build_payload_model(payload)
+        return study_cache_key(model, 0, model.studies[0].raw, "v1")
+
+    key = _key(minimal_payload)
+    other_contacts = copy.deepcopy(minimal_payload)
+    other_contacts["contacts"] = []
+    other_variables = copy.deepcopy(minimal_payload)
+    other_variables["study_variables"][0]["name"] = "Renamed"
+    lone_surrogate = copy.deepcopy(minimal_payload)
+    lone_surrogate["studies"][0]["name"] = "Bearing run \ud800"
+
+    assert _key(other_contacts) == key
+    assert _key(other_variables) != key
+    assert _key(lone_surrogate) != key
+    assert study_cache_key(build_payload_model(minimal_payload), 0, minimal_payload["studies"][0], "v2") != key
+
+
+def test_study_cache_stores_loads_and_prunes_least_recently_used(tmp_path):
+    cache = StudyCache(tmp_path, max_entries=2, converter_version="v1")
+    study = {
+        "identifier": "study-1",
+        "people": [{"lastName": "Lovelace"}],
+        "unitCategories": [{"@id": "#unit/token-1", "annotationValue": "Hz"}],
+    }
+    for key in ("a", "b", "c"):
+        cache.store(key, study, [{"code": "missing_variable_mapping", "message": "", "count": 1, "samples": []}])
+        os.utime(tmp_path / f"{key}{STUDY_CACHE_SUFFIX}", (ord(key), ord(key)))
+
+    entry = cache.load("a")
+    cache.prune()
+
+    assert entry["study"] == {"identifier": "study-1", "unitCategories": study["unitCategories"]}
+    assert entry["units"] == {"token-1": "Hz"}
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"a{STUDY_CACHE_SUFFIX}", f"c{STUDY_CACHE_SUFFIX}"]
+    assert cache.load("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_study_cache_treats_unreadable_entries_as_misses(tmp_path):
+    (tmp_path / f"broken{STUDY_CACHE_SUFFIX}").write_text("{not json", encoding="utf-8")
+    cache = StudyCache(tmp_path, converter_version="v1")
+
+    assert cache.load("broken") is None
+    assert cache.stats() == {"hits": 0, "misses": 1}
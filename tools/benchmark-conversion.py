@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Time semantic validation, conversion and ISA-JSON serialization on generated payloads."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_RESULTS_DIR = REPO_ROOT / ".benchmarks"
+STAGES = ("validate_payload_semantics", "create_isa_data", "serialize_isa_json")
+
+sys.path.insert(0, str(REPO_ROOT))
+
+from tools.payload_generator import SIZES, generate_payload  # noqa: E402
+
+
+def _git(*args: str) -> str:
+    try:
+        result = subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return result.stdout.strip()
+
+
+def _current_revision() -> Dict[str, Any]:
+    commit = _git("rev-parse", "HEAD") or "unknown"
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    return {"commit": commit, "dirty": dirty}
+
+
+def _time_stage(func: Callable[[], Any], repeat: int) -> tuple[Dict[str, Any], Any]:
+    timings: List[float] = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return {
+        "min_seconds": round(min(timings), 6),
+        "median_seconds": round(statistics.median(timings), 6),
+        "runs": len(timings),
+    }, result
+
+
+def run_benchmarks(sizes: List[str], repeat: int) -> Dict[str, Any]:
+    # Imported here so --help works without isatools installed.
+    from isatools.isajson import ISAJSONEncoder
+
+    from app.converter.entrypoint import create_isa_data
+    from app.semantic_validation import validate_payload_semantics
+
+    results: Dict[str, Any] = {}
+    for size in sizes:
+        shape = SIZES[size]
+        payload = generate_payload(shape)
+        semantic_timing, issues = _time_stage(lambda: validate_payload_semantics(payload), repeat)
+        if issues:
+            raise RuntimeError(f"Generated '{size}' payload is not semantically valid: {issues[:3]}")
+        convert_timing, investigation = _time_stage(lambda: create_isa_data(payload), repeat)
+        serialize_timing, document = _time_stage(
+            lambda: json.dumps(investigation, cls=ISAJSONEncoder, sort_keys=True, indent=4, separators=(",", ": ")),
+            repeat,
+        )
+        results[size] = {
+            "shape": shape.as_dict(),
+            "payload_bytes": len(json.dumps(payload)),
+            "isa_json_bytes": len(document),
+            "stages": {
+                "validate_payload_semantics": semantic_timing,
+                "create_isa_data": convert_timing,
+                "serialize_isa_json": serialize_timing,
+            },
+        }
+        print(
+            f"{size:>7}: " + "  ".join(f"{stage}={results[size]['stages'][stage]['min_seconds']:.4f}s" for stage in STAGES),
+            flush=True,
+        )
+    return results
+
+
+def _find_results(results_dir: Path, reference: str) -> Path:
+    candidate = Path(reference)
+    if candidate.is_file():
+        return candidate
+    commit = _git("rev-parse", "--verify", f"{reference}^{{commit}}") or reference
+    # Prefer results from a clean checkout of the commit over ones with local changes.
+    for name in (f"{commit}.json", f"{commit}-dirty.json"):
+        if (results_dir / name).is_file():
+            return results_dir / name
+    raise FileNotFoundError(f"No stored benchmark results for '{reference}' in {results_dir}")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    print(f"\nComparing against {baseline['commit'][:12]}{' (dirty)' if baseline.get('dirty') else ''}")
+    print(f"{'size':>7}  {'stage':<28} {'baseline':>10} {'current':>10} {'change':>8}")
+    for size, result in current["results"].items():
+        baseline_result = baseline["results"].get(size)
+        if baseline_result is None:
+            continue
+        for stage in STAGES:
+            before = baseline_result["stages"][stage]["min_seconds"]
+            after = result["stages"][stage]["min_seconds"]
+            change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"{size:>7}  {stage:<28} {before:>9.4f}s {after:>9.4f}s {change:>8}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        default="small,medium,large",
+        help=f"Comma-separated payload sizes to run ({', '.join(SIZES)})",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per stage (the minimum is compared)")
+    parser.add_argument("--results-dir", type=Path, default=DEFAULT_RESULTS_DIR, help="Where results are stored")
+    parser.add_argument("--no-save", action="store_true", help="Do not store results for this run")
+    parser.add_argument(
+        "--compare",
+        metavar="REV_OR_FILE",
+        help="Compare with stored results of a commit (any git revision) or a results file",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        print(f"Unknown sizes: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    baseline = None
+    if args.compare:
+        try:
+            baseline = json.loads(_find_results(args.results_dir, args.compare).read_text(encoding="utf-8"))
+        except FileNotFoundError as exc:
+            print(str(exc), file=sys.stderr)
+            return 2
+
+    logging.disable(logging.WARNING)
+    revision = _current_revision()
+    current = {
+        **revision,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": run_benchmarks(sizes, max(1, args.repeat)),
+    }
+
+    if not args.no_save:
+        args.results_dir.mkdir(parents=True, exist_ok=True)
+        suffix = "-dirty" if revision["dirty"] else ""
+        results_path = args.results_dir / f"{revision['commit']}{suffix}.json"
+        results_path.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print(f"Results written to {results_path}")
+
+    if baseline is not None:
+        compare(baseline, current)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""Check that a converter change keeps the ISA-JSON output identical and does not regress time or memory."""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import re
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+FIXTURES_DIR = REPO_ROOT / "tests" / "fixtures"
+
+sys.path.insert(0, str(REPO_ROOT))
+
+from tools.payload_generator import SIZES, generate_payload  # noqa: E402
+
+_UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+# Runs in a separate interpreter per implementation, with that tree's app/ on sys.path, so the reference
+# and the candidate converter never share a process. Timings only call create_isa_data(payload), which
+# every revision of the converter package supports. With check_production set, and for revisions with
+# deterministic ids, each payload is also converted the way web-to-isa-phm.py does (deterministic ids, create_isa_document where it exists) and,
+# for revisions with a study cache, with a cold, a warm and a primed cache; see production_variants().
+RUNNER = r"""
+import copy, json, logging, sys, tempfile, time, tracemalloc
+from pathlib import Path
+
+app_dir, corpus_dir, out_dir, repeat = sys.argv[1], Path(sys.argv[2]), Path(sys.argv[3]), int(sys.argv[4])
+check_production = sys.argv[5] == "1"
+sys.path.insert(0, app_dir)
+logging.disable(logging.WARNING)
+
+from isatools.isajson import ISAJSONEncoder
+from converter.entrypoint import create_isa_data
+
+try:
+    from converter.identifiers import payload_digest, relabel_generated_ids
+except ImportError:  # revisions before deterministic ids; only the timed output is compared
+    payload_digest = relabel_generated_ids = None
+
+try:
+    from converter.entrypoint import create_isa_document
+    from converter.study_cache import StudyCache
+except ImportError:  # revisions before the study cache
+    create_isa_document = StudyCache = None
+
+
+def dumps(document):
+    return json.dumps(document, cls=ISAJSONEncoder, sort_keys=True, indent=4, separators=(",", ": "))
+
+
+def convert(payload):
+    return dumps(create_isa_data(payload))
+
+
+def convert_production(payload, study_cache=None):
+    # Mirrors convert_file in app/web-to-isa-phm.py with --deterministic-ids.
+    if create_isa_document is None:
+        document = create_isa_data(payload, deterministic_ids=True).to_dict()
+    else:
+        document = create_isa_document(payload, deterministic_ids=True, study_cache=study_cache)
+    return dumps(relabel_generated_ids(document, payload_digest(payload)))
+
+
+def neighbours(payload):
+    # Payloads that differ from ``payload`` in one section each. Studies they leave in a cache must
+    # not be reused for ``payload``, except with other contacts, which are not part of the key.
+    for section in ("study_variables", "measurement_protocols", "processing_protocols", "studies", "contacts"):
+        items = payload.get(section)
+        if isinstance(items, list) and items and isinstance(items[-1], dict):
+            neighbour = copy.deepcopy(payload)
+            neighbour[section][-1]["name"] = f"{items[-1].get('name', '')} (changed)"
+            yield neighbour
+
+
+def production_variants(payload):
+    variants = {"deterministic": convert_production(payload)}
+    if StudyCache is not None:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            variants["cold-cache"] = convert_production(payload, StudyCache(Path(cache_dir)))
+            variants["warm-cache"] = convert_production(payload, StudyCache(Path(cache_dir)))
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for neighbour in neighbours(payload):
+                convert_production(neighbour, StudyCache(Path(cache_dir)))
+            variants["primed-cache"] = convert_production(payload, StudyCache(Path(cache_dir)))
+    return variants
+
+
+results = {}
+for path in sorted(corpus_dir.glob("*.json")):
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    document = convert(payload)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        convert(payload)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    convert(payload)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    (out_dir / path.name).write_text(document, encoding="utf-8")
+    results[path.name] = {"seconds": min(timings), "peak_bytes": peak_bytes, "variants": []}
+    if check_production and relabel_generated_ids is not None:
+        for variant, output in production_variants(payload).items():
+            (out_dir / f"{path.stem}.{variant}.json").write_text(output, encoding="utf-8")
+            results[path.name]["variants"].append(variant)
+print(json.dumps(results))
+"""
+
+
+def canonicalize(document: Any) -> Any:
+    """
+    Replace every UUID in ``document`` by its ordinal of first appearance.
+
+    Keys are walked in sorted order, so two outputs that differ only in their
+    randomly generated ids canonicalize to the same structure, while
+    references between objects (``@id`` values) are preserved.
+    """
+    ordinals: Dict[str, str] = {}
+
+    def _replace(match: re.Match) -> str:
+        return ordinals.setdefault(match.group(0), f"uuid-{len(ordinals)}")
+
+    def _walk(node: Any) -> Any:
+        if isinstance(node, dict):
+            return {key: _walk(node[key]) for key in sorted(node)}
+        if isinstance(node, list):
+            return [_walk(item) for item in node]
+        if isinstance(node, str):
+            return _UUID_PATTERN.sub(_replace, node)
+        return node
+
+    return _walk(document)
+
+
+def structural_differences(reference: Any, candidate: Any, path: str = "$", limit: int = 20) -> List[str]:
+    differences: List[str] = []
+
+    def _compare(left: Any, right: Any, current: str) -> None:
+        if len(differences) >= limit:
+            return
+        if isinstance(left, dict) and isinstance(right, dict):
+            for key in sorted(left.keys() | right.keys()):
+                if key not in right:
+                    differences.append(f"{current}.{key}: missing in candidate")
+                elif key not in left:
+                    differences.append(f"{current}.{key}: only in candidate")
+                else:
+                    _compare(left[key], right[key], f"{current}.{key}")
+        elif isinstance(left, list) and isinstance(right, list):
+            if len(left) != len(right):
+                differences.append(f"{current}: {len(left)} items in reference, {len(right)} in candidate")
+            for index, (left_item, right_item) in enumerate(zip(left, right)):
+                _compare(left_item, right_item, f"{current}[{index}]")
+        elif left != right:
+            differences.append(f"{current}: {json.dumps(left)[:80]} != {json.dumps(right)[:80]}")
+
+    _compare(reference, candidate, path)
+    return differences
+
+
+def build_corpus(corpus_dir: Path, sizes: List[str], extra_sources: List[Path]) -> None:
+    for size in sizes:
+        (corpus_dir / f"generated-{size}.json").write_text(json.dumps(generate_payload(SIZES[size])), encoding="utf-8")
+    for fixture in sorted(FIXTURES_DIR.glob("*.json")):
+        (corpus_dir / f"fixture-{fixture.name}").write_text(fixture.read_text(encoding="utf-8-sig"), encoding="utf-8")
+    for source in extra_sources:
+        for path in sorted(source.glob("*.json")) if source.is_dir() else [source]:
+            document = json.loads(path.read_text(encoding="utf-8-sig"))
+            # Captures written by CAPTURE_SAMPLE_RATE wrap the payload.
+            payload = document["payload"] if "payload" in document and "captured_at" in document else document
+            (corpus_dir / f"extra-{path.name}").write_text(json.dumps(payload), encoding="utf-8")
+
+
+def production_differences(
+    work: Path, name: str, reference_variants: List[str], candidate_variants: List[str]
+) -> Dict[str, List[str]]:
+    """
+    Differences of every production-path output from the reference's deterministic one.
+
+    Outputs from both trees are compared, so the reference's own study cache is
+    checked as well; variants are prefixed with the tree they come from. A
+    reference without deterministic ids has no such output, and its timed
+    output is the expected one instead: once generated UUIDs are canonicalized
+    the two do not differ.
+    """
+    stem = Path(name).stem
+    expected_name = f"{stem}.deterministic.json" if "deterministic" in reference_variants else name
+    expected = canonicalize(json.loads((work / "out-reference" / expected_name).read_text(encoding="utf-8")))
+    found: Dict[str, List[str]] = {}
+    for tree, variants in (("reference", reference_variants), ("candidate", candidate_variants)):
+        for variant in variants:
+            if tree == "reference" and variant == "deterministic":
+                continue
+            document = json.loads((work / f"out-{tree}" / f"{stem}.{variant}.json").read_text(encoding="utf-8"))
+            found[f"{tree} {variant}"] = structural_differences(expected, canonicalize(document))
+    return found
+
+
+def export_revision(revision: str, destination: Path) -> Path:
+    archive = subprocess.run(["git", "archive", revision, "app"], cwd=REPO_ROOT, capture_output=True, check=True)
+    with tarfile.open(fileobj=io.BytesIO(archive.stdout)) as tar:
+        tar.extractall(destination, filter="data")
+    return destination / "app"
+
+
+def run_implementation(
+    app_dir: Path, corpus_dir: Path, out_dir: Path, repeat: int, check_production: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    result = subprocess.run(
+        [sys.executable, "-c", RUNNER, str(app_dir), str(corpus_dir), str(out_dir), str(repeat), str(int(check_production))],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Conversion with {app_dir} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reference", default="HEAD", help="Git revision of the reference converter (default: HEAD)")
+    parser.add_argument("--candidate", help="Git revision of the candidate converter (default: the working tree)")
+    parser.add_argument("--sizes", default="small,medium,large", help=f"Generated payload sizes ({', '.join(SIZES)})")
+    parser.add_argument(
+        "--corpus",
+        type=Path,
+        action="append",
+        default=[],
+        help="Extra payload file or directory, e.g. CAPTURE_DIR (repeatable)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed conversions per payload (the minimum is compared)")
+    parser.add_argument("--rounds", type=int, default=2, help="Alternating runs of reference and candidate")
+    parser.add_argument("--max-time-regression", type=float, default=10.0, help="Allowed slowdown of the total time in %%")
+    parser.add_argument(
+        "--max-memory-regression",
+        type=float,
+        default=10.0,
+        help="Allowed growth of the peak traced memory of any payload in %%",
+    )
+    parser.add_argument("--json-output", type=Path, help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        print(f"Unknown sizes: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    with tempfile.TemporaryDirectory(prefix="isa-phm-gate-") as workdir:
+        work = Path(workdir)
+        corpus_dir = work / "corpus"
+        corpus_dir.mkdir()
+        build_corpus(corpus_dir, sizes, args.corpus)
+        try:
+            reference_app = export_revision(args.reference, work / "reference")
+            candidate_app = export_revision(args.candidate, work / "candidate") if args.candidate else REPO_ROOT / "app"
+            # Alternate the implementations so drift in machine load does not favour either one.
+            reference: Dict[str, Dict[str, Any]] = {}
+            candidate: Dict[str, Dict[str, Any]] = {}
+            for round_index in range(max(1, args.rounds)):
+                for app_dir, out_name, results in (
+                    (reference_app, "out-reference", reference),
+                    (candidate_app, "out-candidate", candidate),
+                ):
+                    measurements = run_implementation(
+                        app_dir, corpus_dir, work / out_name, max(1, args.repeat), check_production=round_index == 0
+                    )
+                    for name, measured in measurements.items():
+                        best = results.setdefault(name, measured)
+                        best["seconds"] = min(best["seconds"], measured["seconds"])
+        except (subprocess.CalledProcessError, RuntimeError) as exc:
+            print(getattr(exc, "stderr", None) or str(exc), file=sys.stderr)
+            return 2
+
+        failures: List[str] = []
+        rows = {}
+        for name in sorted(reference):
+            reference_document = json.loads((work / "out-reference" / name).read_text(encoding="utf-8"))
+            candidate_document = json.loads((work / "out-candidate" / name).read_text(encoding="utf-8"))
+            differences = structural_differences(canonicalize(reference_document), canonicalize(candidate_document))
+            memory_change = _change(reference[name]["peak_bytes"], candidate[name]["peak_bytes"])
+            variant_differences = production_differences(work, name, reference[name]["variants"], candidate[name]["variants"])
+            rows[name] = {
+                "identical": not differences,
+                "differences": differences,
+                "production_variants": variant_differences,
+                "reference": reference[name],
+                "candidate": candidate[name],
+                "time_change_percent": round(_change(reference[name]["seconds"], candidate[name]["seconds"]), 1),
+                "memory_change_percent": round(memory_change, 1),
+            }
+            if differences:
+                failures.append(f"{name}: output differs")
+            failures.extend(
+                f"{name}: {variant} output differs" for variant, found in variant_differences.items() if found
+            )
+            if memory_change > args.max_memory_regression:
+                failures.append(f"{name}: peak memory {memory_change:+.1f}%")
+
+    total_reference = sum(row["reference"]["seconds"] for row in rows.values())
+    total_candidate = sum(row["candidate"]["seconds"] for row in rows.values())
+    time_change = _change(total_reference, total_candidate)
+    if time_change > args.max_time_regression:
+        failures.append(f"total time {time_change:+.1f}%")
+
+    print(f"{'payload':<36} {'output':>9} {'reference':>10} {'candidate':>10} {'time':>8} {'memory':>8}")
+    for name, row in rows.items():
+        print(
+            f"{name:<36} {'same' if row['identical'] else 'DIFFERS':>9} {row['reference']['seconds']:>9.4f}s "
+            f"{row['candidate']['seconds']:>9.4f}s {row['time_change_percent']:>+7.1f}% {row['memory_change_percent']:>+7.1f}%"
+        )
+        for difference in row["differences"]:
+            print(f"    {difference}")
+        for variant, found in row["production_variants"].items():
+            print(f"    {variant}: {'DIFFERS' if found else 'same'}")
+            for difference in found:
+                print(f"        {difference}")
+    print(f"{'total':<36} {'':>9} {total_reference:>9.4f}s {total_candidate:>9.4f}s {time_change:>+7.1f}%")
+
+    if args.json_output:
+        summary = {
+            "reference": args.reference,
+            "candidate": args.candidate or "working tree",
+            "payloads": rows,
+            "time_change_percent": round(time_change, 1),
+            "failures": failures,
+        }
+        args.json_output.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    if failures:
+        print("FAILED: " + "; ".join(failures), file=sys.stderr)
+        return 1
+    print("OK: output identical and within the time and memory budgets")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
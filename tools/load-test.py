@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Drive concurrent /convert traffic against a local instance of the API and report latency."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+import math
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import uvicorn
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.config import Settings  # noqa: E402
+from app.main import create_app  # noqa: E402
+from tools.payload_generator import SIZES, generate_payload  # noqa: E402
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+_SAMPLE_PATTERN = re.compile(r"^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>[^}]*)\})? (?P<value>\S+)$")
+
+
+def _coerce(current: Any, raw_value: str) -> Any:
+    if isinstance(current, bool):
+        return raw_value.strip().lower() in _TRUE_VALUES
+    if isinstance(current, int):
+        return int(raw_value)
+    if isinstance(current, float):
+        return float(raw_value)
+    if isinstance(current, Path):
+        return Path(raw_value)
+    if isinstance(current, list):
+        return [item.strip() for item in raw_value.split(",") if item.strip()]
+    return raw_value
+
+
+def apply_setting_overrides(settings: Settings, overrides: List[str]) -> Settings:
+    """Apply ``field=value`` overrides (e.g. ``converter_small_slots=8``) to ``settings``."""
+    changes: Dict[str, Any] = {}
+    known = {field.name for field in dataclasses.fields(settings)}
+    for override in overrides:
+        name, separator, raw_value = override.partition("=")
+        name = name.strip().lower()
+        if not separator or name not in known:
+            raise ValueError(f"Unknown setting override '{override}' (expected one of: {', '.join(sorted(known))})")
+        changes[name] = _coerce(getattr(settings, name), raw_value)
+    return dataclasses.replace(settings, **changes)
+
+
+def parse_mix(raw_mix: str) -> List[Tuple[str, float]]:
+    """Parse ``small=8,medium=2`` into ``[(size, weight), ...]``."""
+    mix: List[Tuple[str, float]] = []
+    for item in raw_mix.split(","):
+        size, _, weight = item.strip().partition("=")
+        if size not in SIZES:
+            raise ValueError(f"Unknown payload size '{size}' (expected one of: {', '.join(SIZES)})")
+        mix.append((size, float(weight or 1)))
+    return mix
+
+
+def parse_metrics(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    samples: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+    for line in text.splitlines():
+        match = _SAMPLE_PATTERN.match(line)
+        if not match:
+            continue
+        labels = tuple(sorted(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group("labels") or "")))
+        samples[(match.group("name"), labels)] = float(match.group("value"))
+    return samples
+
+
+def queue_wait_summary(before: Dict, after: Dict) -> Dict[str, Dict[str, float]]:
+    """Per size class: conversions started, mean queue wait and a bucket-based p95 upper bound."""
+    summary: Dict[str, Dict[str, float]] = {}
+    for (name, labels), value in after.items():
+        if name != "isa_phm_converter_queue_wait_seconds_count":
+            continue
+        size_class = dict(labels)["size_class"]
+        count = value - before.get((name, labels), 0.0)
+        if count <= 0:
+            continue
+        sum_key = ("isa_phm_converter_queue_wait_seconds_sum", labels)
+        total = after.get(sum_key, 0.0) - before.get(sum_key, 0.0)
+
+        buckets = []
+        for (bucket_name, bucket_labels), bucket_value in after.items():
+            bucket_label_map = dict(bucket_labels)
+            if bucket_name == "isa_phm_converter_queue_wait_seconds_bucket" and bucket_label_map.get("size_class") == size_class:
+                bound = math.inf if bucket_label_map["le"] == "+Inf" else float(bucket_label_map["le"])
+                buckets.append((bound, bucket_value - before.get((bucket_name, bucket_labels), 0.0)))
+        p95 = next((bound for bound, cumulative in sorted(buckets) if cumulative >= 0.95 * count), math.inf)
+        summary[size_class] = {"conversions": count, "mean_seconds": total / count, "p95_upper_bound_seconds": p95}
+    return summary
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return math.nan
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(settings: Settings, port: int) -> Tuple[uvicorn.Server, threading.Thread]:
+    config = uvicorn.Config(create_app(settings), host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name="load-test-server", daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 60
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("API server did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+async def run_load(
+    base_url: str,
+    mix: List[Tuple[str, float]],
+    total_requests: int,
+    concurrency: int,
+    allow_dedup: bool,
+    seed: int,
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    sizes = rng.choices([size for size, _ in mix], weights=[weight for _, weight in mix], k=total_requests)
+    templates = {size: generate_payload(SIZES[size]) for size, _ in mix}
+    outcomes: List[Dict[str, Any]] = []
+    next_index = iter(range(total_requests))
+
+    async def _worker(client: httpx.AsyncClient) -> None:
+        for index in next_index:
+            size = sizes[index]
+            payload = templates[size]
+            if not allow_dedup:
+                # A distinct payload per request keeps identical submissions from being collapsed into one conversion.
+                payload = {**payload, "description": f"load-test request {index}"}
+            started = time.perf_counter()
+            try:
+                response = await client.post("/convert", json=payload)
+                status = response.status_code
+                code = "ok" if status == 200 else response.json().get("error", {}).get("code", str(status))
+            except httpx.HTTPError as exc:
+                status, code = 0, type(exc).__name__
+            outcomes.append({"size": size, "status": status, "code": code, "seconds": time.perf_counter() - started})
+
+    timeout = httpx.Timeout(None)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        metrics_before = parse_metrics((await client.get("/metrics")).text)
+        started = time.perf_counter()
+        await asyncio.gather(*(_worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        metrics_after = parse_metrics((await client.get("/metrics")).text)
+
+    latencies = sorted(outcome["seconds"] for outcome in outcomes)
+    successes = sum(1 for outcome in outcomes if outcome["status"] == 200)
+    per_size = {}
+    for size, _ in mix:
+        size_latencies = sorted(outcome["seconds"] for outcome in outcomes if outcome["size"] == size)
+        per_size[size] = {
+            "requests": len(size_latencies),
+            "p50_seconds": percentile(size_latencies, 0.50),
+            "p95_seconds": percentile(size_latencies, 0.95),
+        }
+    return {
+        "requests": len(outcomes),
+        "concurrency": concurrency,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(outcomes) / elapsed if elapsed else math.nan,
+        "successful_rps": successes / elapsed if elapsed else math.nan,
+        "latency_seconds": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else math.nan,
+        },
+        "codes": dict(Counter(outcome["code"] for outcome in outcomes)),
+        "per_size": per_size,
+        "queue_wait": queue_wait_summary(metrics_before, metrics_after),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report["latency_seconds"]
+    print(f"requests:    {report['requests']} at concurrency {report['concurrency']} in {report['elapsed_seconds']:.2f}s")
+    print(f"throughput:  {report['throughput_rps']:.2f} req/s ({report['successful_rps']:.2f} successful req/s)")
+    print(
+        f"latency:     p50={latency['p50']:.3f}s p95={latency['p95']:.3f}s "
+        f"p99={latency['p99']:.3f}s max={latency['max']:.3f}s"
+    )
+    print("codes:       " + ", ".join(f"{code}={count}" for code, count in sorted(report["codes"].items())))
+    for size, stats in report["per_size"].items():
+        print(f"  {size:>7}: {stats['requests']} requests, p50={stats['p50_seconds']:.3f}s p95={stats['p95_seconds']:.3f}s")
+    print("queue wait:")
+    for size_class, stats in sorted(report["queue_wait"].items()):
+        print(
+            f"  {size_class:>7}: {int(stats['conversions'])} conversions, mean={stats['mean_seconds']:.3f}s "
+            f"p95<={stats['p95_upper_bound_seconds']}s"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50, help="Total number of /convert requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument(
+        "--mix",
+        default="small=8,medium=2",
+        help=f"Weighted payload sizes, e.g. small=8,medium=2 ({', '.join(SIZES)})",
+    )
+    parser.add_argument(
+        "--setting",
+        action="append",
+        default=[],
+        metavar="FIELD=VALUE",
+        help="Override a Settings field for the server, e.g. --setting converter_small_slots=8 (repeatable)",
+    )
+    parser.add_argument(
+        "--allow-dedup",
+        action="store_true",
+        help="Send identical payloads per size so concurrent duplicates share one conversion",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the request mix")
+    parser.add_argument("--json-output", type=Path, help="Also write the report as JSON to this file")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        mix = parse_mix(args.mix)
+        settings = apply_setting_overrides(Settings.from_env(), args.setting)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+
+    for logger_name in ("isa_phm_backend", "httpx"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+    port = _free_port()
+    server, thread = start_server(settings, port)
+    try:
+        report = asyncio.run(
+            run_load(f"http://127.0.0.1:{port}", mix, args.requests, max(1, args.concurrency), args.allow_dedup, args.seed)
+        )
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+
+    report["settings_overrides"] = args.setting
+    print_report(report)
+    if args.json_output:
+        args.json_output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Generate synthetic ISA-PHM wizard payloads of a configurable size."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List
+
+
+@dataclass(frozen=True)
+class PayloadShape:
+    studies: int = 1
+    sensors: int = 1
+    assays: int = 1
+    runs: int = 1
+    study_variables: int = 1
+    protocol_parameters: int = 1
+    contacts: int = 1
+    publications: int = 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+# Named sizes used by the benchmark suite; "xlarge" is opt-in because it takes minutes.
+SIZES: Dict[str, PayloadShape] = {
+    "small": PayloadShape(),
+    "medium": PayloadShape(studies=3, sensors=4, assays=4, runs=10, study_variables=3, protocol_parameters=4),
+    "large": PayloadShape(studies=8, sensors=8, assays=8, runs=40, study_variables=6, protocol_parameters=8),
+    "xlarge": PayloadShape(studies=20, sensors=16, assays=16, runs=100, study_variables=10, protocol_parameters=12),
+}
+
+
+def _parameters(prefix: str, count: int, unit: str) -> List[Dict[str, Any]]:
+    return [{"id": f"{prefix}-{index}", "name": f"{prefix} parameter {index}", "unit": unit} for index in range(1, count + 1)]
+
+
+def _sensor(index: int) -> Dict[str, Any]:
+    return {
+        "id": f"sensor-{index}",
+        "alias": f"S{index}",
+        "technologyPlatform": "DAQ",
+        "technologyType": "Accelerometer",
+        "measurementType": "Vibration",
+        "description": f"Accelerometer {index}",
+    }
+
+
+def _protocol_entries(
+    sensor_id: str,
+    protocol_id: str,
+    parameters: List[Dict[str, Any]],
+    value_prefix: str,
+) -> List[Dict[str, Any]]:
+    return [
+        {
+            "sourceId": sensor_id,
+            "targetId": parameter["id"],
+            "protocolId": protocol_id,
+            "value": [f"{value_prefix}{index}", parameter["unit"]],
+        }
+        for index, parameter in enumerate(parameters, start=1)
+    ]
+
+
+def _study(shape: PayloadShape, study_index: int, study_variables: List[Dict[str, Any]]) -> Dict[str, Any]:
+    study_id = f"study-{study_index}"
+    sensors = [_sensor(index) for index in range(1, shape.sensors + 1)]
+    measurement_parameters = _parameters("mp-param", shape.protocol_parameters, "Hz")
+    processing_parameters = _parameters("pp-param", shape.protocol_parameters, "")
+    run_ids = [f"{study_id}::run-{run:02d}" for run in range(1, shape.runs + 1)]
+
+    assays = []
+    for assay_index in range(1, shape.assays + 1):
+        sensor = sensors[(assay_index - 1) % len(sensors)]
+        assays.append(
+            {
+                "assay_file_name": f"se{study_index:02d}_{assay_index:02d}",
+                "used_sensor": {key: sensor[key] for key in ("id", "alias", "technologyPlatform", "technologyType", "measurementType")},
+                "measurement_protocol_id": "mp-1",
+                "processing_protocol_id": "pp-1",
+                "measurement_protocols": _protocol_entries(sensor["id"], "mp-1", measurement_parameters, "256"),
+                "processing_protocols": _protocol_entries(sensor["id"], "pp-1", processing_parameters, "window-"),
+                "runs": [
+                    {
+                        "run_number": run,
+                        "study_run_id": run_ids[run - 1],
+                        "study_id": study_id,
+                        "raw_file_name": f"raw/{study_id}/assay{assay_index}_run{run}.csv",
+                        "processed_file_name": f"processed/{study_id}/assay{assay_index}_run{run}.csv",
+                    }
+                    for run in range(1, shape.runs + 1)
+                ],
+            }
+        )
+
+    return {
+        "id": study_id,
+        "name": f"Study {study_index}",
+        "description": f"Generated study {study_index}",
+        "submissionDate": "2026-03-20",
+        "publicationDate": "2026-03-21",
+        "total_runs": shape.runs,
+        "configurationId": "cfg-1",
+        "selectedMeasurementProtocolId": "mp-1",
+        "selectedProcessingProtocolId": "pp-1",
+        "used_setup": {
+            "id": "setup-1",
+            "name": "Rig A",
+            "description": "Generated setup",
+            "experimentPreparationProtocolName": "Experiment Preparation",
+            "characteristics": [{"category": "Machine", "value": "Rig", "unit": ""}],
+            "sensors": sensors,
+            "configurations": [
+                {
+                    "id": "cfg-1",
+                    "name": "Configuration 1",
+                    "replaceableComponentId": "bearing-1",
+                    "details": [{"name": "Bearing type", "value": "6205"}],
+                }
+            ],
+            "measurementProtocols": [{"id": "mp-1", "name": "Measurement Protocol", "parameters": measurement_parameters}],
+            "processingProtocols": [{"id": "pp-1", "name": "Processing Protocol", "parameters": processing_parameters}],
+        },
+        "study_to_study_variable_mapping": [
+            {
+                "studyId": study_id,
+                "studyRunId": run_ids[run - 1],
+                "runNumber": run,
+                "studyVariableId": variable["id"],
+                "value": str(run * 100 + variable_index),
+                "variableName": variable["name"],
+            }
+            for run in range(1, shape.runs + 1)
+            for variable_index, variable in enumerate(study_variables, start=1)
+        ],
+        "assay_details": assays,
+    }
+
+
+def generate_payload(shape: PayloadShape) -> Dict[str, Any]:
+    """
+    Build a payload that passes schema and semantic validation.
+
+    Output is fully deterministic for a given shape. Every study uses the same
+    test setup with ``shape.sensors`` sensors; assays are assigned to sensors
+    round-robin and each has ``shape.runs`` runs and one measurement and one
+    processing entry per protocol parameter.
+    """
+    study_variables = [
+        {
+            "id": f"var-{index}",
+            "name": f"Variable {index}",
+            "type": "numeric",
+            "unit": "N",
+            "description": f"Generated variable {index}",
+        }
+        for index in range(1, shape.study_variables + 1)
+    ]
+    contacts = [
+        {
+            "id": f"contact-{index}",
+            "firstName": f"First{index}",
+            "lastName": f"Last{index}",
+            "email": f"contact{index}@example.org",
+            "roles": ["Author"],
+            "affiliations": ["Example University"],
+        }
+        for index in range(1, shape.contacts + 1)
+    ]
+    publications = [
+        {
+            "id": f"publication-{index}",
+            "title": f"Generated publication {index}",
+            "doi": f"10.0000/generated.{index}",
+            "publicationStatus": "published",
+            "contactList": [contact["id"] for contact in contacts],
+            "correspondingContactId": contacts[0]["id"] if contacts else None,
+        }
+        for index in range(1, shape.publications + 1)
+    ]
+
+    return {
+        "identifier": "INV-GENERATED",
+        "title": "Generated ISA-PHM payload",
+        "description": f"Synthetic payload {shape.as_dict()}",
+        "submission_date": "2026-03-20",
+        "public_release_date": "2026-03-21",
+        "experiment_type": "Diagnostics",
+        "publications": publications,
+        "contacts": contacts,
+        "study_variables": study_variables,
+        "measurement_protocols": [
+            {"id": "mp-1", "name": "Measurement Protocol", "parameters": _parameters("mp-param", shape.protocol_parameters, "Hz")}
+        ],
+        "processing_protocols": [
+            {"id": "pp-1", "name": "Processing Protocol", "parameters": _parameters("pp-param", shape.protocol_parameters, "")}
+        ],
+        "studies": [_study(shape, index, study_variables) for index in range(1, shape.studies + 1)],
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate a synthetic ISA-PHM wizard payload.")
+    parser.add_argument("--size", choices=sorted(SIZES), help="Start from a named size")
+    for field in PayloadShape.__dataclass_fields__:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, dest=field, help=f"Number of {field.replace('_', ' ')}")
+    parser.add_argument("--output", "-o", help="Write to this file instead of stdout")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    shape = SIZES[args.size] if args.size else PayloadShape()
+    overrides = {field: getattr(args, field) for field in PayloadShape.__dataclass_fields__ if getattr(args, field) is not None}
+    shape = PayloadShape(**{**shape.as_dict(), **overrides})
+
+    payload = json.dumps(generate_payload(shape), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as handle:
+            handle.write(payload)
+    else:
+        sys.stdout.write(payload + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Replay captured /convert inputs in-process or against a running API and compare stage timings."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.capture import CAPTURE_SUFFIX  # noqa: E402
+
+# Converter stages as reported in the converter's stage_timings (and Server-Timing).
+CONVERTER_STAGES = (
+    "payload_load",
+    "investigation_metadata",
+    "contacts_publications",
+    "protocols",
+    "samples",
+    "factor_values",
+    "assays",
+    "serialization",
+)
+
+
+def load_captures(source: Path, limit: int = 0) -> List[Dict[str, Any]]:
+    paths = sorted(source.glob(f"*{CAPTURE_SUFFIX}")) if source.is_dir() else [source]
+    captures = []
+    for path in paths:
+        capture = json.loads(path.read_text(encoding="utf-8"))
+        capture["_path"] = str(path)
+        captures.append(capture)
+    captures.sort(key=lambda capture: capture.get("captured_at", ""))
+    return captures[:limit] if limit > 0 else captures
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """``name;dur=12.5, ...`` to ``{name: seconds}``."""
+    timings: Dict[str, float] = {}
+    for entry in header.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            key, _, value = param.partition("=")
+            if name and key == "dur":
+                timings[name] = float(value) / 1000
+    return timings
+
+
+def in_process_replayer(study_cache_dir: Optional[Path] = None) -> Callable[[Dict[str, Any]], Dict[str, float]]:
+    # Imported here so --help works without isatools installed.
+    from isatools.isajson import ISAJSONEncoder
+
+    from app.converter.diagnostics import ConversionDiagnostics
+    from app.converter.entrypoint import create_isa_document
+    from app.converter.identifiers import payload_digest, relabel_generated_ids
+    from app.converter.instrumentation import StageRecorder
+    from app.converter.payload_model import build_payload_model
+    from app.converter.study_cache import StudyCache
+
+    def _replay(capture: Dict[str, Any]) -> Dict[str, float]:
+        # Same steps as convert_file in app/web-to-isa-phm.py, without the process start-up and file I/O:
+        # the payload is parsed from a string and serialized to one.
+        raw_payload = json.dumps(capture["payload"])
+        deterministic_ids = bool(capture.get("options", {}).get("deterministic_ids"))
+        recorder = StageRecorder()
+        with recorder.stage("payload_load"):
+            payload = json.loads(raw_payload)
+            model = build_payload_model(payload)
+        document = create_isa_document(
+            isa_phm_info=model,
+            deterministic_ids=deterministic_ids,
+            recorder=recorder,
+            diagnostics=ConversionDiagnostics(),
+            study_cache=StudyCache(study_cache_dir) if study_cache_dir is not None else None,
+        )
+        with recorder.stage("serialization"):
+            if deterministic_ids:
+                document = relabel_generated_ids(document, payload_digest(payload))
+            json.dumps(document, cls=ISAJSONEncoder, sort_keys=True, indent=4, separators=(",", ": "))
+        return {stage: timing["seconds"] for stage, timing in recorder.timing_report().items()}
+
+    return _replay
+
+
+def http_replayer(base_url: str, timeout_seconds: float) -> Callable[[Dict[str, Any]], Dict[str, float]]:
+    import httpx
+
+    client = httpx.Client(base_url=base_url, timeout=timeout_seconds)
+
+    def _replay(capture: Dict[str, Any]) -> Dict[str, float]:
+        params = {name: str(value).lower() for name, value in capture.get("options", {}).items()}
+        response = client.post(
+            "/convert",
+            params=params,
+            content=json.dumps(capture["payload"]),
+            headers={"Content-Type": "application/json"},
+        )
+        if response.status_code != 200:
+            code = response.json().get("error", {}).get("code", "") if response.content else ""
+            raise RuntimeError(f"HTTP {response.status_code} {code}".strip())
+        return parse_server_timing(response.headers.get("Server-Timing", ""))
+
+    return _replay
+
+
+def _delay_seconds(previous: Dict[str, Any] | None, current: Dict[str, Any], rate: float) -> float:
+    if previous is None or rate <= 0:
+        return 0.0
+    gap = datetime.fromisoformat(current["captured_at"]) - datetime.fromisoformat(previous["captured_at"])
+    return max(0.0, gap.total_seconds() / rate)
+
+
+def replay(
+    captures: List[Dict[str, Any]],
+    replayer: Callable[[Dict[str, Any]], Dict[str, float]],
+    rate: float,
+) -> List[Dict[str, Any]]:
+    """Replay ``captures`` in capture order; ``rate`` 1 keeps the original spacing, 10 is ten times faster, 0 is back to back."""
+    outcomes = []
+    previous = None
+    next_start = time.monotonic()
+    for capture in captures:
+        next_start += _delay_seconds(previous, capture, rate)
+        time.sleep(max(0.0, next_start - time.monotonic()))
+        previous = capture
+        outcome: Dict[str, Any] = {
+            "capture": capture["_path"],
+            "size_class": capture.get("size_class"),
+            "captured": capture.get("timings", {}),
+        }
+        try:
+            outcome["replayed"] = replayer(capture)
+        except Exception as exc:  # keep going; failures are part of the report
+            outcome["error"] = f"{type(exc).__name__}: {exc}"
+        outcomes.append(outcome)
+    return outcomes
+
+
+def build_report(outcomes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median captured vs. replayed seconds for every stage timed in both."""
+    pairs: Dict[str, List[tuple[float, float]]] = {}
+    for outcome in outcomes:
+        replayed = outcome.get("replayed")
+        if replayed is None:
+            continue
+        captured = outcome["captured"]
+        for stage in replayed:
+            if stage in captured:
+                pairs.setdefault(stage, []).append((captured[stage], replayed[stage]))
+        # The converter stages are timed in both modes, so their sum is always comparable.
+        if all(stage in captured and stage in replayed for stage in CONVERTER_STAGES):
+            pairs.setdefault("converter_stages", []).append(
+                (sum(captured[stage] for stage in CONVERTER_STAGES), sum(replayed[stage] for stage in CONVERTER_STAGES))
+            )
+
+    stages = {}
+    for stage, values in pairs.items():
+        captured_median = statistics.median(value for value, _ in values)
+        replayed_median = statistics.median(value for _, value in values)
+        stages[stage] = {
+            "samples": len(values),
+            "captured_median_seconds": round(captured_median, 6),
+            "replayed_median_seconds": round(replayed_median, 6),
+            "change_percent": round((replayed_median - captured_median) / captured_median * 100, 1)
+            if captured_median
+            else None,
+        }
+    return {
+        "captures": len(outcomes),
+        "failures": [
+            {"capture": outcome["capture"], "error": outcome["error"]} for outcome in outcomes if "error" in outcome
+        ],
+        "stages": stages,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"replayed {report['captures']} captures, {len(report['failures'])} failed")
+    for failure in report["failures"]:
+        print(f"  FAILED {failure['capture']}: {failure['error']}")
+    print(f"{'stage':<24} {'n':>5} {'captured':>11} {'replayed':>11} {'change':>8}")
+    for stage, stats in report["stages"].items():
+        change = f"{stats['change_percent']:+.1f}%" if stats["change_percent"] is not None else "n/a"
+        print(
+            f"{stage:<24} {stats['samples']:>5} {stats['captured_median_seconds'] * 1000:>9.1f}ms "
+            f"{stats['replayed_median_seconds'] * 1000:>9.1f}ms {change:>8}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", type=Path, help="Capture directory (CAPTURE_DIR) or a single capture file")
+    parser.add_argument(
+        "--url",
+        help="Replay against a running API at this base URL instead of converting in-process",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Replay speed relative to the original spacing (1 = original, 10 = ten times faster, 0 = back to back)",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Untimed replays of the first capture before measuring (imports and first-call costs)",
+    )
+    parser.add_argument(
+        "--study-cache-dir",
+        type=Path,
+        help="Convert in-process with a study cache in this directory, as a server with STUDY_CACHE_DIR does",
+    )
+    parser.add_argument("--limit", type=int, default=0, help="Replay at most this many captures (0 = all)")
+    parser.add_argument("--timeout", type=float, default=600.0, help="HTTP timeout per request in seconds")
+    parser.add_argument(
+        "--max-regression-percent",
+        type=float,
+        help="Exit with status 1 if the median converter time regresses by more than this percentage",
+    )
+    parser.add_argument("--json-output", type=Path, help="Also write the report as JSON to this file")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.source.exists():
+        print(f"No captures at {args.source}", file=sys.stderr)
+        return 2
+    captures = load_captures(args.source, args.limit)
+    if not captures:
+        print(f"No captures at {args.source}", file=sys.stderr)
+        return 2
+
+    logging.disable(logging.WARNING)
+    replayer = http_replayer(args.url, args.timeout) if args.url else in_process_replayer(args.study_cache_dir)
+    for _ in range(max(0, args.warmup)):
+        try:
+            replayer(captures[0])
+        except Exception:  # reported by the measured replay below
+            break
+    report = build_report(replay(captures, replayer, args.rate))
+    report["mode"] = "http" if args.url else "in-process"
+    print_report(report)
+    if args.json_output:
+        args.json_output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if report["failures"]:
+        return 1
+    converter = report["stages"].get("converter_stages")
+    if args.max_regression_percent is not None and converter and converter["change_percent"] is not None:
+        if converter["change_percent"] > args.max_regression_percent:
+            print(f"converter time regressed by {converter['change_percent']:+.1f}%", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())